@@ -0,0 +1,148 @@
+# alert_worker.py
+"""
+Worker d'alertes sans interface : surveille l'indice Kp pour une localisation
+et envoie l'email d'alerte (model.alerts) quand le seuil est dépassé.
+
+    python alert_worker.py --place "Tromsø, Norway" --to moi@exemple.com --kp 5
+    python alert_worker.py --place "Kiruna, Sweden" --to moi@exemple.com --once   # cron
+    python alert_worker.py --place "Hobart, Australia" --to moi@exemple.com       # seuil Kp automatique
+
+Par défaut, le Kp estimé d'après le vent solaire mesuré au point L1
+(model.solarwind) compte aussi : l'alerte part 30 à 60 minutes avant que la
+perturbation n'atteigne la Terre (--no-nowcast pour le seul Kp mesuré).
+
+SMTP : AURORA_SMTP_SERVER, AURORA_SMTP_PORT (587), AURORA_SMTP_SENDER,
+AURORA_SMTP_PASSWORD. Couverture nuageuse (optionnelle) : OPENWEATHER_API_KEY.
+
+N'importe ni Streamlit, ni pandas, ni Plotly, ni PIL : le worker démarre en
+quelques dixièmes de seconde (mesure : python -m bench.import_time).
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from model.alerts import (effective_kp, hemisphere_of, min_kp_for_location, send_aurora_alert_email,
+                          should_send_alert, validate_email)
+from model.functions import chance_score, darkness_flag, geocode_place, get_kp_now, get_owm_current
+
+logger = logging.getLogger("aurora.worker")
+
+# Couverture supposée pour le score quand OpenWeatherMap n'est pas configuré et
+# que la climatologie ne couvre pas la localisation (chance_score renvoie 0
+# sans couverture nuageuse)
+UNKNOWN_CLOUD_PCT = 50
+
+
+def smtp_config_from_env():
+    """Configuration SMTP lue dans l'environnement (None si incomplète)."""
+    config = {
+        "smtp_server": os.environ.get("AURORA_SMTP_SERVER"),
+        "smtp_port": int(os.environ.get("AURORA_SMTP_PORT", "587")),
+        "sender_email": os.environ.get("AURORA_SMTP_SENDER"),
+        "sender_password": os.environ.get("AURORA_SMTP_PASSWORD"),
+    }
+    if not (config["smtp_server"] and config["sender_email"]):
+        return None
+    return config
+
+
+def solar_wind_nowcast():
+    """Kp estimé d'après le vent solaire (numpy n'est chargé qu'ici), None si indisponible."""
+    from model import solarwind
+
+    try:
+        return solarwind.nowcast()
+    except Exception as e:
+        logger.warning("vent solaire indisponible : %s", e)
+        return None
+
+
+def check_once(geo, recipient, kp_threshold, cooldown_hours, smtp_config, last_alert_time=None, min_kp=None,
+               use_nowcast=True):
+    """Un contrôle : renvoie l'heure de la dernière alerte (inchangée si aucun envoi)."""
+    kp_now, _ = get_kp_now()
+    kp_now, nowcast = effective_kp(kp_now, solar_wind_nowcast() if use_nowcast else None)
+    if not should_send_alert(kp_now, kp_threshold, last_alert_time, cooldown_hours):
+        logger.info("Kp %.2f < seuil %.1f ou délai entre alertes non écoulé", kp_now or 0, kp_threshold)
+        return last_alert_time
+
+    dark = None
+    try:
+        dark, _, _ = darkness_flag(geo["lat"], geo["lon"])
+    except Exception as e:
+        logger.warning("lever/coucher du soleil indisponible : %s", e)
+    cloud = None
+    api_key = os.environ.get("OPENWEATHER_API_KEY")
+    if api_key:
+        try:
+            cloud = get_owm_current(geo["lat"], geo["lon"], api_key).get("cloud_pct")
+        except Exception as e:
+            logger.warning("météo actuelle indisponible : %s", e)
+    sky = cloud
+    if sky is None:
+        from model import climatology     # table locale : moyenne du mois à cette localisation
+
+        sky = climatology.cloud_prior(geo["lat"], geo["lon"], datetime.now(timezone.utc).month)
+    score = chance_score(kp_now, UNKNOWN_CLOUD_PCT if sky is None else sky, dark or 0)
+
+    ok, message = send_aurora_alert_email(
+        recipient, kp_now, f"{geo['name']}, {geo['country']}", score,
+        cloud_pct=cloud, dark_flag=dark, smtp_config=smtp_config,
+        min_kp=min_kp, hemisphere=hemisphere_of(geo["lat"]), nowcast=nowcast,
+    )
+    if not ok:
+        logger.error("envoi impossible : %s", message)
+        return last_alert_time
+    if nowcast:
+        logger.info("alerte anticipée envoyée à %s (Kp estimé %.2f, arrivée dans ~%d min)",
+                    recipient, kp_now, nowcast["lead_min"])
+    else:
+        logger.info("alerte envoyée à %s (Kp %.2f)", recipient, kp_now)
+    return datetime.now(timezone.utc)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--place", required=True, help="localisation (géocodage Open-Meteo)")
+    parser.add_argument("--to", required=True, help="adresse du destinataire")
+    parser.add_argument("--kp", type=float, default=None,
+                        help="seuil Kp (défaut : Kp minimum de visibilité à cette localisation, nord ou sud)")
+    parser.add_argument("--cooldown", type=float, default=1.0, help="heures minimum entre deux alertes")
+    parser.add_argument("--interval", type=int, default=60,
+                        help="secondes entre deux contrôles (les produits vent solaire sont à la minute)")
+    parser.add_argument("--no-nowcast", action="store_true", help="ignorer le Kp estimé d'après le vent solaire")
+    parser.add_argument("--once", action="store_true", help="un seul contrôle puis sortie")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    if not validate_email(args.to):
+        parser.error(f"adresse invalide : {args.to}")
+    smtp_config = smtp_config_from_env()
+    if smtp_config is None:
+        parser.error("configuration SMTP manquante (AURORA_SMTP_SERVER, AURORA_SMTP_SENDER)")
+    geo = geocode_place(args.place)
+    if geo is None:
+        parser.error(f"localisation introuvable : {args.place}")
+
+    min_kp = min_kp_for_location(geo["lat"], geo["lon"])
+    kp_threshold = args.kp if args.kp is not None else min_kp
+    logger.info("%s : seuil Kp %.1f (minimum de visibilité %d)", geo["name"], kp_threshold, min_kp)
+
+    last_alert_time = None
+    while True:
+        try:
+            last_alert_time = check_once(geo, args.to, kp_threshold, args.cooldown, smtp_config,
+                                         last_alert_time, min_kp, not args.no_nowcast)
+        except Exception as e:
+            logger.warning("contrôle impossible : %s", e)
+        if args.once:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
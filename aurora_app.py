@@ -1,22 +1,27 @@
+import os
 import streamlit as st
 import streamlit.components.v1 as components
-import plotly.express as px
-import plotly.graph_objects as go
-import requests
-import pandas as pd
 import datetime as dt
-from PIL import Image
+from zoneinfo import ZoneInfo
+# numpy, pandas et plotly.graph_objects sont importés par les fonctions qui les
+# utilisent : l'aperçu de l'instantané s'affiche avant le chargement de pandas
 
 
 ## IMPORTATION DES FONCTIONS
 from model.functions import get_kp_series
 from model.functions import get_owm_current
 from model.functions import (
-    geocode_place, get_kp_now, get_weather, darkness_flag,
-    chance_score, score_label
+    geocode_place, get_kp_now, load_weather, darkness_flag,
+    chance_score, invalidate_location
 )
-from pathlib import Path
-from model.alerts import send_aurora_alert_email, should_send_alert, validate_email
+from model.alerts import (effective_kp, hemisphere_of, min_kp_for_location, send_aurora_alert_email,
+                          should_send_alert, validate_email)
+# model.ovation (PIL) et model.maps sont importés par les onglets qui les utilisent
+from model import assets, cache, climatology, geomag, live, metrics, snapshot, solarwind, upstream
+from model.compare import HORIZONS_H, QUICK_LOCATIONS
+from model.figures import (SEUILS_DEFAUT, VARIABLES_DEFAUT, VARIABLES_METEO, explorateur_meteo,
+                           fenetres_observation, figure_colonnes, figures_jauges)
+from model import profiler
 
 
 # ============================================
@@ -80,85 +85,58 @@ def translate_country_to_english(place: str) -> str:
 #  CETTE LIGNE DOIT ÊTRE LA PREMIÈRE COMMANDE STREAMLIT !
 st.set_page_config(page_title="Aura Hunter", page_icon="🌌", layout="wide")
 
-# ============================================
-# DÉFINITIONS GLOBALES
-# ============================================
+# Profilage par section (AURORA_PROFILE=1|cprofile|pyinstrument), no-op sinon
+profile = profiler.begin_rerun()
 
-# Table de correspondance Kp → Latitude limite
-kp_zones = {
-    0: 66.5,  # Kp 0 → 66.5°N (cercle arctique)
-    1: 64.5,  # Kp 1 → 64.5°N
-    2: 62.4,  # Kp 2 → 62.4°N
-    3: 60.4,  # Kp 3 → 60.4°N (Rovaniemi)
-    4: 58.3,  # Kp 4 → 58.3°N (Stockholm, Helsinki)
-    5: 56.3,  # Kp 5 → 56.3°N (Écosse)
-    6: 54.2,  # Kp 6 → 54.2°N (Nord Angleterre)
-    7: 52.2,  # Kp 7 → 52.2°N (Londres, Amsterdam)
-    8: 50.1,  # Kp 8 → 50.1°N (Bruxelles, Paris Nord)
-    9: 48.1   # Kp 9 → 48.1°N (Paris, Munich)
-}
+# Export des métriques (Prometheus / JSON) si AURORA_METRICS_PORT est défini
+@st.cache_resource
+def start_metrics_exporter():
+    port = os.environ.get("AURORA_METRICS_PORT")
+    return metrics.start_http_exporter(port) if port else None
 
-# ============================================
-# DÉFINITIONS GLOBALES
-# ============================================
+start_metrics_exporter()
 
-# Table de correspondance Kp → Latitude limite
-kp_zones = {
-    0: 66.5, 1: 64.5, 2: 62.4, 3: 60.4, 4: 58.3,
-    5: 56.3, 6: 54.2, 7: 52.2, 8: 50.1, 9: 48.1
-}
+# Localisations rapides et lieu par défaut : bundles précalculés en arrière-plan
+# à chaque mise à jour des données (model.snapshot), AURORA_PREBUILD=0 pour désactiver
+DEFAULT_PLACE = "Stockholm, Suède"
+
+@st.cache_resource
+def start_snapshot_builder():
+    if os.environ.get("AURORA_PREBUILD", "1") == "0":
+        return None
+    return snapshot.get_builder([translate_country_to_english(p) for p in (DEFAULT_PLACE, *QUICK_LOCATIONS)])
+
+snapshot_builder = start_snapshot_builder()
 
 # ============================================
-# FONCTION DE CALCUL AUTOMATIQUE DU KP MINIMUM
+# DÉFINITIONS GLOBALES
 # ============================================
 
-def calculate_min_kp_for_location(latitude):
-    """
-    Calcule le Kp minimum nécessaire pour voir les aurores à une latitude donnée.
-    
-    Args:
-        latitude (float): Latitude de la localisation (ex: 59.33 pour Stockholm)
-    
-    Returns:
-        int: Indice Kp minimum nécessaire
-    
-    Exemples:
-        >>> calculate_min_kp_for_location(59.33)  # Stockholm
-        4
-        >>> calculate_min_kp_for_location(69.65)  # Tromsø  
-        1
-        >>> calculate_min_kp_for_location(48.85)  # Paris
-        9
-    """
-    # Parcourir du Kp le plus élevé au plus faible
-    for kp in range(9, -1, -1):
-        lat_limit = kp_zones.get(kp, 66.5)
-        if latitude >= lat_limit:
-            return kp
-    # Si latitude < 48.1°N (limite Kp 9)
-    return 9
+# Table de correspondance Kp → latitude géomagnétique limite (table NOAA)
+kp_zones = geomag.KP_ZONES
 
+# --- Bannière et logo : variantes redimensionnées une fois par model.assets
+# (1100×200 et 480 px de large, WebP), servies depuis static/ dans une balise
+# <img> (ni décodage ni ré-encodage au rerun) ; sinon st.image du fichier,
+# image source comprise si static/ est inutilisable
+STATIC_SERVING = st.get_option("server.enableStaticServing")
 
-# --- Image bannière (fichier local)
-BANNER = Path(__file__).parent / "assets" / "Gemini_Generated_Image_qaqnevqaqnevqaqn.png"
+def afficher_image(zone, nom, style):
+    """Image `nom` de model.assets dans `zone` (st ou st.sidebar) ; `style` : CSS de la balise <img>."""
+    adresse = assets.url(nom, STATIC_SERVING)
+    if adresse:
+        zone.markdown(f'<img src="{adresse}" alt="" style="{style}">', unsafe_allow_html=True)
+    elif (chemin := assets.image(nom)) is not None:
+        zone.image(str(chemin), use_container_width=True)
 
-if BANNER.exists():
-    # Charger l'image avec PIL
-    img = Image.open(BANNER)
-    
-    # Redimensionner à 1100x80 pixels (largeur x hauteur)
-    img_resized = img.resize((1100, 200), Image.Resampling.LANCZOS)
-    
-    # Afficher l'image redimensionnée
-    st.image(img_resized)
+afficher_image(st, "banner", "max-width: 100%")
     
 # -----------------------------
 # Barre latérale (paramètres)
 # -----------------------------
 # Logo dans la sidebar
-LOGO_PATH = Path(__file__).parent / "assets" / "logo.png"  # Changez le nom selon votre fichier
-if LOGO_PATH.exists():
-    st.sidebar.image(str(LOGO_PATH), use_container_width=True)
+if assets.image("logo") is not None:
+    afficher_image(st.sidebar, "logo", "width: 100%")
     st.sidebar.markdown("---")  # Ligne de séparation optionnelle
 
 st.sidebar.header(" Paramètres")
@@ -166,22 +144,13 @@ st.sidebar.header(" Paramètres")
 # Zone de texte avec exemple et aide
 place = st.sidebar.text_input(
     "Localisation (ville, pays)", 
-    value="Stockholm, Suède",
+    value=DEFAULT_PLACE,
     help=" Vous pouvez utiliser les noms français (Suède, Norvège, Finlande) ou anglais (Sweden, Norway, Finland)"
 )
 
 quick = st.sidebar.selectbox(
     "Localisations rapides",
-    ["—", 
-     "Abisko, Suède", 
-     "Kiruna, Suède", 
-     "Stockholm, Suède", 
-     "Tromsø, Norvège", 
-     "Rotsund, Norvège", 
-     "Kilpisjärvi, Finlande", 
-     "Rovaniemi, Finlande", 
-     "Banff, Canada", 
-     "Fairbanks, États-Unis"]
+    ["—", *QUICK_LOCATIONS]
 )
 if quick != "—":
     place = quick
@@ -192,15 +161,6 @@ w_dark = st.sidebar.slider("Poids : Obscurité",      0.0, 1.0, 0.15, 0.05)
 
 refresh = st.sidebar.button(" Actualiser les données")
 
-# -----------------------------
-# Rafraîchissement manuel du cache
-# -----------------------------
-
-if refresh:
-    st.cache_data.clear()
-    st.cache_resource.clear()
-    st.rerun()
-
 # AJOUTEZ :
 st.sidebar.markdown("---")
 st.sidebar.subheader(" Alertes Email Automatiques")
@@ -305,7 +265,7 @@ if alerts_enabled:
                         0.0, 9.0, 5.0, 0.5,
                         help="Indice Kp minimum pour déclencher une alerte"
                     )
-                    st.caption(f" Aurores visibles jusqu'à {kp_zones.get(int(kp_threshold), 66.5):.1f}°N")
+                    st.caption(f" Aurores visibles jusqu'à {geomag.kp_limit(kp_threshold):.1f}° de latitude géomagnétique")
                 else:
                     kp_threshold = None  # Sera calculé automatiquement
                 
@@ -344,7 +304,7 @@ if alerts_enabled:
             
             with col_alert2:
                 if st.session_state.last_alert_time:
-                    temps_ecoule = pd.Timestamp.now() - st.session_state.last_alert_time
+                    temps_ecoule = dt.datetime.now() - st.session_state.last_alert_time
                     heures_ecoulees = temps_ecoule.total_seconds() / 3600
                     
                     if heures_ecoulees < cooldown_hours:
@@ -373,16 +333,104 @@ if alerts_enabled:
                 st.sidebar.success(" Statistiques réinitialisées")
 
 # -----------------------------
-# Récupération des données principales
+# En-tête
+# -----------------------------
+# Dessiné avant toute requête : titre, onglets, puis aperçu de la localisation
+# tiré de son dernier instantané (model.snapshot), remplacé sur place quand les
+# données fraîches arrivent
+st.title("Aura Hunter")
+entete = st.empty()
+
+# -----------------------------
+# Onglets
 # -----------------------------
+# Navigation explicite : seul l'onglet affiché est calculé (st.tabs exécutait
+# les 7 onglets à chaque rerun). L'onglet courant est repris dans l'URL (?onglet=).
+ONGLETS = {
+    "overview": " Vue d'ensemble",
+    "map": " Carte mondiale",
+    "compare": " Comparer",
+    "current_weather": " Météo actuelle",
+    "forecast": " Prévisions météo",
+    "webcams": " Webcams",
+    "aurora_forecast": " Prévisions aurores",
+    "about": " À propos",
+}
+
+if "onglet" not in st.session_state:
+    st.session_state["onglet"] = st.query_params.get("onglet") if st.query_params.get("onglet") in ONGLETS else "overview"
+
+onglet = st.radio(
+    "Section",
+    list(ONGLETS),
+    format_func=ONGLETS.get,
+    horizontal=True,
+    label_visibility="collapsed",
+    key="onglet"
+)
+st.query_params["onglet"] = onglet
+
+alertes = st.container()    # avertissements des sources, au-dessus du contenu
+apercu = st.empty()         # aperçu de l'instantané, vidé avant le rendu de l'onglet
+
 
-# ✅ TRADUCTION AUTOMATIQUE DES NOMS DE PAYS (français → anglais)
+def legende_localisation(geo, tz):
+    return (f"📍 Localisation : **{geo['name']}** ({geo['country']}) — "
+            f"lat {geo['lat']:.3f}, lon {geo['lon']:.3f}, fuseau horaire {tz}")
+
+
+def afficher_apercu(snap):
+    """En-tête, puis jauges (vue d'ensemble) ou carte (carte mondiale) d'après l'instantané `snap`."""
+    tz = snap["geo"]["timezone"]
+    prise = snap["taken_at"].astimezone(ZoneInfo(tz))
+    recente = dt.datetime.now(dt.timezone.utc) - prise < dt.timedelta(hours=20)
+    quand = f"{prise:%H:%M}" if recente else f"{prise:%d/%m %H:%M}"
+    entete.caption(f"{legende_localisation(snap['geo'], tz)} · ⏳ données de {quand}, mise à jour en cours…")
+
+    with apercu.container():
+        if onglet == "overview":
+            score_snap = chance_score(snap.get("kp_score"), snap.get("cloud_now"), snap.get("dark", 0),
+                                      w1=w_kp, w2=w_sky, w3=w_dark)
+            st.subheader(" Vue d'ensemble")
+            st.markdown(" ")
+            col1, _, col2, _, col3 = st.columns([1, 0.2, 1, 0.2, 1])
+            figures = figures_jauges(snap.get("kp_now"), snap.get("cloud_now"), score_snap)
+            for i, (col, fig) in enumerate(zip((col1, col2, col3), figures)):
+                col.plotly_chart(fig, use_container_width=True, key=f"apercu_jauge_{i}")
+        elif onglet == "map" and snap.get("kp_now") is not None:
+            from model.maps import HEMISPHERE_CITIES, build_kp_map
+
+            mlat_snap = float(geomag.magnetic_latitude(snap["geo"]["lat"], snap["geo"]["lon"]))
+            hemi = st.session_state.get("carte_hemi", geomag.hemisphere(mlat_snap))
+            st.subheader(" Carte Mondiale des Probabilités d'Aurores")
+            # sans la grille OVATION : limite Kp et villes seulement
+            fig = build_kp_map(snap["kp_now"], float(geomag.kp_limit(snap["kp_now"])),
+                               HEMISPHERE_CITIES[hemi], None, hemi)
+            st.plotly_chart(fig, use_container_width=True, key="apercu_carte")
+
+
+# Aperçu au premier rendu d'une localisation dans la session (ou après
+# « Actualiser ») ; ensuite ses données sont en cache et le rendu complet est immédiat
 place_en = translate_country_to_english(place)
+premier_rendu = refresh or st.session_state.get("_lieu_affiche") != snapshot.key(place_en)
+snap = snapshot.peek(place_en) if premier_rendu else None
+if snap:
+    with profile.section("snapshot.preview"):
+        afficher_apercu(snap)
+elif premier_rendu:
+    entete.caption(f"📍 Localisation : **{place}** — chargement…")
+
+# -----------------------------
+# Récupération des données principales
+# -----------------------------
 
-geo = geocode_place(place_en)
+with profile.section("data.geocode"):
+    geo = geocode_place(place_en)
 if not geo:
-    st.error(f" Impossible de trouver la localisation « {place} ».")
-    st.info("""
+    apercu.empty()
+    entete.empty()
+    alertes.error(f" Impossible de trouver la localisation « {place} ».")
+    alertes.info("""
      **Astuces :**
     - Essayez avec le nom en anglais : "Stockholm, Sweden"
     - Vérifiez l'orthographe de la ville
@@ -392,54 +440,72 @@ if not geo:
 
 lat, lon, tz = geo["lat"], geo["lon"], geo["timezone"]
 
+# Rafraîchissement manuel : seules les données de cette localisation (et le Kp)
+# sont revalidées ; le cache des autres sessions et les ressources partagées restent intacts
+if refresh:
+    invalidate_location(lat, lon, tz, st.secrets.get("OPENWEATHER_API_KEY"))
+
 # Indice Kp
 kp_now, kp_time = None, None
 try:
-    kp_now, kp_time = get_kp_now()
+    with profile.section("data.kp_now"):
+        kp_now, kp_time = get_kp_now()
+except Exception as e:
+    alertes.warning(f" Impossible de récupérer l'indice Kp : {e}")
+
+# Vent solaire mesuré à L1 : Kp attendu dans 30 à 60 min, retenu pour le score
+# et les alertes s'il dépasse le Kp mesuré
+nowcast = None
+try:
+    with profile.section("data.solar_wind"):
+        nowcast = solarwind.nowcast()
 except Exception as e:
-    st.warning(f" Impossible de récupérer l'indice Kp : {e}")
+    alertes.warning(f" Impossible de récupérer le vent solaire (Kp estimé) : {e}")
+kp_score, kp_anticipe = effective_kp(kp_now, nowcast)
 
 # Obscurité
 dark, sunrise_utc, sunset_utc = 0, None, None
 try:
-    dark, sunrise_utc, sunset_utc = darkness_flag(lat, lon)
+    with profile.section("data.darkness"):
+        dark, sunrise_utc, sunset_utc = darkness_flag(lat, lon)
 except Exception as e:
-    st.warning(f" Impossible de récupérer les heures de lever/coucher du soleil : {e}")
+    alertes.warning(f" Impossible de récupérer les heures de lever/coucher du soleil : {e}")
 
 # Météo & couverture nuageuse actuelle
 wx, cloud_now = None, None
 try:
-    wx = get_weather(lat, lon, tz)
-    # Rendre les heures météo conscientes du fuseau horaire
-    if wx is not None and not wx.empty:
-        if wx["time"].dt.tz is None:
-            wx["time"] = wx["time"].dt.tz_localize(tz)
-        else:
-            wx["time"] = wx["time"].dt.tz_convert(tz)
-
-        now_local = pd.Timestamp.now(tz=tz)
-        idx = (wx["time"] - now_local).abs().idxmin()
-        cloud_now = float(wx.loc[idx, "cloud_total"])
-
-    cloud_now = float(wx.loc[idx, "cloud_total"])
-
+    with profile.section("data.weather"):
+        wx, cloud_now = load_weather(lat, lon, tz)
 except Exception as e:
-    st.warning(f" Impossible de récupérer les données météo : {e}")
+    alertes.warning(f" Impossible de récupérer les données météo : {e}")
+
+# Prévision indisponible : nébulosité climatologique du mois (table locale, sans appel)
+cloud_climato = False
+if cloud_now is None:
+    cloud_now = climatology.cloud_prior(lat, lon, dt.datetime.now(dt.timezone.utc).month)
+    cloud_climato = cloud_now is not None
 
 # Score de probabilité
-score = chance_score(kp_now, cloud_now, dark, w1=w_kp, w2=w_sky, w3=w_dark)
+score = chance_score(kp_score, cloud_now, dark, w1=w_kp, w2=w_sky, w3=w_dark)
+
+# Données fraîches : en-tête définitif, instantané du lieu pour les prochains premiers rendus
+entete.caption(legende_localisation(geo, tz))
+snapshot.save(place_en, geo=geo, kp_now=kp_now, kp_score=kp_score, dark=dark,
+              cloud_now=None if cloud_climato else cloud_now)
+st.session_state["_lieu_affiche"] = snapshot.key(place_en)
 
 
 # ============================================
 # ENVOI AUTOMATIQUE D'EMAIL
 # ============================================
-# Après : score = chance_score(kp_now, cloud_now, dark, w1=w_kp, w2=w_sky, w3=w_dark)
+# Après : score = chance_score(kp_score, cloud_now, dark, w1=w_kp, w2=w_sky, w3=w_dark)
 
 if alerts_enabled and email_config_ok and recipient_email and validate_email(recipient_email):
     if st.session_state.get('email_validated', False):
         
-        # CALCUL AUTOMATIQUE du Kp minimum pour cette localisation
-        min_kp_auto = calculate_min_kp_for_location(lat)
+        # CALCUL AUTOMATIQUE du Kp minimum pour cette localisation (nord ou sud,
+        # sur la latitude géomagnétique)
+        min_kp_auto = min_kp_for_location(lat, lon)
         
         # Utiliser le Kp manuel si activé, sinon le Kp automatique
         kp_threshold_final = kp_threshold if kp_threshold is not None else min_kp_auto
@@ -447,49 +513,50 @@ if alerts_enabled and email_config_ok and recipient_email and validate_email(rec
         # Afficher le Kp calculé dans la sidebar (MODE AUTOMATIQUE SEULEMENT)
         if kp_threshold is None:  # Mode automatique
             lat_limit_auto = kp_zones.get(min_kp_auto, 66.5)
+            mlat_here = float(geomag.magnetic_latitude(lat, lon))
             
             # Message contextuel selon le Kp nécessaire
             if min_kp_auto <= 2:
                 st.sidebar.success(f"""
                  **Excellente localisation !**
                 
-                **{geo['name']} ({lat:.2f}°N)**
+                **{geo['name']} ({geomag.format_lat(lat)})**
                 - Seuil Kp automatique : **{min_kp_auto}**
-                - Limite latitude : {lat_limit_auto:.1f}°N
+                - Latitude géomagnétique : {mlat_here:.1f}° (limite {lat_limit_auto:.1f}°)
                 - Aurores fréquentes (Kp ≥ {min_kp_auto})
                 """)
             elif min_kp_auto <= 5:
                 st.sidebar.info(f"""
                  **Bonne localisation**
                 
-                **{geo['name']} ({lat:.2f}°N)**
+                **{geo['name']} ({geomag.format_lat(lat)})**
                 - Seuil Kp automatique : **{min_kp_auto}**
-                - Limite latitude : {lat_limit_auto:.1f}°N
+                - Latitude géomagnétique : {mlat_here:.1f}° (limite {lat_limit_auto:.1f}°)
                 - Aurores régulières (Kp ≥ {min_kp_auto})
                 """)
             elif min_kp_auto <= 7:
                 st.sidebar.warning(f"""
                  **Aurores rares ici**
                 
-                **{geo['name']} ({lat:.2f}°N)**
+                **{geo['name']} ({geomag.format_lat(lat)})**
                 - Seuil Kp automatique : **{min_kp_auto}**
-                - Limite latitude : {lat_limit_auto:.1f}°N
+                - Latitude géomagnétique : {mlat_here:.1f}° (limite {lat_limit_auto:.1f}°)
                 - Tempêtes nécessaires (Kp ≥ {min_kp_auto})
                 """)
             else:
                 st.sidebar.error(f"""
                  **Aurores très rares**
                 
-                **{geo['name']} ({lat:.2f}°N)**
+                **{geo['name']} ({geomag.format_lat(lat)})**
                 - Seuil Kp automatique : **{min_kp_auto}**
-                - Limite latitude : {lat_limit_auto:.1f}°N
+                - Latitude géomagnétique : {mlat_here:.1f}° (limite {lat_limit_auto:.1f}°)
                 - Événements extrêmes (Kp ≥ {min_kp_auto})
                 
                  Conseil : Voyagez plus au nord !
                 """)
         
         # Vérifier si on doit envoyer une alerte
-        if kp_now and should_send_alert(kp_now, kp_threshold_final, st.session_state.last_alert_time, cooldown_hours):
+        if kp_score and should_send_alert(kp_score, kp_threshold_final, st.session_state.last_alert_time, cooldown_hours):
             smtp_config = {
                 'smtp_server': st.secrets['email']['smtp_server'],
                 'smtp_port': st.secrets['email']['smtp_port'],
@@ -499,125 +566,125 @@ if alerts_enabled and email_config_ok and recipient_email and validate_email(rec
             
             with st.spinner(" Envoi de l'alerte..."):
                 success, message = send_aurora_alert_email(
-                    recipient_email, kp_now, f"{geo['name']}, {geo['country']}",
+                    recipient_email, kp_score, f"{geo['name']}, {geo['country']}",
                     score, cloud_now, dark, smtp_config,
-                    min_kp_auto
+                    min_kp_auto, hemisphere_of(lat), kp_anticipe
                 )
             
             if success:
-                st.session_state.last_alert_time = pd.Timestamp.now()
+                st.session_state.last_alert_time = dt.datetime.now()
                 st.session_state.alerts_sent_count += 1
-                st.sidebar.success(f" Alerte envoyée ! Kp={kp_now:.1f}")
+                st.sidebar.success(f" Alerte envoyée ! Kp={kp_score:.1f}"
+                                   + (f" attendu dans ~{kp_anticipe['lead_min']} min" if kp_anticipe else ""))
             else:
                 st.sidebar.error(f" {message}")
         else:
             # Afficher temps restant si cooldown actif
-            if st.session_state.last_alert_time and kp_now and kp_now >= kp_threshold_final:
-                time_since = (pd.Timestamp.now() - st.session_state.last_alert_time).total_seconds() / 3600
+            if st.session_state.last_alert_time and kp_score and kp_score >= kp_threshold_final:
+                time_since = (dt.datetime.now() - st.session_state.last_alert_time).total_seconds() / 3600
                 time_left = max(0, cooldown_hours - time_since)
                 if time_left > 0:
                     st.sidebar.info(f" Prochaine alerte dans {time_left:.1f}h")
             
             
 
-# -----------------------------
-# En-tête
-# -----------------------------
-st.title("Aura Hunter")
-st.caption(f"📍 Localisation : **{geo['name']}** ({geo['country']}) — lat {lat:.3f}, lon {lon:.3f}, fuseau horaire {tz}")
 
-# -----------------------------
-# Onglets
-# -----------------------------
-# APRÈS (7 onglets)
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
-    " Vue d'ensemble",
-    " Carte mondiale",  # ← NOUVEAU
-    " Météo actuelle", 
-    " Prévisions météo", 
-    " Webcams", 
-    " Prévisions aurores", 
-    " À propos"
-])
-
-
-kp_series = pd.DataFrame()  # toujours défini, même si la récupération échoue
-try:
-    kp_series = get_kp_series(limit_minutes=240)  # dernières ~4 heures
-except Exception as e:
-    st.warning(f" Impossible de récupérer la série Kp : {e}")
+# Rafraîchissement par fragment (secondes) : à chaque tick, seul l'onglet
+# affiché se réexécute, et ne reconstruit ses figures que si la version des
+# données sous-jacentes (model.cache) a changé.
+KP_REFRESH_S = 30            # jauges Kp et historique (lecture du flux live, en mémoire)
+ANIMATION_REFRESH_S = 300    # animation OVATION (créneaux de 5 min)
+FORECAST_REFRESH_S = 3600    # prévisions météo
+
+def memo_rendu(nom, version, build):
+    """Renvoie l'objet `nom` de la session, reconstruit par `build()` seulement si `version` a changé."""
+    memo = st.session_state.setdefault("_rendus", {})
+    if nom not in memo or memo[nom][0] != version:
+        memo[nom] = (version, build())
+    return memo[nom][1]
 
 
 # -------- Vue d'ensemble --------
-with tab1:
+@st.fragment(run_every=KP_REFRESH_S)
+@profiler.timed("tab.overview")
+def render_overview():
+    import numpy as np
+    import pandas as pd
+
+    # Kp en direct : la session ne lit que le delta du flux partagé depuis la
+    # dernière séquence affichée (aucun appel externe à chaque tick)
+    etat = st.session_state.setdefault("kp_live", {"seq": 0, "rows": []})
+    with profiler.section("data.kp_live"):
+        seq, delta, complet = live.get_feed().since(etat["seq"])
+    if complet:
+        etat["rows"] = delta
+    elif delta:
+        rows = etat["rows"] + delta
+        cutoff = rows[-1][0] - dt.timedelta(minutes=live.WINDOW_MINUTES)
+        etat["rows"] = [r for r in rows if r[0] >= cutoff]
+    etat["seq"] = seq
+
+    kp_series = pd.DataFrame()  # toujours défini, même si la récupération échoue
+    if etat["rows"]:
+        times, kp_index, estimated = zip(*etat["rows"])
+        kp_series = pd.DataFrame({
+            "time_tag": pd.DatetimeIndex(times),
+            "kp_index": np.array(kp_index, dtype=np.float32),
+            "estimated_kp": np.array(estimated, dtype=np.float32),
+        })
+    else:
+        # Flux indisponible : série en cache (5 min)
+        try:
+            with profiler.section("data.kp_series"):
+                kp_series = get_kp_series(limit_minutes=240)  # dernières ~4 heures
+        except Exception as e:
+            st.warning(f" Impossible de récupérer la série Kp : {e}")
+
+    # Jauge Kp : dernière valeur estimée à la minute (libellée « direct »), sinon Kp
+    # planétaire du rerun complet. Le score est celui de l'en-tête, de l'instantané
+    # et des alertes (Kp planétaire anticipé par le vent solaire) : une seule source.
+    direct = bool(etat["rows"])
+    kp = etat["rows"][-1][2] if direct else kp_now
+    prevision, anticipe = nowcast, kp_anticipe
+
     st.subheader(" Vue d'ensemble")
     st.markdown(" ")
     
-    # --- Jauge Indice Kp ---
-    fig_kp = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=kp_now if kp_now is not None else 0,
-        number={'valueformat': '.1f'},
-        title={'text': "Indice Kp"},
-        gauge={
-            "axis": {"range": [0, 9]},
-            "bar": {"thickness": 0.30, "color": "white"},
-            "steps": [
-                {"range": [0, 3], "color": "#c0392b"},
-                {"range": [3, 6], "color": "#e3b505"},
-                {"range": [6, 9], "color": "#2e8540"},
-            ],
-        }
-    ))
-    fig_kp.update_layout(height=250, margin=dict(l=25,r=25,t=30,b=10))
-
-    # --- Jauge Ciel dégagé ---
-    fig_cloud = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=100 - (cloud_now if cloud_now is not None else 100),
-        number={'suffix': "%"},
-        title={'text': "Ciel dégagé %"},
-        gauge={
-            "axis": {"range": [0, 100]},
-            "bar": {"thickness": 0.30, "color": "white"},
-            "steps": [
-                {"range": [0, 30], "color": "#c0392b"},
-                {"range": [30, 70], "color": "#e3b505"},
-                {"range": [70, 100], "color": "#2e8540"},
-            ]
-        }
-    ))
-    fig_cloud.update_layout(height=250, margin=dict(l=25,r=25,t=30,b=10))
-
-    # --- Jauge Score de probabilité ---
-    fig_score = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=score,
-        number={'valueformat': '.2f'},
-        title={'text': f"Score de Probabilité {score_label(score)}"},
-        gauge={
-            "axis": {"range": [0, 1]},
-            "bar": {"thickness": 0.30, "color": "white"},
-            "steps": [
-                {"range": [0, 0.4], "color": "#c0392b"},
-                {"range": [0.4, 0.7], "color": "#e3b505"},
-                {"range": [0.7, 1.0], "color": "#2e8540"},
-            ]
-        }
-    ))
-    fig_score.update_layout(height=250, margin=dict(l=25,r=25,t=30,b=10))
+    # Jauges reconstruites seulement si Kp, la météo ou le score ont changé
+    fig_kp, fig_cloud, fig_score = memo_rendu(
+        "overview.gauges",
+        (cache.data_version("kp_live", cache.weather_source(lat, lon)), kp, direct, cloud_now, dark, score),
+        # précalculées pour les localisations fréquentes (model.snapshot)
+        lambda: (snapshot.prebuilt(place_en, "gauges", snapshot.token(kp, cloud_now, score, direct))
+                 or figures_jauges(kp, cloud_now, score, direct))
+    )
 
 
     # Disposition avec espacement (5 colonnes)
     col1, col_sp1, col2, col_sp2, col3 = st.columns([1, 0.2, 1, 0.2, 1])
 
-    col1.plotly_chart(fig_kp, use_container_width=True)
+    with profiler.section("plotly.gauges"):
+        col1.plotly_chart(fig_kp, use_container_width=True)
+        col2.plotly_chart(fig_cloud, use_container_width=True)
+        col3.plotly_chart(fig_score, use_container_width=True)
+
     col1.caption(" **Indice Kp** : Mesure l'activité géomagnétique. Plus il est élevé, plus les aurores sont visibles au sud.")
-    
-    col2.plotly_chart(fig_cloud, use_container_width=True)
+    if direct and kp_now is not None:
+        col1.caption(f"Estimation à la minute (NOAA) ; le score utilise le Kp planétaire ({kp_now:.1f})"
+                     + (", anticipé par le vent solaire." if anticipe else "."))
+    if prevision:
+        arrivee = pd.Timestamp(prevision["arrival"]).tz_convert(tz)
+        vent = (f"vent solaire {prevision['speed']:.0f} km/s" if prevision["speed"] is not None else "vent solaire")
+        vent += f", Bz {prevision['bz']:+.1f} nT" if prevision["bz"] is not None else ""
+        texte = (f" **Kp attendu ≈ {prevision['kp']:.1f}** vers {arrivee:%H:%M} (dans ~{prevision['lead_min']} min) — "
+                 f"{vent}, mesuré au point L1.")
+        if anticipe:
+            st.warning(texte + " Le score en tient compte.")
+        else:
+            st.caption(texte)
     col2.caption(" **Ciel dégagé** : Pourcentage de ciel sans nuages. 70%+ = bonnes conditions d'observation.")
-    
-    col3.plotly_chart(fig_score, use_container_width=True)
+    if cloud_climato:
+        col2.caption(" Prévision indisponible : moyenne climatologique du mois.")
     col3.caption(" **Score global** : Combine Kp, météo et obscurité. 0.7+ = excellentes conditions !")
 
 
@@ -633,13 +700,17 @@ with tab1:
     
     with st.expander(" Historique récent de l'indice Kp (4 dernières heures)"):
         if not kp_series.empty:
-            # Graphique linéaire
-            fig_kp_line = px.line(
-                kp_series, x="time_tag", y="kp_index",
-                labels={"time_tag": "Temps (UTC)", "kp_index": "Indice Kp (1-min)"},
-                title="Indice Kp (1 minute) — récent"
+            # Graphique linéaire (reconstruit à chaque nouvelle version de la série)
+            fig_kp_line = memo_rendu(
+                "overview.kp_history",
+                (etat["seq"], cache.data_version("kp_series")),
+                lambda: figure_colonnes(
+                    kp_series, ["kp_index"], "Indice Kp (1 minute) — récent", "Indice Kp (1-min)",
+                    x="time_tag", x_titre="Temps (UTC)"
+                )
             )
-            st.plotly_chart(fig_kp_line, use_container_width=True)
+            with profiler.section("plotly.kp_history"):
+                st.plotly_chart(fig_kp_line, use_container_width=True)
 
             # Tableau
             st.dataframe(kp_series.tail(20), use_container_width=True)
@@ -665,12 +736,30 @@ with tab1:
 # ============================================
 # Villes principales + recherche personnalisée
 
-with tab2:
+@st.fragment
+@profiler.timed("tab.map")
+def render_map():
+    import pandas as pd
+    from model.maps import HEMISPHERE_CITIES, build_kp_map, visibility_overlay
+    from model.ovation import get_grid
+
     st.subheader(" Carte Mondiale des Probabilités d'Aurores")
     st.markdown(" ")
     
     # Récupérer l'indice Kp actuel
     kp_display = kp_now if kp_now is not None else 0
+
+    # Hémisphère affiché : par défaut celui de la localisation
+    mlat_here = float(geomag.magnetic_latitude(lat, lon))
+    hemi = st.radio(
+        "Hémisphère",
+        ["north", "south"],
+        index=0 if geomag.hemisphere(mlat_here) == "north" else 1,
+        format_func={"north": "Nord (aurores boréales)", "south": "Sud (aurores australes)"}.get,
+        horizontal=True,
+        key="carte_hemi",
+    )
+    nom_hemi = "nord" if hemi == "north" else "sud"
     
     # En-tête stylé
     col_info1, col_info2 = st.columns([3, 1])
@@ -681,7 +770,7 @@ with tab2:
                     padding: 20px; border-radius: 10px; color: white;">
             <h3 style="margin: 0; color: white;"> Indice Kp Actuel : {kp_display:.1f}</h3>
             <p style="margin: 5px 0 0 0; font-size: 14px;">
-                Carte de l'hémisphère nord - Recherchez votre ville !
+                Carte de l'hémisphère {nom_hemi} - Recherchez votre ville !
             </p>
         </div>
         """, unsafe_allow_html=True)
@@ -736,20 +825,12 @@ with tab2:
     
     
     
-    lat_limit = kp_zones.get(int(kp_display), 66.5)
+    # Limite de visibilité en latitude géomagnétique (interpolée entre les Kp entiers),
+    # la même au nord et au sud
+    lat_limit = float(geomag.kp_limit(kp_display))
     
     # Villes principales (toujours affichées)
-    villes_principales = [
-        {"name": "Longyearbyen", "lat": 78.22, "lon": 15.63, "emoji": "🇳🇴", "type": "principale"},
-        {"name": "Tromsø", "lat": 69.65, "lon": 18.96, "emoji": "🇳🇴", "type": "principale"},
-        {"name": "Reykjavik", "lat": 64.13, "lon": -21.89, "emoji": "🇮🇸", "type": "principale"},
-        {"name": "Stockholm", "lat": 59.33, "lon": 18.07, "emoji": "🇸🇪", "type": "principale"},
-        {"name": "Oslo", "lat": 59.91, "lon": 10.75, "emoji": "🇳🇴", "type": "principale"},
-        {"name": "Édimbourg", "lat": 55.95, "lon": -3.19, "emoji": "🏴󠁧󠁢󠁳󠁣󠁴󠁿", "type": "principale"},
-        {"name": "Londres", "lat": 51.51, "lon": -0.13, "emoji": "🇬🇧", "type": "principale"},
-        {"name": "Paris", "lat": 48.85, "lon": 2.35, "emoji": "🇫🇷", "type": "principale"},
-        {"name": "Berlin", "lat": 52.52, "lon": 13.40, "emoji": "🇩🇪", "type": "principale"},
-    ]
+    villes_principales = HEMISPHERE_CITIES[hemi]
     
     # Villes recherchées (si l'utilisateur en a ajouté)
     villes_recherchees = []
@@ -773,7 +854,7 @@ with tab2:
                 
                 # Appel API Open-Meteo Geocoding
                 url_geo = f"https://geocoding-api.open-meteo.com/v1/search?name={ville_nom_en}&count=1&language=en&format=json"
-                resp = requests.get(url_geo, timeout=10)
+                resp = upstream.get("geocode", url_geo, timeout=10)
                 data = resp.json()
                 
                 if data.get("results"):
@@ -831,157 +912,31 @@ with tab2:
     toutes_villes = villes_principales + villes_recherchees
     
     # ============================================
-    # CARTE FOCALISÉE SUR HÉMISPHÈRE NORD
+    # CARTE FOCALISÉE SUR L'HÉMISPHÈRE CHOISI
     # ============================================
     
-    fig = go.Figure()
-    
-    # Créer des bandes de latitude colorées DENSES
-    latitudes = list(range(85, 39, -1))
-    
-    for i, lat in enumerate(latitudes):
-        if lat >= lat_limit:
-            distance = lat - lat_limit
-            intensity = 0.4 + (distance / 60) * 0.6
-            color = f'rgba(46, 133, 64, {intensity})'
-        else:
-            distance = lat_limit - lat
-            intensity = 0.7 - (distance / 25) * 0.3
-            color = f'rgba(192, 57, 43, {intensity})'
-        
-        fig.add_trace(go.Scattergeo(
-            lon=[-180, -180, 180, 180, -180],
-            lat=[lat, lat+1, lat+1, lat, lat],
-            mode='lines',
-            fill='toself',
-            fillcolor=color,
-            line=dict(width=0),
-            showlegend=False,
-            hoverinfo='skip'
-        ))
-    
-    # Ligne de limite
-    fig.add_trace(go.Scattergeo(
-        lon=list(range(-180, 181, 3)),
-        lat=[lat_limit] * 121,
-        mode='lines',
-        line=dict(color='gold', width=6),
-        name=f' Limite Kp {kp_display:.1f}',
-        hovertemplate=f'<b>Limite de visibilité</b><br>Latitude: {lat_limit:.1f}°N<extra></extra>'
-    ))
-    
-    # Afficher TOUTES les villes (principales + recherchées)
-    for ville in toutes_villes:
-        visible = ville["lat"] >= lat_limit
-        
-        # Style selon type de ville avec couleurs conditionnelles
-        if ville["type"] == "principale":
-            marker_color = "#2e8540" if visible else "#c0392b"  # Vert ou Rouge
-            marker_size = 16 if visible else 12
-            marker_symbol = 'circle'
-            text_size = 12
-        else:  # Ville recherchée
-            marker_color = "#e3b505" if visible else "#e67e22"  # Jaune ou Orange
-            marker_size = 14
-            marker_symbol = 'diamond'
-            text_size = 11
-        
-        fig.add_trace(go.Scattergeo(
-            lon=[ville["lon"]],
-            lat=[ville["lat"]],
-            mode='markers+text',
-            marker=dict(
-                size=marker_size,
-                color=marker_color,
-                symbol=marker_symbol,
-                line=dict(width=3, color='white')
-            ),
-            text=[f"{ville['emoji']}<br><b>{ville['name']}</b>"],
-            textposition='top center',
-            textfont=dict(size=text_size, color='black', family='Arial Black'),
-            name=ville["name"],
-            showlegend=False,
-            hovertemplate=f"<b>{ville['emoji']} {ville['name']}</b><br>" +
-                         f"Type: {'Principale' if ville['type'] == 'principale' else 'Personnalisée'}<br>" +
-                         f"Latitude: {ville['lat']:.2f}°N<br>" +
-                         f"<b>Aurores: {' VISIBLES' if visible else ' NON VISIBLES'}</b><extra></extra>"
-        ))
-    
-    # Votre localisation actuelle (toujours affichée)
-    # fig.add_trace(go.Scattergeo(
-        # lon=[lon],
-        # lat=[lat],
-        # mode='text',
-        # marker=dict(
-            #size=30,
-            #color='yellow',
-            #symbol='star',
-            #line=dict(width=4, color='black')
-        #),
-        #text=[f"📍<br><b>{geo['name']}</b>"],
-        #textposition='top center',
-        #textfont=dict(size=14, color='black', family='Arial Black'),
-        #name='Votre localisation',
-        #hovertemplate=f"<b>📍 {geo['name']}</b><br>" +
-                     #f"Latitude: {lat:.2f}°N<br>" +
-                     #f"Longitude: {lon:.2f}°E<br>" +
-                     #f"<b>{' AURORES VISIBLES' if lat >= lat_limit else ' NON VISIBLES'}</b><extra></extra>"
-    #))
-    
-    # Configuration
-    fig.update_layout(
-        title=dict(
-            text=f" Visibilité des Aurores Boréales (Kp = {kp_display:.1f})",
-            x=0.5,
-            xanchor='center',
-            font=dict(size=24, family='Arial Black', color='#2e8540')
-        ),
-        geo=dict(
-            projection_type='mercator',
-            showland=True,
-            landcolor='rgb(245, 245, 245)',
-            coastlinecolor='rgb(80, 80, 80)',
-            coastlinewidth=1.5,
-            showocean=True,
-            oceancolor='rgb(210, 235, 255)',
-            showcountries=True,
-            countrycolor='rgb(120, 120, 120)',
-            countrywidth=1,
-            showlakes=True,
-            lakecolor='rgb(210, 235, 255)',
-            lataxis=dict(
-                range=[40, 85],
-                showgrid=True,
-                gridcolor='rgb(200, 200, 200)',
-                gridwidth=0.5
-            ),
-            lonaxis=dict(
-                range=[-180, 180],
-                showgrid=True,
-                gridcolor='rgb(200, 200, 200)',
-                gridwidth=0.5
-            ),
-            bgcolor='rgba(240, 248, 255, 1)',
-            projection_scale=1.5,
-        ),
-        height=800,
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=-0.05,
-            xanchor="center",
-            x=0.5,
-            bgcolor='rgba(255, 255, 255, 0.95)',
-            bordercolor='#2e8540',
-            borderwidth=2,
-            font=dict(size=13)
-        ),
-        margin=dict(l=10, r=10, t=80, b=20),
-        paper_bgcolor='rgba(240, 248, 255, 1)'
-    )
+    # Zone d'aurores : grille OVATION rastérisée une fois par mise à jour du modèle
+    overlay = None
+    try:
+        grid = get_grid()
+        with profiler.section("map.overlay"):
+            overlay = visibility_overlay(grid)
+        st.caption(f"Probabilités OVATION (NOAA SWPC) — prévision {grid['forecast_time']}, "
+                   f"observation {grid['observation_time']}")
+    except Exception as e:
+        st.warning(f" Grille OVATION indisponible, carte sans zone d'aurores : {e}")
+
+    with profiler.section("figure.map"):
+        # une figure mémorisée par hémisphère : basculer de l'un à l'autre ne reconstruit rien
+        fig = memo_rendu(
+            f"carte_{hemi}",
+            (cache.data_version("ovation_grid"), overlay is None, kp_display, lat_limit,
+             tuple((v["name"], v["lat"], v["lon"]) for v in toutes_villes)),
+            lambda: build_kp_map(kp_display, lat_limit, toutes_villes, overlay, hemi),
+        )
     
-    st.plotly_chart(fig, use_container_width=True)
+    with profiler.section("plotly.map"):
+        st.plotly_chart(fig, use_container_width=True)
     
     st.markdown("---")
     
@@ -994,21 +949,22 @@ with tab2:
     with col_stat1:
         st.metric(
             " Latitude Limite",
-            f"{lat_limit:.1f}°N",
-            delta=f"Kp {kp_display:.1f}"
+            f"{lat_limit:.1f}° mag.",
+            delta=f"Kp {kp_display:.1f}",
+            help="Latitude géomagnétique (dipôle) : l'ovale auroral est centré sur le pôle géomagnétique"
         )
     
     with col_stat2:
-        distance_km = abs(lat - lat_limit) * 111
+        distance_km = abs(abs(mlat_here) - lat_limit) * 111
         
         # Déterminer la direction selon la position
-        if lat >= lat_limit:
+        if abs(mlat_here) >= lat_limit:
             # Vous êtes DANS la zone visible
             direction = "dans la zone "
             delta_color = "normal"
         else:
-            # Vous êtes EN DEHORS (trop au sud)
-            direction = "vers le nord ⬆"
+            # Vous êtes EN DEHORS (trop près de l'équateur)
+            direction = "vers le nord ⬆" if mlat_here >= 0 else "vers le sud ⬇"
             delta_color = "inverse"
         
         st.metric(
@@ -1019,7 +975,7 @@ with tab2:
         )
     
     with col_stat3:
-        visible_text = "OUI " if lat >= lat_limit else "NON "
+        visible_text = "OUI " if abs(mlat_here) >= lat_limit else "NON "
         st.metric(
             " Aurores Ici",
             visible_text,
@@ -1027,7 +983,7 @@ with tab2:
         )
     
     with col_stat4:
-        villes_visibles = sum(1 for v in toutes_villes if v['lat'] >= lat_limit)
+        villes_visibles = int(geomag.visible(geomag.catalog_latitudes(toutes_villes), kp_display).sum())
         st.metric(
             " Villes Visibles",
             f"{villes_visibles}/{len(toutes_villes)}",
@@ -1050,8 +1006,8 @@ with tab2:
                     padding: 15px; border-radius: 10px; text-align: center; color: white; height: 130px;
                     display: flex; flex-direction: column; justify-content: center;">
             <div style="font-size: 30px; margin-bottom: 5px;"></div>
-            <b style="font-size: 14px;">Zone Verte</b><br/>
-            <small>Aurores visibles</small>
+            <b style="font-size: 14px;">Ovale OVATION</b><br/>
+            <small>Vert → rouge : probabilité croissante</small>
         </div>
         """, unsafe_allow_html=True)
     
@@ -1072,8 +1028,8 @@ with tab2:
                     padding: 15px; border-radius: 10px; text-align: center; color: white; height: 130px;
                     display: flex; flex-direction: column; justify-content: center;">
             <div style="font-size: 30px; margin-bottom: 5px;"></div>
-            <b style="font-size: 14px;">Zone Rouge</b><br/>
-            <small>Aurores invisibles</small>
+            <b style="font-size: 14px;">Villes en Rouge</b><br/>
+            <small>Sous la limite Kp : aurores invisibles</small>
         </div>
         """, unsafe_allow_html=True)
     
@@ -1084,7 +1040,7 @@ with tab2:
                     display: flex; flex-direction: column; justify-content: center;">
             <div style="font-size: 30px; margin-bottom: 5px;"></div>
             <b style="font-size: 14px;">Villes Principales</b><br/>
-            <small>Cercles noirs</small>
+            <small>Cercles verts / rouges</small>
         </div>
         """, unsafe_allow_html=True)
     
@@ -1095,7 +1051,7 @@ with tab2:
                     display: flex; flex-direction: column; justify-content: center;">
             <div style="font-size: 30px; margin-bottom: 5px;"></div>
             <b style="font-size: 14px;">Villes Perso</b><br/>
-            <small>Losanges dorés</small>
+            <small>Cercles jaunes / orange</small>
         </div>
         """, unsafe_allow_html=True)
     
@@ -1109,8 +1065,7 @@ with tab2:
     
     interpretation_data = {
         "Kp": [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
-        "Latitude": ["66.5°N", "64.5°N", "62.4°N", "60.4°N", "58.3°N", 
-                     "56.3°N", "54.2°N", "52.2°N", "50.1°N", "48.1°N"],
+        "Latitude géomagnétique": [f"{kp_zones[k]:.1f}°" for k in range(10)],
         "Régions Visibles": [
             "🇬🇱 Groenland, Svalbard",
             "🇮🇸 Islande, Nord Norvège",
@@ -1122,6 +1077,17 @@ with tab2:
             "🇬🇧 Londres, Amsterdam",
             "🇧🇪 Bruxelles, Nord France",
             "🇫🇷 Paris, Sud Allemagne"
+        ] if hemi == "north" else [
+            "🇦🇶 Côtes de l'Antarctique",
+            "🇦🇺 Île Macquarie",
+            "🇦🇶 Bases antarctiques côtières",
+            "🇳🇿 Îles Campbell et Auckland",
+            "🇳🇿 Sud de l'île Stewart",
+            "🇦🇺 Tasmanie, 🇳🇿 Invercargill",
+            "🇳🇿 Dunedin, 🇫🇷 Kerguelen",
+            "🇦🇺 Melbourne, 🇳🇿 Christchurch",
+            "🇳🇿 Wellington",
+            "🇦🇺 Adélaïde, Sydney (exceptionnel)"
         ],
         "Fréquence": [
             "Quotidien",
@@ -1156,20 +1122,237 @@ with tab2:
     
     # Message contextuel
     if kp_display >= 7:
-        st.success(f" **CONDITIONS EXCEPTIONNELLES !** Aurores jusqu'à {lat_limit:.1f}°N")
+        st.success(f" **CONDITIONS EXCEPTIONNELLES !** Aurores jusqu'à {lat_limit:.1f}° mag.")
     elif kp_display >= 5:
-        st.warning(f" **BONNES CONDITIONS !** Aurores jusqu'à {lat_limit:.1f}°N")
+        st.warning(f" **BONNES CONDITIONS !** Aurores jusqu'à {lat_limit:.1f}° mag.")
     elif kp_display >= 3:
-        st.info(f" **CONDITIONS NORMALES** Aurores jusqu'à {lat_limit:.1f}°N")
+        st.info(f" **CONDITIONS NORMALES** Aurores jusqu'à {lat_limit:.1f}° mag.")
     else:
-        st.info(f" **ACTIVITÉ FAIBLE** Limité aux régions polaires ({lat_limit:.1f}°N+)")
+        st.info(f" **ACTIVITÉ FAIBLE** Limité aux régions polaires ({lat_limit:.1f}° mag.+)")
     
     st.markdown("---")
     st.caption(" Source : NOAA SWPC + Géocodage Open-Meteo")
 
 
+# -------- Comparaison de localisations --------
+COMPARE_MAX_CUSTOM = 5       # lieux saisis librement, géocodés un par un (cache partagé)
+
+@st.fragment
+@profiler.timed("tab.compare")
+def render_compare():
+    import pandas as pd
+    import plotly.graph_objects as go
+
+    from model.compare import WINDOW_H, compare_locations
+
+    st.subheader(" Comparer des localisations")
+    st.caption(f"Meilleure fenêtre de {WINDOW_H} h pour chaque lieu : Kp prévu (NOAA), nébulosité "
+               "(Open-Meteo, une seule requête pour tous les lieux) et obscurité, avec les poids de la barre latérale.")
+
+    ici = f"{geo['name']}, {geo['country']}"
+    col_lieux, col_horizon = st.columns([4, 1])
+    with col_lieux:
+        choix = st.multiselect("Localisations", list(QUICK_LOCATIONS),
+                               default=list(QUICK_LOCATIONS)[:5], key="compare_lieux")
+        autres = st.text_input(f"Autres lieux (séparés par « ; », {COMPARE_MAX_CUSTOM} max.)",
+                               key="compare_autres", placeholder="Reykjavik, Islande; Yellowknife, Canada")
+    with col_horizon:
+        horizon = st.selectbox("Horizon", HORIZONS_H, index=len(HORIZONS_H) - 1,
+                               format_func=lambda h: f"{h} h", key="compare_horizon")
+        avec_ici = st.checkbox("Inclure ma localisation", value=True, key="compare_ici")
+
+    lieux = [(nom, *QUICK_LOCATIONS[nom]) for nom in choix]
+    if avec_ici and ici not in choix:
+        lieux.insert(0, (ici, lat, lon))
+    saisis = [n.strip() for n in autres.split(";") if n.strip()]
+    for nom in saisis[:COMPARE_MAX_CUSTOM]:
+        with profiler.section("data.geocode"):
+            g = geocode_place(translate_country_to_english(nom))
+        if g:
+            lieux.append((f"{g['name']}, {g['country']}", g["lat"], g["lon"]))
+        else:
+            st.warning(f" Localisation « {nom} » introuvable, ignorée.")
+    if len(saisis) > COMPARE_MAX_CUSTOM:
+        st.info(f" Seuls les {COMPARE_MAX_CUSTOM} premiers lieux saisis sont comparés.")
+    lieux = list({nom: (nom, la, lo) for nom, la, lo in lieux}.values())    # doublons éventuels
+    if not lieux:
+        st.info(" Choisissez au moins une localisation.")
+        return
+
+    try:
+        with profiler.section("data.compare"):
+            res = compare_locations(lieux, horizon, (w_kp, w_sky, w_dark), kp_now=kp_now)
+    except Exception as e:
+        st.error(f" Comparaison indisponible : {e}")
+        return
+
+    def heure_locale(t):
+        return pd.Timestamp(t).tz_localize("UTC").tz_convert(tz)
+
+    classement = pd.DataFrame([{
+        "Localisation": r["name"],
+        "Début": heure_locale(r["start"]).strftime("%a %d %H:%M"),
+        "Fin": heure_locale(r["end"]).strftime("%H:%M"),
+        "Score": round(r["score"] * 100),
+        "Nuages (%)": None if r["cloud"] is None else round(r["cloud"]),
+        "Kp max": r["kp"],
+        "Heures sombres": f"{r['dark_h']}/{WINDOW_H}",
+        "Kp min. requis": r["min_kp"],
+        "Lat. mag.": f"{abs(r['mlat']):.1f}°",
+    } for r in res["ranking"]])
+    st.dataframe(
+        classement, use_container_width=True, hide_index=True,
+        column_config={
+            "Score": st.column_config.ProgressColumn("Score", min_value=0, max_value=100, format="%d %%"),
+            "Kp max": st.column_config.NumberColumn("Kp max", format="%.1f"),
+        },
+    )
+    st.caption(f"Heures dans le fuseau de votre localisation ({tz}).")
+
+    with profiler.section("figure.compare"):
+        ordre = [res["names"].index(r["name"]) for r in res["ranking"]]
+        fig = memo_rendu(
+            "comparaison",
+            (tuple(res["names"]), str(res["times"][0]), hash(res["score"].tobytes()), tz),
+            lambda: go.Figure(
+                go.Heatmap(
+                    z=res["score"][ordre] * 100,
+                    x=pd.DatetimeIndex(res["times"]).tz_localize("UTC").tz_convert(tz),
+                    y=[res["names"][i] for i in ordre],
+                    zmin=0, zmax=100, colorscale="Viridis",
+                    colorbar=dict(title="Score"),
+                    hovertemplate="%{y}<br>%{x|%a %d %H:%M}<br>Score : %{z:.0f}<extra></extra>",
+                ),
+                layout=dict(title="Score heure par heure", xaxis_title="Heure locale",
+                            yaxis=dict(autorange="reversed"), height=120 + 32 * len(ordre),
+                            margin=dict(l=10, r=10, t=50, b=40)),
+            ),
+        )
+    with profiler.section("plotly.compare"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    render_best_months(lieux)
+    render_clear_sky(horizon)
+
+
+def render_best_months(lieux):
+    """Meilleur mois pour venir (section de l'onglet Comparer) : climatologie locale, sans appel réseau."""
+    import numpy as np
+    import plotly.graph_objects as go
+
+    st.markdown("---")
+    st.subheader(" Meilleur mois pour venir")
+    table = climatology.load()
+    if table is None:
+        st.info(" Climatologie absente : construisez-la avec `python -m model.climatology`.")
+        return
+
+    with profiler.section("data.best_months"):
+        indice = climatology.best_months([la for _, la, _ in lieux], [lo for _, _, lo in lieux], table)
+    if np.isnan(indice).all():
+        st.info(" Aucune de ces localisations n'est couverte par la climatologie.")
+        return
+    fig = memo_rendu(
+        "meilleurs_mois",
+        (tuple(lieux), id(table)),
+        lambda: go.Figure(
+            go.Heatmap(
+                z=indice * 100, x=list(climatology.MONTHS), y=[nom for nom, _, _ in lieux],
+                zmin=0, zmax=max(40, float(np.nanmax(indice)) * 100), colorscale="Viridis",
+                colorbar=dict(title="Indice"),
+                hovertemplate="%{y}<br>%{x} : %{z:.0f}<extra></extra>",
+            ),
+            layout=dict(title="Ciel dégagé × nuit noire, par mois", yaxis=dict(autorange="reversed"),
+                        height=120 + 32 * len(lieux), margin=dict(l=10, r=10, t=50, b=40)),
+        ),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    meilleurs = [f"**{nom}** : {climatology.MONTHS[int(np.nanargmax(ligne))]}"
+                 for (nom, _, _), ligne in zip(lieux, indice) if not np.isnan(ligne).all()]
+    st.markdown("Meilleur mois : " + " · ".join(meilleurs))
+    st.caption(f"Indice : probabilité d'une journée dégagée (nébulosité moyenne < {climatology.CLEAR_PCT} %, "
+               f"{table.years[0]}–{table.years[1]}) × part de nuit noire (soleil sous −12°) le 15 du mois.")
+
+
+def render_clear_sky(horizon):
+    """Ciel dégagé à proximité de la localisation (section de l'onglet Comparer)."""
+    import numpy as np
+    import pandas as pd
+    import plotly.graph_objects as go
+
+    from model.clearsky import WINDOW_H, nearest_clear_sky
+
+    st.markdown("---")
+    st.subheader(" Ciel dégagé à proximité")
+    rayon = st.select_slider("Rayon de recherche", options=[25, 50, 100, 150, 200], value=100,
+                             format_func=lambda km: f"{km} km", key="clear_rayon")
+    try:
+        with profiler.section("data.clear_sky"):
+            res = nearest_clear_sky(lat, lon, rayon, horizon, (w_kp, w_sky, w_dark), kp_now=kp_now)
+    except Exception as e:
+        st.error(f" Recherche indisponible : {e}")
+        return
+
+    def fenetre(r):
+        debut = pd.Timestamp(r["start"]).tz_localize("UTC").tz_convert(tz)
+        fin = pd.Timestamp(r["end"]).tz_localize("UTC").tz_convert(tz)
+        return f"{debut:%a %d %H:%M} – {fin:%H:%M}"
+
+    ici = res["here"]
+    nuages_ici = "nébulosité inconnue" if ici["cloud"] is None else f"{ici['cloud']:.0f} % de nuages"
+    st.caption(f"{len(res['lat'])} points analysés à moins de {rayon} km. "
+               f"Ici : score {ici['score'] * 100:.0f}, {nuages_ici} ({fenetre(ici)}).")
+    if not res["spots"]:
+        st.success(" Aucun point à portée ne fait mieux que votre localisation.")
+        return
+
+    st.dataframe(
+        pd.DataFrame([{
+            "Distance": f"{r['distance_km']:.0f} km {r['direction']}",
+            "Fenêtre": fenetre(r),
+            "Score": round(r["score"] * 100),
+            "Nuages (%)": None if r["cloud"] is None else round(r["cloud"]),
+            "Heures sombres": f"{r['dark_h']}/{WINDOW_H}",
+            "Coordonnées": f"{r['lat']:.3f}, {r['lon']:.3f}",
+        } for r in res["spots"]]),
+        use_container_width=True, hide_index=True,
+        column_config={"Score": st.column_config.ProgressColumn("Score", min_value=0, max_value=100, format="%d %%")},
+    )
+
+    with profiler.section("figure.clear_sky"):
+        fig = memo_rendu(
+            "ciel_degage",
+            (lat, lon, rayon, hash(res["score"].tobytes())),
+            lambda: go.Figure(
+                [
+                    go.Scattermap(
+                        lat=res["lat"], lon=res["lon"], mode="markers", name="Points analysés",
+                        marker=dict(size=11, color=res["score"] * 100, cmin=0, cmax=100,
+                                    colorscale="Viridis", colorbar=dict(title="Score")),
+                        hovertemplate="%{lat:.2f}, %{lon:.2f}<br>Score : %{marker.color:.0f}<extra></extra>",
+                    ),
+                    go.Scattermap(
+                        lat=[r["lat"] for r in res["spots"]], lon=[r["lon"] for r in res["spots"]],
+                        mode="markers+text", name="Meilleurs points",
+                        text=[str(i) for i in range(1, len(res["spots"]) + 1)], textposition="top right",
+                        marker=dict(size=16, color="gold"), hoverinfo="skip",
+                    ),
+                    go.Scattermap(lat=[lat], lon=[lon], mode="markers", name="Votre localisation",
+                                  marker=dict(size=14, color="red"), hoverinfo="name"),
+                ],
+                layout=dict(map=dict(style="carto-positron", center=dict(lat=lat, lon=lon),
+                                     zoom=max(4.0, 9.3 - np.log2(rayon))),
+                            height=480, margin=dict(l=0, r=0, t=10, b=0),
+                            legend=dict(orientation="h", y=0)),
+            ),
+        )
+    with profiler.section("plotly.clear_sky"):
+        st.plotly_chart(fig, use_container_width=True)
+
+
 # -------- Météo actuelle (OpenWeatherMap) --------
-with tab3:
+@profiler.timed("tab.current_weather")
+def render_current_weather():
     st.subheader(" Météo Actuelle")
     st.markdown(" ")
     st.markdown(" ")
@@ -1246,7 +1429,15 @@ with tab3:
 
 
 # -------- Prévisions météo --------
-with tab4:
+@st.fragment(run_every=FORECAST_REFRESH_S)
+@profiler.timed("tab.forecast")
+def render_forecast():
+    # Prévisions relues à chaque tick (cache partagé de 30 min)
+    try:
+        wx, _ = load_weather(lat, lon, tz)
+    except Exception:
+        wx = None
+
     st.subheader(" Prévisions Météo (48 prochaines heures)")
     st.markdown(" ")
 
@@ -1271,121 +1462,39 @@ with tab4:
             st.markdown("**Choisissez les variables à explorer**")
             st.markdown(" ")
 
-            var_options = {
-                "Nuages totaux (%)": "cloud_total",
-                "Nuages bas (%)": "cloud_low",
-                "Nuages moyens (%)": "cloud_mid",
-                "Nuages hauts (%)": "cloud_high",
-                "Température (°C)": "temp_c",
-                "Point de rosée (°C)": "dewpoint_c",
-                "Humidité relative (%)": "rh_pct",
-                "Visibilité (km)": "visibility_km",
-                "Vent (m/s)": "wind_ms",
-                "Rafales (m/s)": "gust_ms",
-                "Précipitations (mm)": "precip_mm",
-                "Probabilité précip. (%)": "precip_prob",
-            }
-            default_vars = ["Nuages totaux (%)", "Probabilité précip. (%)", "Visibilité (km)"]
-
             picked_labels = st.multiselect(
                 "Variables",
-                options=list(var_options.keys()),
-                default=default_vars,
+                options=list(VARIABLES_METEO),
+                default=VARIABLES_DEFAUT,
                 max_selections=5,
                 help="Sélectionnez jusqu'à 5 variables à comparer sur la même chronologie."
             )
 
-            picked_cols = [var_options[lbl] for lbl in picked_labels] or ["cloud_total"]
-            pretty_map  = {v: k for k, v in var_options.items()}
+            picked_cols = [VARIABLES_METEO[lbl] for lbl in picked_labels] or ["cloud_total"]
 
             st.markdown(" ")
 
             # ---- Seuils d'observation optimaux
             st.markdown("**Fenêtres d'observation optimales**")
             st.markdown(" ")
-            cloud_thresh  = st.slider("Nuages max (%)", 0, 100, 40, 5)
-            precip_thresh = st.slider("Probabilité précip. max (%)", 0, 100, 20, 5)
-
-            best_df = wx.copy()
-            best_df["ok"] = (best_df["cloud_total"] <= cloud_thresh) & (best_df["precip_prob"] <= precip_thresh)
-            suggested = best_df.loc[
-                best_df["ok"], ["time", "cloud_total", "precip_prob", "visibility_km", "wind_ms"]
-            ]
-
-            # ---- Construction du DataFrame pour Plotly
-            plot_df = wx[["time"] + picked_cols].copy()
-            long_df = plot_df.melt(id_vars="time", var_name="variable", value_name="value")
-            long_df["variable"] = long_df["variable"].map(pretty_map)
-
-            # ---- Graphique Plotly interactif
-            fig = px.line(
-                long_df,
-                x="time", y="value", color="variable",
-                labels={"time": "Temps", "value": "", "variable": ""}
-            )
-
-            fig.update_layout(
-                title=dict(
-                    text="Explorateur Météo Interactif (48h)",
-                    x=0.0, xanchor="left",
-                    y=0.99, yanchor="top",
-                    font=dict(size=20)
-                ),
-                hovermode="x unified",
-                margin=dict(l=1, r=1, t=140, b=1),
-                legend=dict(orientation="h", y=1.1, yanchor="bottom", x=0, xanchor="left")
-            )
-
-            fig.update_xaxes(
-                rangeslider=dict(visible=True),
-                rangeselector=dict(
-                    x=0, xanchor="left",
-                    y=1.50, yanchor="top",
-                    buttons=[
-                        dict(count=6,  label="6h",  step="hour", stepmode="backward"),
-                        dict(count=12, label="12h", step="hour", stepmode="backward"),
-                        dict(count=24, label="24h", step="hour", stepmode="backward"),
-                        dict(step="all", label="Tout")
-                    ]
-                ),
-                title_standoff=12
-            )
+            cloud_thresh  = st.slider("Nuages max (%)", 0, 100, SEUILS_DEFAUT[0], 5)
+            precip_thresh = st.slider("Probabilité précip. max (%)", 0, 100, SEUILS_DEFAUT[1], 5)
 
-            # ---- Texte de survol personnalisé avec unités
-            units = {
-                "Nuages totaux (%)": "%",
-                "Nuages bas (%)": "%",
-                "Nuages moyens (%)": "%",
-                "Nuages hauts (%)": "%",
-                "Température (°C)": "°C",
-                "Point de rosée (°C)": "°C",
-                "Humidité relative (%)": "%",
-                "Visibilité (km)": " km",
-                "Vent (m/s)": " m/s",
-                "Rafales (m/s)": " m/s",
-                "Précipitations (mm)": " mm",
-                "Probabilité précip. (%)": "%"
-            }
-            for tr in fig.data:
-                label = tr.name
-                unit = units.get(label, "")
-                tr.update(hovertemplate=f"%{{x|%Y-%m-%d %H:%M}}<br>{label}: %{{y}}{unit}<extra></extra>")
+            ok = fenetres_observation(wx, cloud_thresh, precip_thresh)
+            suggested = wx.loc[ok, ["time", "cloud_total", "precip_prob", "visibility_km", "wind_ms"]]
 
-            # ---- Si nous avons des fenêtres suggérées, ajouter des marqueurs
-            if not suggested.empty:
-                anchor_series = pretty_map.get(picked_cols[0], "Nuages totaux (%)") if picked_cols else "Nuages totaux (%)"
-                xs = suggested["time"]
-                ys = long_df.loc[long_df["variable"] == anchor_series].set_index("time").reindex(xs)["value"]
-                fig.add_scatter(
-                    x=xs, y=ys,
-                    mode="markers", name="Suggéré",
-                    marker=dict(size=9, symbol="star", color="gold"),
-                    hovertemplate="%{x|%Y-%m-%d %H:%M}<br>Fenêtre suggérée<extra></extra>"
-                )
+            # ---- Graphique Plotly interactif : précalculé pour les localisations
+            # rapides dans la vue par défaut (model.snapshot), sinon construit ici
+            fig = None
+            if picked_labels == VARIABLES_DEFAUT and (cloud_thresh, precip_thresh) == SEUILS_DEFAUT:
+                fig = snapshot.prebuilt(place_en, "forecast", snapshot.weather_token(wx))
+            if fig is None:
+                fig = explorateur_meteo(wx, picked_cols, ok)
 
             # ---- Afficher le graphique
             st.markdown(" ")
-            st.plotly_chart(fig, use_container_width=True)
+            with profiler.section("plotly.forecast_explorer"):
+                st.plotly_chart(fig, use_container_width=True)
             st.markdown(" ")
             st.info(" **Lecture du graphique :** Recherchez les périodes où les nuages sont bas (<30%), les précipitations faibles (<20%) et la visibilité haute (>10km). Ces fenêtres sont marquées par des étoiles dorées.")
             st.caption(" Utilisez le curseur et les boutons pour zoomer/défiler.")
@@ -1426,10 +1535,8 @@ with tab4:
             left, right = st.columns(2)
 
             with left:
-                fig_total = px.line(
-                    wx, x="time", y="cloud_total",
-                    labels={"time": "Temps", "cloud_total": "Couverture nuageuse (%)"},
-                    title="Couverture Nuageuse Totale"
+                fig_total = figure_colonnes(
+                    wx, ["cloud_total"], "Couverture Nuageuse Totale", "Couverture nuageuse (%)", unite="%"
                 )
                 st.plotly_chart(fig_total, use_container_width=True)
                 st.info(" **Idéal pour les aurores :** Moins de 30% de nuages. Les aurores se produisent à 100-400 km d'altitude, bien au-dessus des nuages.")
@@ -1439,19 +1546,14 @@ with tab4:
                 st.caption(" Source de données : API Open-Meteo (temps réel).")
 
             with right:
-                layers = wx[["time", "cloud_low", "cloud_mid", "cloud_high"]].melt(
-                    id_vars="time", var_name="layer", value_name="cloud_pct"
-                )
                 layer_names = {
                     "cloud_low": "Nuages bas",
                     "cloud_mid": "Nuages moyens",
                     "cloud_high": "Nuages hauts"
                 }
-                layers["layer"] = layers["layer"].map(layer_names)
-                fig_stack = px.area(
-                    layers, x="time", y="cloud_pct", color="layer",
-                    labels={"time": "Temps", "cloud_pct": "Nuages (%)", "layer": "Couche"},
-                    title="Couches Nuageuses (Empilées)"
+                fig_stack = figure_colonnes(
+                    wx, list(layer_names), "Couches Nuageuses (Empilées)", "Nuages (%)",
+                    noms=layer_names, unite="%", empiler=True
                 )
                 st.plotly_chart(fig_stack, use_container_width=True)
                 st.info(" **Astuce :** Les nuages bas (0-2 km) bloquent le plus la vue. Les nuages hauts (6-12 km) sont souvent transparents aux aurores.")
@@ -1463,16 +1565,10 @@ with tab4:
         # 3) TEMPÉRATURE
         # =====================================================================
         with sub3:
-            fig_temp = px.line(
-                wx, x="time", y=["temp_c", "dewpoint_c"],
-                labels={"time": "Temps", "value": "°C", "variable": ""},
-                title="Température & Point de Rosée (°C)"
+            fig_temp = figure_colonnes(
+                wx, ["temp_c", "dewpoint_c"], "Température & Point de Rosée (°C)", "°C",
+                noms={'temp_c': 'Température', 'dewpoint_c': 'Point de rosée'}, unite="°C"
             )
-            # Traduire la légende
-            fig_temp.for_each_trace(lambda t: t.update(name={
-                'temp_c': 'Température',
-                'dewpoint_c': 'Point de rosée'
-            }.get(t.name, t.name)))
             
             st.plotly_chart(fig_temp, use_container_width=True)
             st.info(" **Indicateur de ciel clair :** Quand température et point de rosée sont proches, l'humidité est élevée = risque de brouillard/nuages. Un écart >5°C = air sec = ciel dégagé.")
@@ -1485,16 +1581,10 @@ with tab4:
         # 4) VENT
         # =====================================================================
         with sub4:
-            fig_wind = px.line(
-                wx, x="time", y=["wind_ms", "gust_ms"],
-                labels={"time": "Temps", "value": "m/s", "variable": ""},
-                title="Vent & Rafales"
+            fig_wind = figure_colonnes(
+                wx, ["wind_ms", "gust_ms"], "Vent & Rafales", "m/s",
+                noms={'wind_ms': 'Vent', 'gust_ms': 'Rafales'}, unite=" m/s"
             )
-            # Traduire la légende
-            fig_wind.for_each_trace(lambda t: t.update(name={
-                'wind_ms': 'Vent',
-                'gust_ms': 'Rafales'
-            }.get(t.name, t.name)))
             
             st.plotly_chart(fig_wind, use_container_width=True)
             st.info(" **Impact sur l'observation :** Un vent modéré (5-15 m/s) peut disperser les nuages rapidement. Attention : vent fort (>20 m/s) = difficulté à stabiliser un appareil photo.")
@@ -1510,10 +1600,9 @@ with tab4:
             c1, c2 = st.columns(2)
 
             with c1:
-                fig_prob = px.bar(
-                    wx, x="time", y="precip_prob",
-                    labels={"time": "Temps", "precip_prob": "Probabilité de précipitations (%)"},
-                    title="Probabilité de Précipitations"
+                fig_prob = figure_colonnes(
+                    wx, ["precip_prob"], "Probabilité de Précipitations",
+                    "Probabilité de précipitations (%)", unite="%", barres=True
                 )
                 st.plotly_chart(fig_prob, use_container_width=True)
                 st.info(" **Critique pour les aurores :** Précipitations (pluie/neige) = nuages épais garantis. Visez <20% de probabilité pour une bonne observation.")
@@ -1523,10 +1612,8 @@ with tab4:
                 st.caption(" Source de données : API Open-Meteo (temps réel).")
 
             with c2:
-                fig_vis = px.line(
-                    wx, x="time", y="visibility_km",
-                    labels={"time": "Temps", "visibility_km": "Visibilité (km)"},
-                    title="Visibilité"
+                fig_vis = figure_colonnes(
+                    wx, ["visibility_km"], "Visibilité", "Visibilité (km)", unite=" km"
                 )
                 st.plotly_chart(fig_vis, use_container_width=True)
                 st.info(" **Visibilité optimale :** >10 km = excellent. <5 km = brouillard/brume qui bloque la vue des aurores. Combine avec le % de nuages pour le meilleur résultat.")
@@ -1535,7 +1622,8 @@ with tab4:
 
                 
 # -------- Webcams --------
-with tab5:
+@profiler.timed("tab.webcams")
+def render_webcams():
     st.subheader(" Webcams en Direct")
     st.markdown("Restez informé avec des vues en direct du ciel et des aurores depuis différents sites.")
 
@@ -1594,81 +1682,44 @@ with tab5:
 
 # -------- Prévisions Aurores — Animation 30 Minutes --------
 
-with tab6:
-    import io
+@st.fragment(run_every=ANIMATION_REFRESH_S)
+@profiler.timed("tab.aurora_forecast")
+def render_aurora_forecast():
     import time
-    from datetime import datetime, timedelta, timezone
     from urllib.parse import urlencode
-    import requests
-    from PIL import Image  
+    from model import ovation
 
     st.subheader(" Prévisions Aurores Boréales")
 
 
-    # Auto-actualisation toutes les 5 minutes (si streamlit-autorefresh est installé)
-    try:
-        from streamlit_autorefresh import st_autorefresh
-        st_autorefresh(interval=300_000, key="aurora_anim_autorefresh")
-    except Exception:
-        pass
-
     # ---- Contrôles (optionnels)
-    cc1, cc2 = st.columns(2)
+    cc1, cc2, cc3 = st.columns(3)
     with cc1:
         minutes_window = st.selectbox("Fenêtre temporelle", [30, 60, 90, 120, 180], index=2)  # défaut 90
     with cc2:
         fps = st.slider("Vitesse d'animation (images/sec)", 1, 8, 4)
+    with cc3:
+        # Niveau de la pyramide OVATION : « Légère » divise le poids du GIF par ~5 (mobile, 4G)
+        resolutions = {"thumb": "Légère (240 px)", "medium": "Standard (480 px)", "full": "Pleine résolution"}
+        level = st.selectbox(
+            "Résolution", list(resolutions), index=1, format_func=resolutions.get,
+            key="ovation_level",
+            help="Réduisez la résolution sur mobile ou avec une connexion lente."
+        )
 
         st.markdown(" ")    
 
-    # Fonction auxiliaire : récupérer les images récentes en PIL
-    def fetch_frames(hemi: str, minutes_window: int, step_min: int = 5) -> list[Image.Image]:
-        now_utc = datetime.now(timezone.utc)
-        # arrondir à 5 min près
-        rounded = now_utc - timedelta(minutes=now_utc.minute % 5,
-                                      seconds=now_utc.second,
-                                      microseconds=now_utc.microsecond)
-        frames = []
-        steps = max(1, minutes_window // step_min)
-        for i in range(steps, -1, -1):  # du plus ancien au plus récent
-            t = rounded - timedelta(minutes=i * step_min)
-            stamp = t.strftime("%Y-%m-%d_%H%M")
-            base = f"https://services.swpc.noaa.gov/images/animations/ovation/{hemi}/"
-            fname = f"aurora_{'N' if hemi=='north' else 'S'}_{stamp}.jpg"
-            url = base + fname + "?" + urlencode({"t": int(t.timestamp())})
-            try:
-                r = requests.get(url, timeout=10)
-                if r.status_code == 200 and r.headers.get("Content-Type", "").startswith("image"):
-                    img = Image.open(io.BytesIO(r.content)).convert("RGB")
-                    frames.append(img)
-            except Exception:
-                continue
-        return frames
-
-    # Fonction auxiliaire : créer un GIF (en octets) à partir des images
-    def make_gif(frames: list[Image.Image], fps: int) -> bytes | None:
-        if not frames:
-            return None
-        buf = io.BytesIO()
-        duration_ms = int(1000 / max(1, fps))
-        frames[0].save(
-            buf, format="GIF", save_all=True,
-            append_images=frames[1:],
-            duration=duration_ms, loop=0, disposal=2
-        )
-        return buf.getvalue()
-
     # URLs des images statiques (pour référence)
     ts = int(time.time())
     north_still_url = f"https://services.swpc.noaa.gov/images/aurora-forecast-northern-hemisphere.jpg?{urlencode({'t': ts})}"
     south_still_url = f"https://services.swpc.noaa.gov/images/aurora-forecast-southern-hemisphere.jpg?{urlencode({'t': ts})}"
 
-    # Récupérer et assembler les animations
+    # Récupérer et assembler les animations : une seule fois par créneau de
+    # 5 minutes pour toutes les sessions (les ticks suivants lisent le cache)
+    slot = ovation.latest_slot()
     with st.spinner(" Chargement des dernières images OVATION de NOAA…"):
-        north_frames = fetch_frames("north", minutes_window, step_min=5)
-        south_frames = fetch_frames("south", minutes_window, step_min=5)
-        north_gif = make_gif(north_frames, fps)
-        south_gif = make_gif(south_frames, fps)
+        north_gif = ovation.animation_gif("north", minutes_window, fps, slot, level)
+        south_gif = ovation.animation_gif("south", minutes_window, fps, slot, level)
 
     # Disposition : deux panneaux côte à côte
     c1, c2 = st.columns(2)
@@ -1727,7 +1778,7 @@ with tab6:
                 st.download_button(
                     " Télécharger animation Nord (GIF)",
                     data=north_gif,
-                    file_name=f"aurore_nord_{minutes_window}min_{fps}fps.gif",
+                    file_name=f"aurore_nord_{minutes_window}min_{fps}fps_{level}.gif",
                     mime="image/gif",
                     use_container_width=True
                 )
@@ -1736,7 +1787,7 @@ with tab6:
                 st.download_button(
                     " Télécharger animation Sud (GIF)",
                     data=south_gif,
-                    file_name=f"aurore_sud_{minutes_window}min_{fps}fps.gif",
+                    file_name=f"aurore_sud_{minutes_window}min_{fps}fps_{level}.gif",
                     mime="image/gif",
                     use_container_width=True
                 )
@@ -1748,12 +1799,95 @@ with tab6:
 
     st.markdown("---")
 
+    render_kp_history()
+
+    st.markdown("---")
+
     st.caption(" Source de données : NOAA SWPC — Modèle OVATION (mise à jour toutes les 5 minutes)")
 
 
 
+def render_kp_history():
+    """Statistiques de l'archive Kp locale (model.kp_archive) : saison, années, récurrence à 27 jours."""
+    import numpy as np
+    import pandas as pd
+    import plotly.graph_objects as go
+
+    from model import kp_archive
+
+    st.markdown("####  Historique Kp")
+    with profiler.section("data.kp_archive"):
+        # construction ou mise à jour quotidienne en arrière-plan, jamais pendant le rendu
+        en_cours = kp_archive.refresh_in_background()
+        archive = kp_archive.load()
+    if archive is None:
+        if en_cours:
+            st.info(" Archive Kp en cours de construction (téléchargement GFZ) : l'historique depuis 1932 "
+                    "s'affichera au prochain rafraîchissement.")
+        else:
+            st.info(" Archive Kp indisponible : `python -m model.kp_archive` la construit (historique depuis 1932).")
+        return
+
+    seuil = st.selectbox("Seuil", range(3, 9), index=2, format_func=lambda k: f"Kp ≥ {k}", key="hist_seuil")
+    saison = archive.season(seuil)
+    total = archive.exceedance(seuil)
+    an_passe = archive.exceedance(seuil, archive.last_date - dt.timedelta(days=364))
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        st.metric(
+            f"Cette saison (depuis le {saison['start']:%d/%m})", f"{saison['days']} jours",
+            None if saison["mean"] is None else f"{saison['days'] - saison['mean']:+.1f} vs moyenne",
+            help=f"Jours avec au moins un bloc de 3 h à Kp ≥ {seuil}, comparés aux saisons "
+                 f"précédentes sur les mêmes {saison['elapsed_days']} jours.",
+        )
+    with c2:
+        st.metric("12 derniers mois", f"{an_passe['days']} jours",
+                  f"{an_passe['day_fraction'] * 100:.0f} % des jours" if an_passe["day_fraction"] is not None else None,
+                  delta_color="off")
+    with c3:
+        st.metric(f"Depuis {archive.first_date.year}",
+                  f"{total['day_fraction'] * 100:.1f} % des jours" if total["day_fraction"] is not None else "—",
+                  f"{total['block_fraction'] * 100:.2f} % des blocs de 3 h" if total["block_fraction"] is not None else None,
+                  delta_color="off")
+    if saison["seasons"]:
+        st.caption(f"Saison classée {saison['rank']}ᵉ sur {len(saison['seasons']) + 1} à cette date.")
+
+    with profiler.section("figure.kp_history_years"):
+        fig = memo_rendu(
+            "kp_historique",
+            (archive.built_at, seuil),
+            lambda: go.Figure(
+                go.Bar(x=[a for a, _, _ in archive.yearly(seuil)], y=[n for _, n, _ in archive.yearly(seuil)],
+                       marker_color="#2ecc71",
+                       hovertemplate=f"%{{x}} : %{{y}} jours à Kp ≥ {seuil}<extra></extra>"),
+                layout=dict(title=f"Jours à Kp ≥ {seuil} par année (cycle solaire de ~11 ans)",
+                            xaxis_title="Année", yaxis_title="Jours", height=320,
+                            margin=dict(l=10, r=10, t=50, b=40)),
+            ),
+        )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Récurrence : un trou coronal actif revient face à la Terre après une rotation solaire
+    jours, kp_passe = archive.recurrence(days=7, rotations=3)
+    st.markdown("**Récurrence à 27 jours** — Kp max observé une, deux et trois rotations solaires plus tôt")
+    st.dataframe(
+        pd.DataFrame({
+            "Jour": [f"{j:%a %d/%m}" for j in jours],
+            "−27 j": kp_passe[:, 0], "−54 j": kp_passe[:, 1], "−81 j": kp_passe[:, 2],
+            "Indice": [" Élevé" if np.nansum(r >= seuil) >= 2 else (" Possible" if r[0] >= seuil else "—")
+                       for r in kp_passe],
+        }),
+        use_container_width=True, hide_index=True,
+        column_config={c: st.column_config.NumberColumn(c, format="%.1f") for c in ("−27 j", "−54 j", "−81 j")},
+    )
+    st.caption(f"Archive GFZ Potsdam, {archive.first_date:%Y} → {archive.last_date:%d/%m/%Y}. "
+               "La récurrence n'est qu'un indice : les éruptions (CME) ne se répètent pas.")
+
+
 # -------- À propos --------
-with tab7:
+@profiler.timed("tab.about")
+def render_about():
     st.subheader(" À Propos")
 
     st.markdown("""
@@ -1804,4 +1938,108 @@ Designer Open Data et Web des Données
 
 Ce tableau de bord a été créé dans le cadre d'un projet Streamlit pour explorer **les données en temps réel, les APIs et la visualisation interactive**.
 
-""")
\ No newline at end of file
+""")
+
+
+# -------- Onglet affiché --------
+# Carte et animation sont des fragments : leurs widgets ne relancent qu'eux-mêmes.
+RENDUS = {
+    "overview": render_overview,
+    "map": render_map,
+    "compare": render_compare,
+    "current_weather": render_current_weather,
+    "forecast": render_forecast,
+    "webcams": render_webcams,
+    "aurora_forecast": render_aurora_forecast,
+    "about": render_about,
+}
+# L'onglet prend la place de l'aperçu, vidé juste avant (l'emplacement vide
+# n'occupe pas de hauteur : le contenu s'affiche à la même position)
+if snap:
+    apercu.empty()
+RENDUS[onglet]()
+
+
+# -------- Diagnostics (administrateur) --------
+# Visible uniquement avec ?admin=<ADMIN_TOKEN> dans l'URL (ADMIN_TOKEN dans secrets.toml)
+
+admin_token = st.secrets.get("ADMIN_TOKEN")
+if admin_token and st.query_params.get("admin") == admin_token:
+    import pandas as pd
+
+    with st.sidebar.expander(" Diagnostics (admin)", expanded=False):
+        diag = metrics.registry.snapshot()
+        if not diag:
+            st.caption("Aucun appel externe mesuré pour l'instant.")
+        else:
+            st.caption(f"Latences p50/p95 sur les {metrics.ROLLING_WINDOW_S // 60} dernières minutes")
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        "Source": src,
+                        "Appels": v["requests"],
+                        "p50 (ms)": v["p50_ms"],
+                        "p95 (ms)": v["p95_ms"],
+                        "Ko": round(v["bytes"] / 1024, 1),
+                        "Retries": v["retries"],
+                        "Erreurs": ", ".join(f"{k}×{n}" for k, n in v["errors"].items()) or "—",
+                        "Hit cache": v["cache_hit_ratio"],
+                    }
+                    for src, v in diag.items()
+                ]),
+                use_container_width=True,
+                hide_index=True
+            )
+        cache_stats = cache.stats()
+        if cache_stats:
+            st.caption("Caches partagés (taille estimée, hits, évictions)")
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        "Espace": name,
+                        "Entrées": f"{v['entries']}/{v['max_entries'] or '∞'}",
+                        "Ko": round(v["bytes"] / 1024, 1),
+                        "Hit ratio": v["hit_ratio"],
+                        "Hits partagés": v["shared_hits"] if v["shared"] else None,
+                        "Évictions": v["evictions"],
+                        "Politique": v["policy"],
+                    }
+                    for name, v in cache_stats.items()
+                ]),
+                use_container_width=True,
+                hide_index=True
+            )
+        data_versions = cache.versions()
+        if data_versions:
+            st.caption("Versions des données (incrémentées à chaque changement)")
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        "Source": src,
+                        "Version": v["version"],
+                        "Modifiée (UTC)": dt.datetime.fromtimestamp(v["changed_at"], dt.timezone.utc).strftime("%H:%M:%S"),
+                    }
+                    for src, v in data_versions.items()
+                ]),
+                use_container_width=True,
+                hide_index=True
+            )
+        if snapshot_builder is not None and snapshot_builder.last_run is not None:
+            st.caption(f"Précalcul : {len(snapshot_builder.places)} lieux, dernier passage "
+                       f"{snapshot_builder.last_run:%H:%M:%S} UTC ({snapshot_builder.last_duration_s * 1000:.0f} ms), "
+                       f"{snapshot_builder.rebuilt} bundles reconstruits"
+                       + (f", erreurs : {', '.join(snapshot_builder.errors)}" if snapshot_builder.errors else ""))
+        st.download_button(
+            " Métriques (Prometheus)",
+            data=metrics.to_prometheus(),
+            file_name="aurora_metrics.prom",
+            mime="text/plain"
+        )
+        st.download_button(
+            " Métriques (JSON)",
+            data=metrics.to_json(),
+            file_name="aurora_metrics.json",
+            mime="application/json"
+        )
+
+profile.finish()
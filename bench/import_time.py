@@ -0,0 +1,96 @@
+# bench/import_time.py
+"""
+Temps d'import à froid de l'application et du worker d'alertes (-X importtime).
+
+    python -m bench.import_time              # médiane sur 5 processus par cible
+    python -m bench.import_time --top 15     # modules les plus coûteux
+    python -m bench.import_time --json
+
+Cibles :
+  - « app »    : les imports de premier niveau d'aurora_app.py (le script
+                 Streamlit lui-même n'est pas exécuté) ;
+  - « worker » : import d'alert_worker.py.
+Chaque mesure est faite dans un processus neuf ; les modules lourds
+effectivement chargés (pandas, plotly.express, PIL, streamlit) sont listés.
+"""
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ("streamlit", "pandas", "numpy", "plotly.express", "plotly.graph_objects", "PIL", "pyarrow")
+
+
+def app_imports():
+    """Instructions d'import de premier niveau d'aurora_app.py."""
+    tree = ast.parse((ROOT / "aurora_app.py").read_text(encoding="utf-8"))
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+TARGETS = {
+    "app": app_imports,
+    "worker": lambda: "import alert_worker",
+}
+
+
+def measure(code):
+    """(total en ms, {module: cumul en ms}) pour un processus neuf."""
+    probe = code + "\nimport sys\nprint(','.join(m for m in %r if m in sys.modules))" % (HEAVY,)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    modules = {}
+    total = 0
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        us = int(cumulative)
+        modules[name.strip()] = us / 1000
+        if not name.startswith("  "):      # import de premier niveau
+            total += us
+    loaded = [m for m in out.stdout.strip().split(",") if m]
+    return total / 1000, modules, loaded
+
+
+def run(repeat):
+    results = {}
+    for name, code in TARGETS.items():
+        runs = [measure(code()) for _ in range(repeat)]
+        totals = [r[0] for r in runs]
+        top = sorted(runs[-1][1].items(), key=lambda kv: kv[1], reverse=True)
+        results[name] = {
+            "median_ms": round(statistics.median(totals), 1),
+            "min_ms": round(min(totals), 1),
+            "heavy_loaded": runs[-1][2],
+            "top": [(m, round(ms, 1)) for m, ms in top],
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="modules les plus coûteux à afficher")
+    parser.add_argument("--json", action="store_true", help="sortie JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    if args.json:
+        for res in results.values():
+            res["top"] = res["top"][:args.top]
+        print(json.dumps(results, indent=2))
+        return
+    for name, res in results.items():
+        print(f"{name:<7} médiane {res['median_ms']:8.1f} ms   min {res['min_ms']:8.1f} ms   "
+              f"chargés : {', '.join(res['heavy_loaded']) or '—'}")
+        for module, ms in res["top"][:args.top]:
+            print(f"          {ms:8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
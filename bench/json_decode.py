@@ -0,0 +1,129 @@
+# bench/json_decode.py
+"""
+Décodage JSON + construction du DataFrame sur les réponses enregistrées.
+
+    python -m bench.json_decode             # tableau avant / après
+    python -m bench.json_decode --json      # résultats en JSON
+
+Pour chaque produit (Kp 1 minute NOAA, prévisions Open-Meteo), compare :
+  - « avant »        : r.json() (stdlib) → pd.DataFrame(lignes) → pd.to_datetime / pd.to_numeric ;
+  - « après/json »   : model.decode avec la bibliothèque standard (repli sans orjson) ;
+  - « après/orjson » : model.decode avec orjson, si installé.
+Mesure la médiane du temps (décodage + DataFrame) et le pic mémoire Python
+(tracemalloc) d'une exécution.
+"""
+
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+import pandas as pd
+
+from bench.record_fixtures import FIXTURES, TZ
+from model import decode, frames
+
+KP_1M = FIXTURES / "services.swpc.noaa.gov" / "json" / "planetary_k_index_1m.json"
+FORECAST = FIXTURES / "api.open-meteo.com" / "v1" / "forecast.json"
+
+
+# -------------------------------------------------------------------
+# Chemins comparés
+# -------------------------------------------------------------------
+
+def kp_before(payload):
+    df = pd.DataFrame(json.loads(payload))
+    df["time_tag"] = pd.to_datetime(df["time_tag"], utc=True)
+    df["kp_index"] = pd.to_numeric(df["kp_index"], errors="coerce")
+    return df.dropna(subset=["kp_index"]).sort_values("time_tag")
+
+
+def kp_after(payload):
+    return frames.kp_series_frame(decode.loads(payload), limit_minutes=10**6)
+
+
+def weather_before(payload):
+    hr = json.loads(payload)["hourly"]
+    return pd.DataFrame({
+        "time": pd.to_datetime(hr["time"]),
+        "cloud_total": hr["cloudcover"],
+        "cloud_low": hr["cloudcover_low"],
+        "cloud_mid": hr["cloudcover_mid"],
+        "cloud_high": hr["cloudcover_high"],
+        "temp_c": hr["temperature_2m"],
+        "dewpoint_c": hr["dewpoint_2m"],
+        "rh_pct": hr["relative_humidity_2m"],
+        "visibility_km": [v/1000 if v is not None else None for v in hr["visibility"]],
+        "wind_ms": hr["windspeed_10m"],
+        "gust_ms": hr["windgusts_10m"],
+        "precip_mm": hr["precipitation"],
+        "precip_prob": hr["precipitation_probability"],
+    })
+
+
+def weather_after(payload):
+    return frames.weather_frame(decode.loads(payload)["hourly"], TZ)
+
+
+CASES = {
+    "kp_1m": (KP_1M, kp_before, kp_after),
+    "forecast": (FORECAST, weather_before, weather_after),
+}
+
+
+# -------------------------------------------------------------------
+# Mesure
+# -------------------------------------------------------------------
+
+def measure(fn, payload, iterations):
+    fn(payload)   # préchauffage
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(payload)
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"p50_ms": round(statistics.median(durations) * 1000, 3), "peak_kib": round(peak / 1024, 1)}
+
+
+def run(iterations):
+    has_orjson = decode.orjson is not None
+    results = {}
+    for name, (path, before, after) in CASES.items():
+        payload = path.read_bytes()
+        res = results[name] = {"bytes": len(payload), "avant": measure(before, payload, iterations)}
+        saved, decode.orjson = decode.orjson, None      # repli bibliothèque standard
+        try:
+            res["après/json"] = measure(after, payload, iterations)
+        finally:
+            decode.orjson = saved
+        if has_orjson:
+            res["après/orjson"] = measure(after, payload, iterations)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="sortie JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    for name, res in results.items():
+        print(f"{name} ({res['bytes'] / 1024:.0f} Kio)")
+        base = res["avant"]["p50_ms"]
+        for variant in ("avant", "après/json", "après/orjson"):
+            if variant in res:
+                r = res[variant]
+                print(f"  {variant:<13} {r['p50_ms']:8.3f} ms  (×{base / r['p50_ms']:4.1f})   pic {r['peak_kib']:8.1f} Kio")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# bench/loadtest.py
+"""
+Test de charge : N sessions simulées du dashboard dans un seul processus.
+
+Chaque session est un `streamlit.testing.v1.AppTest` exécutant aurora_app.py
+dans son propre thread (comme les sessions d'un `streamlit run`), contre le
+serveur stub (bench/stub_server.py) : aucune requête ne sort de la machine.
+Les sessions changent d'onglet ou de localisation, cliquent sur
+« Actualiser » ou relancent simplement le script (autorefresh), avec un
+temps de réflexion aléatoire entre deux actions.
+
+    python -m bench.loadtest --sessions 20 --duration 60
+    python -m bench.loadtest --sessions 50 --duration 120 --upstream-latency-ms 80 --json out.json
+
+Rapport : percentiles de latence des reruns (global et par action), débit,
+CPU du processus, RSS (pic et moyenne) et appels aux sources par source.
+Les sessions AppTest n'incluent ni le websocket ni le rendu navigateur :
+les latences mesurées sont celles du script côté serveur.
+"""
+
+import argparse
+import ast
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from bench.stub_server import StubServer
+from model.compare import QUICK_LOCATIONS
+
+APP = str(Path(__file__).resolve().parent.parent / "aurora_app.py")
+
+CUSTOM_LOCATIONS = ["Oslo, Norvège", "Helsinki, Finlande", "Reykjavik, Islande", "Yellowknife, Canada",
+                    "Édimbourg, Écosse", "Anchorage, États-Unis", "Luleå, Suède", "Bodø, Norvège"]
+
+
+def app_tabs(path=APP):
+    """Clés de ONGLETS lues dans aurora_app.py (sans l'exécuter) : tous les onglets de l'application."""
+    for node in ast.parse(Path(path).read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "ONGLETS" for t in node.targets):
+            return list(ast.literal_eval(node.value))
+    raise LookupError(f"ONGLETS introuvable dans {path}")
+
+
+TABS = app_tabs()
+
+# Poids des actions d'une session
+ACTIONS = {"rerun": 0.35, "tab": 0.3, "location": 0.25, "refresh": 0.1}
+
+
+# -------------------------------------------------------------------
+# Mesures système
+# -------------------------------------------------------------------
+
+def rss_mib():
+    """RSS courant du processus (Linux : /proc, sinon pic via resource)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class ResourceMonitor(threading.Thread):
+    """Échantillonne le RSS pendant le test."""
+
+    def __init__(self, interval=0.5):
+        super().__init__(daemon=True, name="loadtest-monitor")
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.samples.append(rss_mib())
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# -------------------------------------------------------------------
+# Sessions simulées
+# -------------------------------------------------------------------
+
+def _widget(widgets, label):
+    for w in widgets:
+        if (w.label or "").strip().startswith(label):
+            return w
+    raise LookupError(f"widget « {label} » introuvable")
+
+
+class Session(threading.Thread):
+    def __init__(self, idx, deadline, think_s, rng, timeout):
+        super().__init__(daemon=True, name=f"session-{idx}")
+        self.deadline = deadline
+        self.think_s = think_s
+        self.rng = rng
+        self.timeout = timeout
+        self.latencies = defaultdict(list)   # action -> [s]
+        self.errors = defaultdict(int)
+
+    def run(self):
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(APP, default_timeout=self.timeout)
+        at.secrets["OPENWEATHER_API_KEY"] = "loadtest"
+        self._timed("initial", at, lambda: None)
+        while time.monotonic() < self.deadline:
+            time.sleep(self.rng.expovariate(1 / self.think_s) if self.think_s else 0)
+            if time.monotonic() >= self.deadline:
+                break
+            action = self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+            self._timed(action, at, lambda: self._prepare(action, at))
+
+    def _prepare(self, action, at):
+        if action == "tab":
+            at.radio(key="onglet").set_value(self.rng.choice(TABS))
+        elif action == "location":
+            if self.rng.random() < 0.7:
+                _widget(at.sidebar.selectbox, "Localisations rapides").set_value(self.rng.choice(list(QUICK_LOCATIONS)))
+            else:
+                _widget(at.sidebar.selectbox, "Localisations rapides").set_value("—")
+                _widget(at.sidebar.text_input, "Localisation").set_value(self.rng.choice(CUSTOM_LOCATIONS))
+        elif action == "refresh":
+            _widget(at.sidebar.button, "Actualiser").click()
+
+    def _timed(self, action, at, prepare):
+        try:
+            prepare()
+            start = time.perf_counter()
+            at.run()
+            self.latencies[action].append(time.perf_counter() - start)
+            if at.exception:
+                self.errors["exception"] += 1
+        except Exception as e:
+            self.errors[type(e).__name__] += 1
+
+
+# -------------------------------------------------------------------
+# Rapport
+# -------------------------------------------------------------------
+
+def _pcts(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1)
+    return {"count": len(values), "p50_ms": pick(0.50), "p90_ms": pick(0.90),
+            "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": round(values[-1] * 1000, 1)}
+
+
+def run_loadtest(sessions, duration, think_s, ramp_s, upstream_latency_ms, timeout, seed):
+    stub = StubServer(latency_ms=upstream_latency_ms).start()
+    os.environ["AURORA_UPSTREAM_URL"] = stub.url
+    from streamlit import config as st_config, logger as st_logger
+    st_logger.set_log_level("error")
+    # AppTest.run active global.appTest puis restaure la valeur précédente : entre
+    # sessions concurrentes, un rerun qui se termine le désactivait pour les autres
+    # (KeyError sur les widgets). Activé une fois pour tout le processus.
+    st_config.set_option("global.appTest", True)
+
+    monitor = ResourceMonitor()
+    monitor.start()
+    rss_start = rss_mib()
+    cpu_start, wall_start = time.process_time(), time.monotonic()
+    deadline = wall_start + ramp_s + duration
+
+    workers = []
+    for i in range(sessions):
+        s = Session(i, deadline, think_s, random.Random(seed + i), timeout)
+        s.start()
+        workers.append(s)
+        if ramp_s:
+            time.sleep(ramp_s / sessions)
+    for s in workers:
+        s.join()
+
+    wall = time.monotonic() - wall_start
+    cpu = time.process_time() - cpu_start
+    monitor.stop()
+    upstream = stub.stats()
+    stub.shutdown()
+
+    by_action = defaultdict(list)
+    errors = defaultdict(int)
+    for s in workers:
+        for action, values in s.latencies.items():
+            by_action[action].extend(values)
+        for err, n in s.errors.items():
+            errors[err] += n
+    all_reruns = [v for values in by_action.values() for v in values]
+
+    return {
+        "sessions": sessions,
+        "duration_s": round(wall, 1),
+        "reruns": len(all_reruns),
+        "reruns_per_s": round(len(all_reruns) / wall, 2) if wall else None,
+        "latency": _pcts(all_reruns),
+        "latency_by_action": {a: _pcts(v) for a, v in sorted(by_action.items())},
+        "errors": dict(errors),
+        "cpu_pct": round(cpu / wall * 100, 1) if wall else None,
+        "rss_mib": {"start": round(rss_start, 1), "peak": round(max(monitor.samples, default=rss_start), 1),
+                    "mean": round(statistics.mean(monitor.samples), 1) if monitor.samples else None},
+        "upstream_calls": dict(sorted(upstream.items())),
+        "upstream_calls_per_rerun": round(sum(upstream.values()) / len(all_reruns), 2) if all_reruns else None,
+    }
+
+
+def print_report(r):
+    print(f"\n{r['sessions']} sessions, {r['duration_s']} s, {r['reruns']} reruns ({r['reruns_per_s']}/s)")
+    lat = r["latency"]
+    if lat:
+        print(f"Latence rerun : p50 {lat['p50_ms']} ms  p90 {lat['p90_ms']} ms  "
+              f"p95 {lat['p95_ms']} ms  p99 {lat['p99_ms']} ms  max {lat['max_ms']} ms")
+    for action, p in r["latency_by_action"].items():
+        print(f"  {action:<10} n={p['count']:<5} p50 {p['p50_ms']:>8} ms  p95 {p['p95_ms']:>8} ms")
+    print(f"CPU : {r['cpu_pct']} %   RSS : début {r['rss_mib']['start']} Mio, "
+          f"pic {r['rss_mib']['peak']} Mio, moyenne {r['rss_mib']['mean']} Mio")
+    print(f"Appels aux sources : {sum(r['upstream_calls'].values())} "
+          f"({r['upstream_calls_per_rerun']} par rerun)")
+    for src, n in r["upstream_calls"].items():
+        print(f"  {src:<70} {n}")
+    if r["errors"]:
+        print(f"Erreurs : {r['errors']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="durée après la montée en charge (s)")
+    parser.add_argument("--ramp", type=float, default=5, help="montée en charge (s)")
+    parser.add_argument("--think", type=float, default=3, help="temps de réflexion moyen entre actions (s)")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0, help="latence simulée des APIs")
+    parser.add_argument("--timeout", type=float, default=120, help="timeout d'un rerun (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="écrire le rapport JSON dans ce fichier")
+    args = parser.parse_args(argv)
+
+    report = run_loadtest(args.sessions, args.duration, args.think, args.ramp,
+                          args.upstream_latency_ms, args.timeout, args.seed)
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
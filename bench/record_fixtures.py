@@ -0,0 +1,311 @@
+# bench/record_fixtures.py
+"""
+Enregistre les fixtures des benchmarks dans bench/fixtures/<hôte>/<chemin>.
+
+    python -m bench.record_fixtures              # enregistre depuis les APIs réelles
+    python -m bench.record_fixtures --synthetic  # génère des fixtures au format des APIs (hors ligne)
+
+Les horodatages sont recalés sur « maintenant » par le serveur stub au moment
+du service : une fixture ancienne reste donc exploitable.
+"""
+
+import argparse
+import io
+import json
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+# Localisation de référence des fixtures (localisation par défaut de l'app)
+LAT, LON, TZ = 59.32938, 18.06871, "Europe/Stockholm"
+
+# URL réelle → chemin de la fixture (relatif à FIXTURES)
+LIVE_SOURCES = {
+    "https://services.swpc.noaa.gov/products/noaa-planetary-k-index.json":
+        "services.swpc.noaa.gov/products/noaa-planetary-k-index.json",
+    "https://services.swpc.noaa.gov/json/planetary_k_index_1m.json":
+        "services.swpc.noaa.gov/json/planetary_k_index_1m.json",
+    "https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&timezone={tz}&forecast_days=2"
+    "&hourly=cloudcover,cloudcover_low,cloudcover_mid,cloudcover_high,temperature_2m,dewpoint_2m,"
+    "relative_humidity_2m,visibility,windspeed_10m,windgusts_10m,precipitation,precipitation_probability":
+        "api.open-meteo.com/v1/forecast.json",
+    "https://api.sunrise-sunset.org/json?lat={lat}&lng={lon}&formatted=0":
+        "api.sunrise-sunset.org/json.json",
+    "https://geocoding-api.open-meteo.com/v1/search?name=Stockholm&count=1":
+        "geocoding-api.open-meteo.com/v1/search.json",
+    "https://services.swpc.noaa.gov/json/ovation_aurora_latest.json":
+        "services.swpc.noaa.gov/json/ovation_aurora_latest.json",
+    "https://services.swpc.noaa.gov/products/noaa-planetary-k-index-forecast.json":
+        "services.swpc.noaa.gov/products/noaa-planetary-k-index-forecast.json",
+    "https://services.swpc.noaa.gov/products/solar-wind/plasma-2-hour.json":
+        "services.swpc.noaa.gov/products/solar-wind/plasma-2-hour.json",
+    "https://services.swpc.noaa.gov/products/solar-wind/mag-2-hour.json":
+        "services.swpc.noaa.gov/products/solar-wind/mag-2-hour.json",
+    "https://archive-api.open-meteo.com/v1/archive?latitude={lat}&longitude={lon}"
+    "&start_date=2024-01-01&end_date=2024-12-31&daily=cloud_cover_mean&timezone=GMT":
+        "archive-api.open-meteo.com/v1/archive.json",
+}
+FRAME_DIRS = {
+    "north": "services.swpc.noaa.gov/images/animations/ovation/north",
+    "south": "services.swpc.noaa.gov/images/animations/ovation/south",
+}
+N_FRAMES = 3
+
+
+def _write(rel, data):
+    path = FIXTURES / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, (bytes, bytearray)):
+        path.write_bytes(data)
+    else:
+        path.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+    print(f"  {rel} ({path.stat().st_size / 1024:.1f} Ko)")
+
+
+# -------------------------------------------------------------------
+# Enregistrement depuis les APIs réelles
+# -------------------------------------------------------------------
+
+def record_live():
+    import requests
+
+    for url, rel in LIVE_SOURCES.items():
+        r = requests.get(url.format(lat=LAT, lon=LON, tz=TZ), timeout=30)
+        r.raise_for_status()
+        _write(rel, r.json())
+
+    now = datetime.now(timezone.utc)
+    rounded = now - timedelta(minutes=now.minute % 5 + 10, seconds=now.second, microseconds=now.microsecond)
+    for hemi, rel_dir in FRAME_DIRS.items():
+        for i in range(N_FRAMES):
+            stamp = (rounded - timedelta(minutes=5 * i)).strftime("%Y-%m-%d_%H%M")
+            url = f"https://{rel_dir}/aurora_{'N' if hemi == 'north' else 'S'}_{stamp}.jpg"
+            r = requests.get(url, timeout=30)
+            r.raise_for_status()
+            _write(f"{rel_dir}/frame_{i}.jpg", r.content)
+
+
+# -------------------------------------------------------------------
+# Fixtures synthétiques (même format que les APIs)
+# -------------------------------------------------------------------
+
+def _kp_label(kp):
+    base = int(kp)
+    frac = kp - base
+    return f"{base}{'P' if frac > 0.5 else 'M' if 0 < frac <= 0.5 else 'Z'}"
+
+
+def record_synthetic(seed=42):
+    rnd = random.Random(seed)
+    end = datetime(2025, 10, 1, 12, 0)
+
+    # Kp 1 minute (24 h)
+    rows, kp = [], 2.3
+    for i in range(24 * 60):
+        kp = min(9.0, max(0.0, kp + rnd.gauss(0, 0.05)))
+        t = end - timedelta(minutes=24 * 60 - 1 - i)
+        rows.append({"time_tag": t.strftime("%Y-%m-%dT%H:%M:%S"), "kp_index": int(round(kp)),
+                     "estimated_kp": round(kp, 2), "kp": _kp_label(kp)})
+    _write("services.swpc.noaa.gov/json/planetary_k_index_1m.json", rows)
+
+    # Kp planétaire 3 h (7 jours, format tableau avec en-tête)
+    table = [["time_tag", "Kp", "a_running", "station_count"]]
+    for i in range(7 * 8):
+        t = end - timedelta(hours=3 * (7 * 8 - 1 - i))
+        k = round(max(0.0, min(9.0, 2.5 + 1.5 * math.sin(i / 5) + rnd.gauss(0, 0.5))) * 3) / 3
+        table.append([t.strftime("%Y-%m-%d %H:%M:%S.000"), f"{k:.2f}", str(int(2 ** k)), "8"])
+    _write("services.swpc.noaa.gov/products/noaa-planetary-k-index.json", table)
+
+    # Open-Meteo prévisions horaires (48 h)
+    start = end.replace(hour=0)
+    hours = [start + timedelta(hours=h) for h in range(48)]
+    def series(lo, hi, scale=1.0, digits=1):
+        return [round(max(lo, min(hi, (lo + hi) / 2 + (hi - lo) / 2 * math.sin(h / 7 + rnd.random())
+                                  + rnd.gauss(0, (hi - lo) / 10))) * scale, digits) for h in range(48)]
+    _write("api.open-meteo.com/v1/forecast.json", {
+        "latitude": LAT, "longitude": LON, "timezone": TZ, "utc_offset_seconds": 7200,
+        "hourly_units": {"time": "iso8601", "cloudcover": "%", "visibility": "m"},
+        "hourly": {
+            "time": [t.strftime("%Y-%m-%dT%H:%M") for t in hours],
+            "cloudcover": series(0, 100, digits=0),
+            "cloudcover_low": series(0, 100, digits=0),
+            "cloudcover_mid": series(0, 100, digits=0),
+            "cloudcover_high": series(0, 100, digits=0),
+            "temperature_2m": series(-8, 6),
+            "dewpoint_2m": series(-12, 2),
+            "relative_humidity_2m": series(50, 100, digits=0),
+            "visibility": series(2000, 50000, digits=0),
+            "windspeed_10m": series(0, 12),
+            "windgusts_10m": series(2, 20),
+            "precipitation": series(0, 1.5),
+            "precipitation_probability": series(0, 100, digits=0),
+        },
+    })
+
+    # Sunrise-Sunset
+    _write("api.sunrise-sunset.org/json.json", {"status": "OK", "results": {
+        "sunrise": "2025-10-01T05:12:34+00:00", "sunset": "2025-10-01T16:41:02+00:00",
+        "solar_noon": "2025-10-01T10:56:48+00:00", "day_length": 41308,
+    }})
+
+    # Géocodage Open-Meteo
+    _write("geocoding-api.open-meteo.com/v1/search.json", {"results": [{
+        "id": 2673730, "name": "Stockholm", "latitude": LAT, "longitude": LON,
+        "country": "Sweden", "country_code": "SE", "timezone": TZ, "elevation": 17.0,
+    }], "generationtime_ms": 0.5})
+
+    # OpenWeatherMap — météo actuelle
+    _write("api.openweathermap.org/data/2.5/weather.json", {
+        "coord": {"lon": round(LON, 3), "lat": round(LAT, 3)},
+        "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04n"}],
+        "main": {"temp": 3.4, "feels_like": 0.1, "humidity": 81, "pressure": 1012},
+        "wind": {"speed": 4.1, "deg": 240}, "clouds": {"all": 64},
+        "sys": {"country": "SE"}, "name": "Stockholm", "cod": 200,
+    })
+
+    # Images OVATION
+    for hemi, rel_dir in FRAME_DIRS.items():
+        for i in range(N_FRAMES):
+            _write(f"{rel_dir}/frame_{i}.jpg", _synthetic_ovation_jpeg(rnd, phase=i))
+
+    # Prévision Kp 3 h (7 jours observés + 3 jours prévus)
+    _write("services.swpc.noaa.gov/products/noaa-planetary-k-index-forecast.json", _synthetic_kp_forecast(end))
+
+    # Grille de probabilités OVATION
+    _write("services.swpc.noaa.gov/json/ovation_aurora_latest.json", _synthetic_ovation_grid(end))
+
+    # Archive Open-Meteo : nébulosité moyenne journalière (1 an ; le serveur stub
+    # synthétise les autres points et périodes)
+    days = [datetime(2024, 1, 1) + timedelta(days=d) for d in range(366)]
+    _write("archive-api.open-meteo.com/v1/archive.json", {
+        "latitude": LAT, "longitude": LON, "timezone": "GMT",
+        "daily_units": {"time": "iso8601", "cloud_cover_mean": "%"},
+        "daily": {"time": [d.strftime("%Y-%m-%d") for d in days],
+                  "cloud_cover_mean": [round(max(0, min(100, 68 + 15 * math.cos(2 * math.pi * (d.timetuple().tm_yday - 320) / 365)
+                                                       + rnd.gauss(0, 25))), 1) for d in days]},
+    })
+
+    # Vent solaire L1 (2 h, 1 minute)
+    plasma, mag = _synthetic_solar_wind(end)
+    _write("services.swpc.noaa.gov/products/solar-wind/plasma-2-hour.json", plasma)
+    _write("services.swpc.noaa.gov/products/solar-wind/mag-2-hour.json", mag)
+
+
+def _synthetic_kp_forecast(end, seed=7):
+    """Tableau type noaa-planetary-k-index-forecast : observé, estimé puis prévu."""
+    rnd = random.Random(seed)
+    table = [["time_tag", "kp", "observed", "noaa_scale"]]
+    first = end.replace(hour=end.hour - end.hour % 3) - timedelta(days=7)
+    for i in range(10 * 8):
+        t = first + timedelta(hours=3 * i)
+        kind = "observed" if t <= end - timedelta(hours=3) else "estimated" if t <= end else "predicted"
+        k = round(max(0.0, min(9.0, 3 + 2 * math.sin(i / 6) + rnd.gauss(0, 0.6))) * 3) / 3
+        table.append([t.strftime("%Y-%m-%d %H:%M:%S"), f"{k:.2f}", kind, f"G{int(k) - 4}" if k >= 5 else None])
+    return table
+
+
+def synthetic_gfz_kp(first_year=1932, end=None, seed=11):
+    """
+    Texte au format Kp_ap_since_1932 du GFZ (blocs de 3 h de `first_year` à
+    `end`) : cycle solaire de 11 ans, récurrence à 27 jours, quelques tempêtes
+    et lacunes. Pas de fixture enregistrée (~25 Mo pour 90 ans) : les bancs
+    d'essai génèrent le fichier à la demande.
+    """
+    import numpy as np
+
+    end = end or datetime.now(timezone.utc).replace(tzinfo=None)
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(f"{first_year}-01-01T00", "h")
+    stamps = np.arange(start, np.datetime64(end, "h"), np.timedelta64(3, "h"))
+    t = (stamps - start).astype(np.float64) / 24
+    cycle = 1.3 + 0.9 * np.sin(2 * np.pi * t / (11.0 * 365.25))
+    recurrence = 0.6 * np.sin(2 * np.pi * t / 27.0)
+    storms = rng.exponential(1.0, len(t)) * (rng.random(len(t)) < 0.02) * 3
+    kp = np.clip(cycle + recurrence + rng.normal(0, 0.9, len(t)) + storms, 0, 9)
+    kp = np.round(kp * 3) / 3
+    kp[rng.random(len(t)) < 0.001] = -1      # valeurs manquantes
+    days = t.astype(np.int64)
+
+    out = io.StringIO()
+    out.write("#YYY MM DD hh.h hh._m        days      days_m     Kp   ap  D\n")
+    for stamp, day, value in zip(stamps.astype(datetime), days, kp):
+        out.write(f"{stamp:%Y %m %d} {stamp.hour:04.1f} {stamp.hour + 1.5:05.2f} {day:11.5f} {day + 0.0625:11.5f}"
+                  f" {value:6.3f} {0 if value < 0 else int(3 * 2 ** value):4d} 1\n")
+    return out.getvalue()
+
+
+def _synthetic_solar_wind(end, seed=3):
+    """
+    Produits plasma / mag 2 heures : choc vers −50 min (vitesse et champ en
+    hausse), puis Bz qui bascule au sud — une tempête modérée en approche.
+    """
+    rnd = random.Random(seed)
+    plasma = [["time_tag", "density", "speed", "temperature"]]
+    mag = [["time_tag", "bx_gsm", "by_gsm", "bz_gsm", "lon_gsm", "lat_gsm", "bt"]]
+    for i in range(120):
+        t = (end - timedelta(minutes=119 - i)).strftime("%Y-%m-%d %H:%M:%S.000")
+        shocked = i >= 70
+        speed = (560 if shocked else 410) + rnd.gauss(0, 12)
+        density = (10 if shocked else 5) + rnd.gauss(0, 1)
+        bt = (11 if shocked else 5) + rnd.gauss(0, 0.8)
+        bz = (-0.75 * bt if i >= 85 else rnd.gauss(1, 2)) + rnd.gauss(0, 1)
+        by = math.copysign(math.sqrt(max(bt ** 2 - bz ** 2, 0) * 0.6), rnd.gauss(0, 1))
+        bx = math.sqrt(max(bt ** 2 - bz ** 2 - by ** 2, 0))
+        gap = rnd.random() < 0.03      # mesures manquantes, comme dans les vrais produits
+        plasma.append([t, None if gap else f"{density:.2f}", None if gap else f"{speed:.1f}", f"{rnd.randint(60000, 400000)}"])
+        mag.append([t, f"{bx:.2f}", f"{by:.2f}", f"{bz:.2f}", "0.00", f"{math.degrees(math.asin(max(-1, min(1, bz / bt)))):.2f}", f"{bt:.2f}"])
+    return plasma, mag
+
+
+def _synthetic_ovation_grid(end, kp=4.0):
+    """Grille type OVATION : deux ovales centrés sur les pôles géomagnétiques, plus intenses côté nuit."""
+    import numpy as np
+
+    lat, lon = np.mgrid[-90:91, 0:360].astype(float)
+    pole_lat, pole_lon = np.radians(80.7), np.radians(-72.7)    # pôle nord géomagnétique (dipôle)
+    phi, lam = np.radians(lat), np.radians(lon)
+    mlat = np.degrees(np.arcsin(np.sin(phi) * np.sin(pole_lat)
+                                + np.cos(phi) * np.cos(pole_lat) * np.cos(lam - pole_lon)))
+    # côté nuit : longitude opposée au point subsolaire (midi UTC → 0°E)
+    solar_lon = -15 * (end.hour + end.minute / 60 - 12)
+    night = 0.5 - 0.5 * np.cos(np.radians(lon - solar_lon))
+    center = 67 - 1.8 * kp
+    aurora = 90 * np.exp(-((np.abs(mlat) - center) / 3.5) ** 2) * (0.3 + 0.7 * night)
+    coords = [[int(x), int(y), int(v)] for x, y, v in zip(lon.ravel(), lat.ravel(), aurora.round().ravel())]
+    stamp = end.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {"Observation Time": stamp, "Forecast Time": stamp,
+            "Data Format": "[Longitude, Latitude, Aurora]", "coordinates": coords}
+
+
+def _synthetic_ovation_jpeg(rnd, phase, size=600):
+    """Image type OVATION : globe sombre + ovale auroral bruité (vert → rouge)."""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(rnd.randrange(1 << 30))
+    y, x = np.mgrid[0:size, 0:size]
+    cx = cy = size / 2
+    r = np.hypot(x - cx, y - cy) / (size / 2)
+    theta = np.arctan2(y - cy, x - cx)
+    globe = r < 0.95
+    oval_r = 0.45 + 0.05 * np.sin(theta + phase * 0.3)
+    intensity = np.exp(-((r - oval_r) / 0.07) ** 2) * (0.6 + 0.4 * np.cos(theta - 1.0))
+    intensity = np.clip(intensity + rng.normal(0, 0.05, intensity.shape), 0, 1) * globe
+    img = np.zeros((size, size, 3), dtype=np.float64)
+    img[..., 2] = globe * 60 + (1 - globe) * 10
+    img[..., 1] = globe * 40 + 255 * intensity
+    img[..., 0] = 255 * np.clip(intensity * 2 - 1, 0, 1)
+    buf = io.BytesIO()
+    Image.fromarray(img.clip(0, 255).astype("uint8")).save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", action="store_true", help="générer des fixtures hors ligne")
+    args = parser.parse_args()
+    print(f"Fixtures → {FIXTURES}")
+    record_synthetic() if args.synthetic else record_live()
@@ -0,0 +1,335 @@
+# bench/run.py
+"""
+Suite de benchmarks hors ligne (fixtures + serveur stub + puits SMTP local).
+
+    python -m bench.run                   # tous les cas, résultat ajouté à l'historique
+    python -m bench.run -k gif -k map     # filtrer les cas par nom
+    python -m bench.run --check           # code de sortie 1 en cas de régression
+
+Chaque cas mesure la latence (p50/p95), le débit (opérations/s) et le pic
+mémoire Python (tracemalloc). Les résultats sont ajoutés à
+bench/results/history.jsonl ; --check compare à la médiane des dernières
+exécutions sur la même machine.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bench.record_fixtures import FIXTURES, FRAME_DIRS, LAT, LON, TZ
+from bench.smtp_sink import SmtpSink
+from bench.stub_server import StubServer
+
+HISTORY = Path(__file__).parent / "results" / "history.jsonl"
+
+CASES = {}
+
+
+def case(name, iterations=20, ops=1):
+    """Enregistre un cas : `fn(env)` renvoie la fonction mesurée."""
+    def deco(fn):
+        CASES[name] = (fn, iterations, ops)
+        return fn
+    return deco
+
+
+# -------------------------------------------------------------------
+# Cas mesurés
+# -------------------------------------------------------------------
+
+@case("kp_series_parse", iterations=30)
+def bench_kp_series(env):
+    from model import functions
+
+    def run():
+        functions.get_kp_series.namespace.invalidate(drop=True)   # contourne le cache
+        functions.get_kp_series(limit_minutes=240)
+    return run
+
+
+@case("weather_dataframe", iterations=30)
+def bench_weather(env):
+    from model import functions
+
+    def run():
+        functions.get_weather.namespace.invalidate(drop=True)   # contourne le cache
+        functions.get_weather(LAT, LON, TZ)
+    return run
+
+
+@case("chance_score", iterations=20, ops=10_000)
+def bench_chance_score(env):
+    from model.functions import chance_score
+    inputs = [(i % 90 / 10, i % 101, i % 2) for i in range(10_000)]
+
+    def run():
+        for kp, cloud, dark in inputs:
+            chance_score(kp, cloud, dark)
+    return run
+
+
+@case("cache_long_tail", iterations=10, ops=5000)
+def bench_cache_long_tail(env):
+    import pandas as pd
+    from model import cache
+
+    frame = pd.DataFrame({"x": range(48), "y": [0.5] * 48})
+    ns = cache.Namespace("bench_long_tail", ttl=600, max_entries=256, max_bytes=2 * 2**20)
+
+    def run():
+        for i in range(5000):   # 5000 localisations distinctes, espace borné à 256
+            ns.store((i / 100, i / 100, "UTC"), frame)
+            ns.lookup((i / 100, i / 100, "UTC"))
+    return run
+
+
+@case("map_figure", iterations=10)
+def bench_map_figure(env):
+    from model import maps, ovation
+    overlay = maps.visibility_overlay(ovation.get_grid())
+    return lambda: maps.build_kp_map(4.3, 58.3, maps.MAIN_CITIES, overlay).to_json()
+
+
+@case("map_overlay", iterations=10)
+def bench_map_overlay(env):
+    from model import maps, ovation
+    grid = ovation.get_grid()
+
+    def run():
+        maps.visibility_overlay.namespace.invalidate(drop=True)   # contourne le cache de l'image
+        maps.visibility_overlay(grid)
+    return run
+
+
+@case("compare_locations", iterations=20)
+def bench_compare_locations(env):
+    from model import compare
+    locations = [(name, *coords) for name, coords in compare.QUICK_LOCATIONS.items()]
+    compare.compare_locations(locations, 72)   # nébulosité et prévision Kp en cache : calcul seul
+    return lambda: compare.compare_locations(locations, 72, kp_now=3.0)
+
+
+@case("clear_sky", iterations=20)
+def bench_clear_sky(env):
+    from model import clearsky
+    clearsky.nearest_clear_sky(68.35, 18.83, 100)   # cellules en cache : quadrillage + score seuls
+    return lambda: clearsky.nearest_clear_sky(68.35, 18.83, 100, kp_now=3.0)
+
+
+@case("kp_archive_stats", iterations=50)
+def bench_kp_archive_stats(env):
+    import tempfile
+    from bench.record_fixtures import synthetic_gfz_kp
+    from model import kp_archive
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_kp_"))
+    source = tmp / "Kp_ap_since_1932.txt"
+    source.write_text(synthetic_gfz_kp())       # ~95 ans de blocs de 3 h
+    archive = kp_archive.load(kp_archive.build(source, tmp / "kp_archive.npz"))
+
+    def run():
+        archive.season(5)
+        archive.yearly(5)
+        archive.exceedance(7)
+        archive.recurrence()
+    return run
+
+
+@case("solar_wind_nowcast", iterations=100)
+def bench_solar_wind_nowcast(env):
+    from model import solarwind
+    sw = solarwind.get_solar_wind()      # 2 h de mesures à la minute (fixture)
+    return lambda: solarwind.nowcast(sw)
+
+
+@case("climatology_lookup", iterations=50)
+def bench_climatology_lookup(env):
+    import tempfile
+    from model import climatology, compare
+
+    # bande étroite construite depuis l'archive du stub, sans quota (3 requêtes)
+    path = climatology.build(bands=(66, 70), years=(2023, 2024), quota=None, log=lambda _: None,
+                             path=Path(tempfile.mkdtemp(prefix="bench_clim_")) / "clim.npz")
+    table = climatology.load(path)
+    lat, lon = zip(*compare.QUICK_LOCATIONS.values())
+
+    def run():
+        table.cloud(68.35, 18.83, 11)
+        climatology.best_months(lat, lon, table)
+    return run
+
+
+@case("snapshot_peek", iterations=1000)
+def bench_snapshot_peek(env):
+    from model import snapshot
+    from model.functions import geocode_place, get_kp_now
+
+    place = "Abisko, Sweden"
+    geo = geocode_place(place)
+    snapshot.save(place, geo=geo, kp_now=get_kp_now()[0], kp_score=4.2, dark=1, cloud_now=35.0)
+    return lambda: snapshot.peek(place)
+
+
+@case("snapshot_bundle", iterations=20)
+def bench_snapshot_bundle(env):
+    from model import snapshot
+
+    # bundle complet d'une localisation rapide, caches chauds : figures + JSON
+    inputs = snapshot.bundle_inputs("Abisko, Sweden")
+    return lambda: snapshot.build_bundle("Abisko, Sweden", inputs=inputs)
+
+
+@case("make_gif", iterations=5)
+def bench_make_gif(env):
+    from PIL import Image
+    from model.ovation import make_gif
+
+    paths = sorted((FIXTURES / FRAME_DIRS["north"]).glob("frame_*.jpg"))
+    base = [Image.open(p).convert("RGB") for p in paths]
+    frames = [base[i % len(base)] for i in range(19)]   # fenêtre de 90 min
+    return lambda: make_gif(frames, fps=4)
+
+
+@case("gif_from_pyramid", iterations=10)
+def bench_gif_from_pyramid(env):
+    from model import ovation
+
+    slot = ovation.latest_slot()
+    ovation.fetch_frames("north", 90, step_min=5, slot=slot, level="medium")   # pyramide construite une fois
+
+    def run():
+        ovation.animation_gif.namespace.invalidate(drop=True)   # contourne le cache du GIF
+        ovation.animation_gif("north", 90, 4, slot, "medium")
+    return run
+
+
+@case("fetch_frames", iterations=5)
+def bench_fetch_frames(env):
+    from model.ovation import fetch_frames
+    return lambda: fetch_frames("north", 90, step_min=5)
+
+
+@case("alert_send", iterations=20)
+def bench_alert_send(env):
+    from model.alerts import send_aurora_alert_email
+    config = {"smtp_server": "127.0.0.1", "smtp_port": env["smtp"].port,
+              "sender_email": "bench@aurora.local", "sender_password": None, "starttls": False}
+
+    def run():
+        ok, msg = send_aurora_alert_email("dest@aurora.local", 6.3, "Stockholm, Suède", 0.81,
+                                          cloud_pct=12.0, dark_flag=1, smtp_config=config, min_kp=4)
+        assert ok, msg
+    return run
+
+
+# -------------------------------------------------------------------
+# Mesure
+# -------------------------------------------------------------------
+
+def measure(run, iterations, ops):
+    run()   # préchauffage (imports, caches de premier niveau)
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    durations.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(statistics.median(durations) * 1000, 3),
+        "p95_ms": round(durations[min(len(durations) - 1, int(0.95 * len(durations)))] * 1000, 3),
+        "ops_per_s": round(ops * len(durations) / sum(durations), 1),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).parent, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def load_history(machine):
+    if not HISTORY.exists():
+        return []
+    runs = [json.loads(line) for line in HISTORY.read_text(encoding="utf-8").splitlines() if line.strip()]
+    return [r for r in runs if r.get("machine") == machine]
+
+
+def find_regressions(results, history, tolerance, baseline_runs):
+    """Cas dont p50 ou le pic mémoire dépasse la médiane des dernières exécutions."""
+    regressions = []
+    for name, res in results.items():
+        previous = [r["results"][name] for r in history[-baseline_runs:] if name in r["results"]]
+        if not previous:
+            continue
+        for metric in ("p50_ms", "peak_kib"):
+            base = statistics.median(p[metric] for p in previous)
+            if base and res[metric] > base * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {res[metric]} > {base} (+{res[metric] / base - 1:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="filters", action="append", default=[], help="sous-chaîne du nom de cas")
+    parser.add_argument("--check", action="store_true", help="échoue si régression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="marge avant régression (défaut 25 %%)")
+    parser.add_argument("--baseline-runs", type=int, default=5)
+    parser.add_argument("--no-save", action="store_true", help="ne pas écrire dans l'historique")
+    args = parser.parse_args(argv)
+
+    stub = StubServer().start()
+    smtp = SmtpSink().start()
+    os.environ["AURORA_UPSTREAM_URL"] = stub.url
+    env = {"stub": stub, "smtp": smtp}
+    # Streamlit hors runtime : avertissements sans intérêt ici
+    from streamlit import logger as st_logger
+    st_logger.set_log_level("error")
+
+    results = {}
+    for name, (fn, iterations, ops) in CASES.items():
+        if args.filters and not any(f in name for f in args.filters):
+            continue
+        results[name] = res = measure(fn(env), iterations, ops)
+        print(f"{name:<20} p50 {res['p50_ms']:9.3f} ms   p95 {res['p95_ms']:9.3f} ms   "
+              f"{res['ops_per_s']:>10.1f} ops/s   pic {res['peak_kib']:>9.1f} Kio")
+
+    machine = f"{platform.node()}/{platform.machine()}/py{platform.python_version()}"
+    history = load_history(machine)
+    regressions = find_regressions(results, history, args.tolerance, args.baseline_runs)
+    for line in regressions:
+        print(f"RÉGRESSION {line}")
+
+    if not args.no_save:
+        HISTORY.parent.mkdir(parents=True, exist_ok=True)
+        with HISTORY.open("a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "machine": machine,
+                "results": results,
+            }) + "\n")
+
+    stub.shutdown()
+    smtp.shutdown()
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# bench/smtp_sink.py
+"""
+Puits SMTP local minimal : accepte et compte les messages sans les délivrer.
+
+Utilisé avec smtp_config={'smtp_server': '127.0.0.1', 'smtp_port': sink.port,
+'starttls': False, ...} pour mesurer l'envoi des alertes hors ligne.
+"""
+
+import socketserver
+import threading
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self._reply("220 aurora-sink ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode("ascii", "replace").strip().upper()
+            if cmd.startswith(("EHLO", "HELO")):
+                self._reply("250-aurora-sink\r\n250 8BITMIME")
+            elif cmd.startswith("DATA"):
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                for data_line in self.rfile:
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    size += len(data_line)
+                self.server.record(size)
+                self._reply("250 OK queued")
+            elif cmd.startswith("QUIT"):
+                self._reply("221 Bye")
+                return
+            else:   # MAIL, RCPT, RSET, NOOP...
+                self._reply("250 OK")
+
+    def _reply(self, text):
+        self.wfile.write(text.encode("ascii") + b"\r\n")
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, host="127.0.0.1"):
+        super().__init__((host, port), _SmtpHandler)
+        self.messages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def record(self, size):
+        with self._lock:
+            self.messages += 1
+            self.bytes += size
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True, name="smtp-sink").start()
+        return self
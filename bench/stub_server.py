@@ -0,0 +1,262 @@
+# bench/stub_server.py
+"""
+Serveur HTTP local rejouant les fixtures de bench/fixtures à la place des APIs.
+
+Avec AURORA_UPSTREAM_URL=http://127.0.0.1:<port>, model.upstream réécrit
+https://<hôte>/<chemin> en http://127.0.0.1:<port>/<hôte>/<chemin>.
+
+Règles de résolution :
+  - /<hôte>/<chemin>        → fixtures/<hôte>/<chemin>, sinon <chemin>.json ;
+  - image absente d'un dossier contenant des frame_*.jpg → une de ces images ;
+  - les horodatages des JSON sont recalés sur l'heure courante au démarrage ;
+  - le géocodage renvoie des coordonnées propres à chaque nom recherché
+    (décalage déterministe), pour que les sessions simulées varient ;
+  - une prévision Open-Meteo pour plusieurs coordonnées (« lat1,lat2,... »)
+    renvoie une liste, une série de nébulosité propre à chaque point,
+    prolongée sur `forecast_days` ;
+  - l'archive Open-Meteo (nébulosité journalière) est synthétisée pour chaque
+    point et chaque jour demandés (saisonnalité propre au point) ;
+  - chaque réponse porte un ETag ; If-None-Match identique → 304 sans corps ;
+  - /__stats__ renvoie le nombre de requêtes servies par hôte/chemin.
+
+    python -m bench.stub_server --port 8765 [--latency-ms 50]
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+# -------------------------------------------------------------------
+# Recalage des horodatages
+# -------------------------------------------------------------------
+
+def _parse_stamp(s):
+    if not isinstance(s, str) or len(s) < 16 or s[4] != "-" or s[10] not in "T ":
+        return None
+    try:
+        return datetime.fromisoformat(s)
+    except ValueError:
+        return None
+
+
+def _format_like(template, t):
+    if "." in template:
+        return t.strftime("%Y-%m-%d %H:%M:%S.000")
+    if len(template) == 16:
+        return t.strftime("%Y-%m-%dT%H:%M")
+    return t.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def rebase_times(payload, now=None):
+    """Décale les séries temporelles pour que la plus récente tombe « maintenant »."""
+    now = now or datetime.now()
+    if isinstance(payload, dict) and "time" in payload.get("hourly", {}):
+        times = payload["hourly"]["time"]
+        stamps = [_parse_stamp(s) for s in times]
+        # Prévision : la série commence à minuit du jour courant
+        delta = now.replace(hour=0, minute=0, second=0, microsecond=0) - min(stamps)
+        payload["hourly"]["time"] = [_format_like(s, t + delta) for s, t in zip(times, stamps)]
+    elif isinstance(payload, list) and payload and isinstance(payload[0], dict) and "time_tag" in payload[0]:
+        stamps = [_parse_stamp(row["time_tag"]) for row in payload]
+        delta = now.replace(second=0, microsecond=0) - max(stamps)
+        for row, t in zip(payload, stamps):
+            row["time_tag"] = _format_like(row["time_tag"], t + delta)
+    elif isinstance(payload, list) and len(payload) > 1 and payload[0] and payload[0][0] == "time_tag":
+        stamps = [_parse_stamp(row[0]) for row in payload[1:]]
+        # Prévision Kp : le dernier bloc observé tombe « maintenant », les blocs prévus après
+        observed = [t for row, t in zip(payload[1:], stamps) if "observed" in payload[0] and row[2] == "observed"]
+        anchor = max(observed) if observed else max(stamps)
+        if len(stamps) > 1 and stamps[1] - stamps[0] < timedelta(hours=1):
+            delta = now.replace(second=0, microsecond=0) - anchor      # produits à la minute (vent solaire)
+        else:
+            delta = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=now.hour % 3) - anchor
+        for row, t in zip(payload[1:], stamps):
+            row[0] = _format_like(row[0], t + delta)
+    return payload
+
+
+# -------------------------------------------------------------------
+# Serveur
+# -------------------------------------------------------------------
+
+def _geocode_variant(body, query):
+    """Adapte la réponse de géocodage au nom demandé (coordonnées distinctes)."""
+    name = (query.get("name") or [""])[0]
+    payload = json.loads(body)
+    if name and payload.get("results"):
+        h = zlib.crc32(name.encode("utf-8"))
+        rec = payload["results"][0]
+        rec["name"] = name.split(",")[0].strip()
+        rec["latitude"] = round(rec["latitude"] + (h % 1000) / 100 - 5, 4)
+        rec["longitude"] = round(rec["longitude"] + (h // 1000 % 2000) / 100 - 10, 4)
+    return json.dumps(payload).encode("utf-8")
+
+
+def _forecast_variant(body, query):
+    """Plusieurs coordonnées → liste de prévisions, nébulosité décalée par point."""
+    lats = (query.get("latitude") or [""])[0].split(",")
+    lons = (query.get("longitude") or [""])[0].split(",")
+    if len(lats) < 2:
+        return body
+    base = json.loads(body)
+    hourly = base["hourly"]
+    days = int((query.get("forecast_days") or ["2"])[0])
+    start = datetime.fromisoformat(hourly["time"][0])
+    times = [(start + timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(24 * days)]
+    cloud = hourly["cloudcover"]
+    out = []
+    for lat, lon in zip(lats, lons):
+        h = zlib.crc32(f"{lat},{lon}".encode())
+        shift, bias = h % 24, (h // 24) % 61 - 30
+        series = [max(0, min(100, cloud[(i + shift) % len(cloud)] + bias)) for i in range(len(times))]
+        out.append({"latitude": float(lat), "longitude": float(lon), "timezone": "GMT",
+                    "hourly": {"time": times, "cloudcover": series}})
+    return json.dumps(out).encode("utf-8")
+
+
+def _archive_variant(body, query):
+    """Archive journalière : une série par coordonnée, sur [start_date, end_date]."""
+    import random
+
+    lats = (query.get("latitude") or [""])[0].split(",")
+    lons = (query.get("longitude") or [""])[0].split(",")
+    start = datetime.fromisoformat((query.get("start_date") or ["2024-01-01"])[0])
+    end = datetime.fromisoformat((query.get("end_date") or ["2024-12-31"])[0])
+    days = [start + timedelta(days=d) for d in range((end - start).days + 1)]
+    stamps = [d.strftime("%Y-%m-%d") for d in days]
+    out = []
+    for lat, lon in zip(lats, lons):
+        rnd = random.Random(zlib.crc32(f"{lat},{lon}".encode()))
+        base, swing = rnd.uniform(45, 80), rnd.uniform(5, 20) * (1 if float(lat) >= 0 else -1)
+        series = [round(max(0.0, min(100.0, base + swing * math.cos(2 * math.pi * (d.timetuple().tm_yday - 320) / 365)
+                                     + rnd.gauss(0, 25))), 1) for d in days]
+        out.append({"latitude": float(lat), "longitude": float(lon), "timezone": "GMT",
+                    "daily_units": {"time": "iso8601", "cloud_cover_mean": "%"},
+                    "daily": {"time": stamps, "cloud_cover_mean": series}})
+    return json.dumps(out if len(out) > 1 else out[0]).encode("utf-8")
+
+
+# Réponses dépendant des paramètres de la requête
+VARIANTS = {
+    "archive-api.open-meteo.com/v1/archive": _archive_variant,
+    "geocoding-api.open-meteo.com/v1/search": _geocode_variant,
+    "api.open-meteo.com/v1/forecast": _forecast_variant,
+}
+
+
+class FixtureStore:
+    """Fixtures chargées une fois en mémoire (JSON recalés, images brutes)."""
+
+    def __init__(self, root=FIXTURES):
+        self.root = Path(root)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, rel):
+        with self._lock:
+            if rel not in self._cache:
+                self._cache[rel] = self._load(rel)
+            return self._cache[rel]
+
+    def _load(self, rel):
+        for candidate in (self.root / rel, self.root / f"{rel}.json"):
+            if candidate.is_file():
+                return self._read(candidate)
+        path = self.root / rel
+        if path.suffix == ".jpg" and path.parent.is_dir():
+            frames = sorted(path.parent.glob("frame_*.jpg"))
+            if frames:
+                return self._read(frames[zlib.crc32(path.name.encode()) % len(frames)])
+        return None
+
+    @staticmethod
+    def _read(path):
+        if path.suffix == ".json":
+            payload = rebase_times(json.loads(path.read_text(encoding="utf-8")))
+            return json.dumps(payload).encode("utf-8"), "application/json"
+        return path.read_bytes(), "image/jpeg" if path.suffix == ".jpg" else "application/octet-stream"
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, host="127.0.0.1", latency_ms=0, root=FIXTURES):
+        super().__init__((host, port), _Handler)
+        self.store = FixtureStore(root)
+        self.latency_s = latency_ms / 1000
+        self.hits = Counter()
+        self._hits_lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True, name="stub-upstream").start()
+        return self
+
+    def stats(self):
+        with self._hits_lock:
+            return dict(self.hits)
+
+    def count(self, key):
+        with self._hits_lock:
+            self.hits[key] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path.lstrip("/")
+        if path == "__stats__":
+            return self._send(200, json.dumps(self.server.stats()).encode(), "application/json")
+        found = self.server.store.lookup(path)
+        host, _, rest = path.partition("/")
+        key = f"{host}/{rest.rsplit('/', 1)[0]}/*" if rest.endswith(".jpg") else path
+        self.server.count(key)
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+        if found is None:
+            return self._send(404, b"not found", "text/plain")
+        body, ctype = found
+        if path in VARIANTS:
+            body = VARIANTS[path](body, parse_qs(parts.query))
+        etag = f'"{zlib.crc32(body):08x}"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", ctype, etag)
+        self._send(200, body, ctype, etag)
+
+    def _send(self, status, body, ctype, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    server = StubServer(args.port, latency_ms=args.latency_ms)
+    print(f"Stub upstream sur {server.url} — export AURORA_UPSTREAM_URL={server.url}")
+    server.serve_forever()
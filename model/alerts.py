@@ -5,9 +5,11 @@ Envoie des notifications quand les conditions d'observation sont favorables.
 """
 
 import smtplib
+from datetime import datetime, timezone
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import pandas as pd
+
+from model import metrics
 
 
 def send_aurora_alert_email(
@@ -18,7 +20,9 @@ def send_aurora_alert_email(
     cloud_pct: float = None,
     dark_flag: int = None,
     smtp_config: dict = None,
-    min_kp: int = None  # ← NOUVEAU PARAMÈTRE
+    min_kp: int = None,  # ← NOUVEAU PARAMÈTRE
+    hemisphere: str = "north",
+    nowcast: dict = None
 ) -> tuple[bool, str]:
     """
     Envoie une alerte email quand les conditions d'aurores sont favorables.
@@ -30,8 +34,12 @@ def send_aurora_alert_email(
         score: Score de probabilité (0-1)
         cloud_pct: Pourcentage de couverture nuageuse (optionnel)
         dark_flag: 1 si nuit, 0 si jour (optionnel)
-        smtp_config: Configuration SMTP (serveur, port, identifiants)
+        smtp_config: Configuration SMTP (serveur, port, identifiants ;
+            'starttls': False pour un relais local sans TLS)
         min_kp: Kp minimum calculé pour cette localisation (optionnel)
+        hemisphere: "north" ou "south" (aurores boréales / australes, direction d'observation)
+        nowcast: Estimation du vent solaire ayant déclenché l'alerte (model.solarwind.nowcast,
+            via effective_kp) : `kp_value` est alors un Kp attendu, pas encore mesuré
     
     Returns:
         (success: bool, message: str) - Tuple avec succès et message
@@ -64,6 +72,10 @@ def send_aurora_alert_email(
             status = "MOYEN"
             color = "#c0392b"  # Rouge
         
+        # Vocabulaire selon l'hémisphère : l'ovale est côté pôle
+        aurores = "AURORES AUSTRALES" if hemisphere == "south" else "AURORES BORÉALES"
+        direction = "le sud" if hemisphere == "south" else "le nord"
+
         # Calculer le ciel dégagé si cloud_pct fourni
         clear_pct = 100 - cloud_pct if cloud_pct is not None else None
         
@@ -89,10 +101,34 @@ def send_aurora_alert_email(
             """
             
             kp_info_text = f"\n📍 Information : {kp_message}\n"
+
+        # Alerte anticipée : la perturbation mesurée à L1 n'a pas encore atteint la Terre
+        nowcast_html = ""
+        nowcast_text = ""
+        kp_label = "Indice Kp Actuel"
+        subject = f'🌌 Alerte Aurores ! Kp = {kp_value:.1f} à {location}'
+        if nowcast is not None:
+            arrival = nowcast["arrival"].strftime("%H:%M")
+            kp_label = "Indice Kp Attendu"
+            subject = f'🌌 Alerte Aurores ! Kp ≈ {kp_value:.1f} attendu vers {arrival} UTC à {location}'
+            wind = ", ".join(part for part in (
+                f"vitesse {nowcast['speed']:.0f} km/s" if nowcast.get("speed") is not None else "",
+                f"Bz {nowcast['bz']:+.1f} nT" if nowcast.get("bz") is not None else "",
+            ) if part)
+            nowcast_message = (f"Le vent solaire mesuré au point L1 ({wind}) annonce un Kp d'environ "
+                               f"{kp_value:.1f} vers {arrival} UTC, dans ~{nowcast['lead_min']} min. "
+                               "Préparez-vous maintenant !")
+            nowcast_html = f"""
+            <div style="background-color: #e8f4fd; padding: 15px; border-left: 4px solid #3498db; margin: 20px 0; border-radius: 3px;">
+                <p style="margin: 0;"><strong>⏱️ Alerte anticipée :</strong></p>
+                <p style="margin: 10px 0 0 0;">{nowcast_message}</p>
+            </div>
+            """
+            nowcast_text = f"\n⏱️ Alerte anticipée : {nowcast_message}\n"
         
         # Construire le message
         msg = MIMEMultipart('alternative')
-        msg['Subject'] = f'🌌 Alerte Aurores ! Kp = {kp_value:.1f} à {location}'
+        msg['Subject'] = subject
         msg['From'] = smtp_config['sender_email']
         msg['To'] = recipient_email
         
@@ -163,7 +199,7 @@ def send_aurora_alert_email(
           </head>
           <body>
             <div class="header">
-              <h1>🌌 ALERTE AURORES BORÉALES !</h1>
+              <h1>🌌 ALERTE {aurores} !</h1>
               <p style="font-size: 18px; margin: 10px 0;">Conditions {status} détectées</p>
             </div>
             
@@ -172,13 +208,14 @@ def send_aurora_alert_email(
                 <strong>📍 Localisation :</strong> {location}
               </p>
               
+              {nowcast_html}
               {kp_info_html}
               
               <div class="status-box">
                 <h2 style="margin-top: 0; color: {color};">{emoji} Statut : {status}</h2>
                 
                 <div class="metric">
-                  <div class="metric-label">Indice Kp Actuel</div>
+                  <div class="metric-label">{kp_label}</div>
                   <div class="metric-value">{kp_value:.1f}<span style="font-size: 14px; color: #666;"> / 9</span></div>
                 </div>
                 
@@ -214,7 +251,7 @@ def send_aurora_alert_email(
                 <ul>
                   <li><strong>Meilleure période :</strong> Entre 22h et 2h du matin (heure locale)</li>
                   <li><strong>Lieu idéal :</strong> Trouvez un endroit sombre, loin des lumières de la ville</li>
-                  <li><strong>Direction :</strong> Regardez vers le nord</li>
+                  <li><strong>Direction :</strong> Regardez vers {direction}</li>
                   <li><strong>Patience :</strong> Les aurores apparaissent souvent par vagues, restez vigilant</li>
                   <li><strong>Photo :</strong> Utilisez un trépied, ISO 1600-3200, pose longue 5-15 secondes</li>
                 </ul>
@@ -236,10 +273,10 @@ def send_aurora_alert_email(
             </div>
             
             <div class="footer">
-              <p><strong>AurorAlerte</strong> - Dashboard de surveillance des aurores boréales</p>
+              <p><strong>AurorAlerte</strong> - Dashboard de surveillance des aurores polaires</p>
               <p>Vous recevez cet email car vous avez activé les alertes automatiques dans AurorAlerte.</p>
               <p style="font-size: 11px; color: #999;">
-                {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')} UTC
+                {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC
               </p>
             </div>
           </body>
@@ -248,12 +285,12 @@ def send_aurora_alert_email(
         
         # Ajouter version texte simple (fallback)
         text_body = f"""
-        🌌 ALERTE AURORES BORÉALES !
+        🌌 ALERTE {aurores} !
         
         Conditions {status} détectées à {location}
-        {kp_info_text}
+        {nowcast_text}{kp_info_text}
         📊 Données actuelles :
-        - Indice Kp actuel : {kp_value:.1f} / 9
+        - {kp_label} : {kp_value:.1f} / 9
         {f'- Kp minimum requis : {min_kp} / 9' if min_kp is not None else ''}
         - Score de Probabilité : {score:.2f} / 1.0
         {f'- Ciel Dégagé : {clear_pct:.0f}%' if clear_pct is not None else ''}
@@ -262,24 +299,29 @@ def send_aurora_alert_email(
         💡 Conseils :
         - Sortez entre 22h et 2h du matin
         - Trouvez un endroit sombre
-        - Regardez vers le nord
+        - Regardez vers {direction}
         - Soyez patient !
         
         Voir le dashboard : https://web-production-ff2d6.up.railway.app/
         
         ---
-        AurorAlerte - {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')} UTC
+        AurorAlerte - {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M')} UTC
         """
         
         # Attacher les deux versions
         msg.attach(MIMEText(text_body, 'plain', 'utf-8'))
         msg.attach(MIMEText(html_body, 'html', 'utf-8'))
         
-        # Connexion au serveur SMTP et envoi
-        with smtplib.SMTP(smtp_config['smtp_server'], smtp_config['smtp_port']) as server:
-            server.starttls()
-            server.login(smtp_config['sender_email'], smtp_config['sender_password'])
-            server.send_message(msg)
+        # Connexion au serveur SMTP et envoi (mesuré dans model.metrics)
+        with metrics.track("smtp") as call:
+            call.nbytes = len(msg.as_bytes())
+            with smtplib.SMTP(smtp_config['smtp_server'], smtp_config['smtp_port']) as server:
+                # Relais local (ex. puits SMTP des benchmarks) : sans TLS ni authentification
+                if smtp_config.get('starttls', True):
+                    server.starttls()
+                if smtp_config.get('sender_password'):
+                    server.login(smtp_config['sender_email'], smtp_config['sender_password'])
+                server.send_message(msg)
         
         return True, f"Email envoyé avec succès à {recipient_email}"
         
@@ -291,10 +333,55 @@ def send_aurora_alert_email(
         return False, f"Erreur inattendue : {str(e)}"
 
 
+def min_kp_for_location(lat: float, lon: float) -> int:
+    """
+    Kp minimum pour voir des aurores à (lat, lon), dans l'un ou l'autre hémisphère.
+
+    Calculé sur la latitude géomagnétique (model.geomag, importé ici seulement :
+    numpy n'est chargé que si le seuil automatique est utilisé).
+
+    Usage:
+        >>> min_kp_for_location(59.33, 18.07)     # Stockholm
+        5
+        >>> min_kp_for_location(64.84, -147.72)   # Fairbanks
+        1
+        >>> min_kp_for_location(-42.88, 147.33)   # Hobart
+        5
+    """
+    from model import geomag
+
+    return int(geomag.min_kp(geomag.magnetic_latitude(lat, lon)))
+
+
+def hemisphere_of(lat: float) -> str:
+    """« north » ou « south » : hémisphère d'observation d'une localisation."""
+    return "south" if lat < 0 else "north"
+
+
+def effective_kp(kp_now: float, nowcast: dict = None) -> tuple:
+    """
+    Kp retenu pour le score et les alertes : le Kp mesuré, ou l'estimation tirée
+    du vent solaire (model.solarwind.nowcast) si elle est plus élevée — la
+    perturbation atteint alors la Terre dans 30 à 60 minutes.
+
+    Returns:
+        (kp, nowcast) - nowcast vaut None quand le Kp mesuré est retenu
+
+    Usage:
+        >>> effective_kp(3.0, {"kp": 5.7, "lead_min": 43})
+        (5.7, {'kp': 5.7, 'lead_min': 43})
+        >>> effective_kp(4.3, {"kp": 2.1, "lead_min": 60})
+        (4.3, None)
+    """
+    if nowcast is not None and (kp_now is None or nowcast["kp"] > kp_now):
+        return nowcast["kp"], nowcast
+    return kp_now, None
+
+
 def should_send_alert(
     kp_value: float,
     kp_threshold: float,
-    last_alert_time: pd.Timestamp = None,
+    last_alert_time: datetime = None,
     cooldown_hours: float = 1.0
 ) -> bool:
     """
@@ -303,7 +390,8 @@ def should_send_alert(
     Args:
         kp_value: Indice Kp actuel
         kp_threshold: Seuil Kp pour déclencher l'alerte
-        last_alert_time: Timestamp de la dernière alerte envoyée
+        last_alert_time: Date de la dernière alerte envoyée (datetime ou
+            pd.Timestamp, avec ou sans fuseau)
         cooldown_hours: Heures à attendre entre deux alertes
     
     Returns:
@@ -312,7 +400,7 @@ def should_send_alert(
     Usage:
         >>> should_send_alert(6.5, 5.0, None, 1.0)
         True
-        >>> last = pd.Timestamp.now()
+        >>> last = datetime.now()
         >>> should_send_alert(6.5, 5.0, last, 1.0)  # Immédiatement après
         False
     """
@@ -325,7 +413,7 @@ def should_send_alert(
         return True
     
     # Vérifier le cooldown
-    now = pd.Timestamp.now()
+    now = datetime.now(last_alert_time.tzinfo)
     time_since_last = (now - last_alert_time).total_seconds() / 3600  # En heures
     
     return time_since_last >= cooldown_hours
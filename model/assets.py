@@ -0,0 +1,124 @@
+# model/assets.py
+"""
+Variantes pré-calculées des images statiques (bannière, logo).
+
+Chaque image source est redimensionnée et compressée une seule fois (WebP,
+ou PNG quantifié si Pillow n'a pas WebP) dans `static/`, sous un nom qui
+contient l'empreinte de la source et des paramètres : `banner.<hash>.webp`.
+Aucun décodage ni rééchantillonnage n'a lieu pendant les reruns.
+
+Streamlit sert `static/` tel quel (`server.enableStaticServing`) : `url`
+donne l'adresse de la variante, à placer dans une balise <img> (st.image ne
+prend une URL statique relative que dans les versions récentes de
+Streamlit, et ré-encode un fichier local à chaque rerun). Sans service
+statique, ou si la variante ne peut pas être construite (dossier en lecture
+seule, Pillow sans encodeur), `image` donne le fichier à passer à st.image :
+la variante, sinon l'image source telle quelle.
+
+    python -m model.assets     # construction à l'étape de build (sinon au premier appel)
+"""
+
+import functools
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+STATIC_DIR = ROOT / "static"
+STATIC_URL = "/app/static"
+
+logger = logging.getLogger("aurora.assets")
+
+# nom -> (source, (largeur, hauteur) ; hauteur None = proportionnelle)
+SPECS = {
+    "banner": ("assets/aurora_banner.jpg", (1100, 200)),
+    "logo": ("assets/logo.png", (480, None)),
+}
+WEBP_QUALITY = 82
+PIPELINE_VERSION = 1     # à incrémenter si le rendu change à source identique
+
+
+def _fingerprint(name, source):
+    digest = hashlib.sha256(source.read_bytes())
+    digest.update(repr((SPECS[name], WEBP_QUALITY, PIPELINE_VERSION)).encode())
+    return digest.hexdigest()[:12]
+
+
+def _render(source, size):
+    """Redimensionne (LANCZOS) et encode ; renvoie (octets, extension)."""
+    from PIL import Image, features
+
+    with Image.open(source) as img:
+        width, height = size
+        if height is None:
+            height = round(img.height * width / img.width)
+        img = img.resize((width, height), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        if features.check("webp"):
+            img.save(buf, format="WEBP", quality=WEBP_QUALITY, method=6)
+            return buf.getvalue(), "webp"
+        img.quantize(256).save(buf, format="PNG", optimize=True)
+        return buf.getvalue(), "png"
+
+
+@functools.cache
+def build(name):
+    """Chemin de la variante de `name` (construite si absente), ou None sans source."""
+    source_rel, size = SPECS[name]
+    source = ROOT / source_rel
+    if not source.exists():
+        return None
+    fingerprint = _fingerprint(name, source)
+    for ext in ("webp", "png"):
+        existing = STATIC_DIR / f"{name}.{fingerprint}.{ext}"
+        if existing.exists():
+            return existing
+
+    data, ext = _render(source, size)
+    STATIC_DIR.mkdir(exist_ok=True)
+    target = STATIC_DIR / f"{name}.{fingerprint}.{ext}"
+    # écriture atomique : plusieurs processus peuvent construire en même temps
+    fd, tmp = tempfile.mkstemp(dir=STATIC_DIR, prefix=f".{name}.")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, target)
+    for stale in STATIC_DIR.glob(f"{name}.*.*"):     # variantes d'anciennes sources
+        if stale != target:
+            stale.unlink(missing_ok=True)
+    return target
+
+
+def image(name):
+    """
+    Chemin à passer à st.image : variante redimensionnée (construite si
+    absente), sinon image source si la construction échoue. None si la
+    source manque.
+    """
+    try:
+        return build(name)
+    except Exception as e:
+        logger.warning("variante %s non construite, image source affichée : %s", name, e)
+        source = ROOT / SPECS[name][0]
+        return source if source.exists() else None
+
+
+def url(name, static_serving=True):
+    """
+    URL statique de la variante pour du HTML/CSS, ou None si Streamlit ne
+    sert pas `static/` ou si la variante n'a pas pu être construite.
+    """
+    path = image(name) if static_serving else None
+    if path is None or path.parent != STATIC_DIR:
+        return None
+    return f"{STATIC_URL}/{path.name}"
+
+
+if __name__ == "__main__":
+    for asset in SPECS:
+        path = build(asset)
+        print(f"{asset:<8} {path.relative_to(ROOT) if path else '(source absente)'}"
+              + (f"  {path.stat().st_size / 1024:.0f} Kio" if path else ""))
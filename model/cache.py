@@ -0,0 +1,473 @@
+# model/cache.py
+"""
+Cache des données externes, partagé par toutes les sessions du processus.
+
+Deux mécanismes :
+  - un registre d'espaces de noms (« geocode », « weather », « kp_series »...)
+    dont les entrées sont invalidables individuellement : « Actualiser » ne
+    revalide que les clés de la localisation de l'utilisateur, sans vider le
+    cache des autres sessions ni les ressources partagées ;
+  - des numéros de version par source : chaque récupération publie un jeton
+    décrivant la donnée reçue (horodatage de la valeur la plus récente,
+    créneau OVATION, empreinte de la réponse...). La version n'augmente que
+    lorsque ce jeton change ; les fragments s'en servent pour ne reconstruire
+    leurs figures que si la donnée a réellement bougé.
+
+Une entrée périmée qui a conservé les validateurs HTTP de sa réponse (ETag,
+Last-Modified) est revalidée par une requête conditionnelle : sur un 304,
+model.upstream lève NotModified et la valeur en cache est reconduite.
+
+Les espaces déclarés `shared=True` sont en plus recopiés dans le backend
+partagé entre processus (model.cache_backend, AURORA_CACHE_BACKEND) : un
+miss local y est cherché avant d'appeler la source.
+"""
+
+import inspect
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from model import metrics
+
+logger = logging.getLogger("aurora.cache")
+
+# Nombre de verrous de remplissage par espace (répartis par hachage de la clé)
+KEY_LOCK_STRIPES = 32
+
+
+# -------------------------------------------------------------------
+# Taille approximative des valeurs
+# -------------------------------------------------------------------
+
+def sizeof(value, _depth=0):
+    """Taille approximative en octets (DataFrame, octets, conteneurs, scalaires)."""
+    if hasattr(value, "items") and hasattr(value, "columns"):    # DataFrame pandas
+        # équivalent de memory_usage(deep=True), ~5× plus rapide
+        size = int(value.index.nbytes)
+        for _, col in value.items():
+            arr = col.array
+            size += arr.nbytes
+            if col.dtype == object:
+                size += sum(map(sys.getsizeof, arr))
+        return size
+    if hasattr(value, "nbytes") and not isinstance(value, (bytes, bytearray)):   # tableaux numpy / pyarrow
+        return int(value.nbytes)
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(sizeof(k, _depth + 1) + sizeof(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sizeof(v, _depth + 1) for v in value)
+    return size
+
+
+# -------------------------------------------------------------------
+# Registre des espaces de noms
+# -------------------------------------------------------------------
+
+class NotModified(Exception):
+    """La source a répondu 304 à une requête conditionnelle."""
+
+
+class _Entry:
+    __slots__ = ("value", "expires", "validators", "nbytes", "hits")
+
+    def __init__(self, value, expires, validators, nbytes):
+        self.value = value
+        self.expires = expires
+        self.validators = validators   # {"etag": ..., "last_modified": ...}
+        self.nbytes = nbytes
+        self.hits = 0
+
+
+class Namespace:
+    """
+    Entrées d'un espace de noms : clé → valeur avec expiration et validateurs.
+
+    Bornée par `max_entries` et `max_bytes` (taille estimée par `sizeof`) ;
+    au-delà, les entrées expirées partent d'abord, puis selon `policy` :
+    « lru » (la moins récemment lue) ou « lfu » (la moins lue, puis la plus ancienne).
+    """
+
+    def __init__(self, name, ttl, max_entries=None, max_bytes=None, policy="lru", shared=False):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"politique d'éviction inconnue : {policy}")
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.shared = shared
+        self.nbytes = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()   # ordre = de la moins à la plus récemment utilisée
+        self._lock = threading.Lock()
+        self._key_locks = [threading.RLock() for _ in range(KEY_LOCK_STRIPES)]
+
+    def lookup(self, key):
+        """(valeur, fraîche, validateurs) ou None si la clé est absente."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            fresh = time.time() < entry.expires
+            if fresh:
+                entry.hits += 1
+                self._entries.move_to_end(key)
+            return entry.value, fresh, entry.validators
+
+    def store(self, key, value, validators=None, expires=None, propagate=True):
+        """Enregistre `value` ; recopiée dans le backend partagé si l'espace l'est."""
+        nbytes = sizeof(value)
+        expires = time.time() + self.ttl if expires is None else expires
+        validators = validators or {}
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                self.evictions += 1     # valeur plus grosse que l'espace entier : non conservée
+            else:
+                self._entries[key] = _Entry(value, expires, validators, nbytes)
+                self.nbytes += nbytes
+                self._evict()
+        if propagate:
+            self._shared("set", key, value, expires, validators)
+
+    def _over_limit(self):
+        return ((self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self.nbytes > self.max_bytes))
+
+    def _evict(self):
+        if not self._over_limit():
+            return
+        # Les entrées expirées partent d'abord (une seule passe)
+        now = time.time()
+        for k in [k for k, e in self._entries.items() if e.expires <= now]:
+            self.nbytes -= self._entries.pop(k).nbytes
+            self.evictions += 1
+        while self._entries and self._over_limit():
+            if self.policy == "lfu":
+                # à fréquence égale, min() garde la première rencontrée : la moins récente
+                victim = min(self._entries, key=lambda k: self._entries[k].hits)
+            else:
+                victim = next(iter(self._entries))
+            self.nbytes -= self._entries.pop(victim).nbytes
+            self.evictions += 1
+
+    def renew(self, key):
+        """Reconduit une entrée revalidée (304) pour un nouveau TTL."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires = time.time() + self.ttl
+                self._entries.move_to_end(key)
+        self._shared("renew", key, time.time() + self.ttl)
+
+    def invalidate(self, key=None, drop=False):
+        """
+        Marque `key` (ou tout l'espace) comme périmée.
+
+        Par défaut la valeur et ses validateurs sont gardés pour une
+        revalidation conditionnelle ; `drop=True` supprime l'entrée.
+        """
+        with self._lock:
+            keys = list(self._entries) if key is None else [key]
+            for k in keys:
+                if k not in self._entries:
+                    continue
+                if drop:
+                    self.nbytes -= self._entries.pop(k).nbytes
+                else:
+                    self._entries[k].expires = 0
+        self._shared("delete" if drop else "expire", key)
+
+    # ---- Backend partagé entre processus
+    def load_shared(self, key):
+        """
+        Cherche `key` dans le backend partagé et la recopie localement.
+
+        Renvoie (valeur, fraîche, validateurs) comme `lookup`, ou None.
+        """
+        if not self.shared or backend() is None:
+            return None
+        try:
+            row = backend().get(self.name, repr(key))
+            if row is None:
+                return None
+            payload, expires, validators = row
+            value = cache_backend().decode(payload)
+        except Exception as e:
+            logger.warning("cache partagé %s : lecture impossible (%s)", self.name, e)
+            return None
+        validators = {k: v for k, v in validators.items() if v}
+        self.store(key, value, validators, expires=expires, propagate=False)
+        return value, time.time() < expires, validators
+
+    def _shared(self, op, key, *args):
+        """Répercute une opération sur le backend partagé ; ses erreurs ne bloquent jamais l'appli."""
+        if not self.shared or backend() is None:
+            return
+        skey = None if key is None else repr(key)
+        try:
+            if op == "set":
+                value, expires, validators = args
+                backend().set(self.name, skey, cache_backend().encode(value), expires, validators)
+            else:
+                getattr(backend(), op)(self.name, skey, *args)
+        except cache_backend().UnsupportedValue as e:
+            logger.debug("cache partagé %s : %s", self.name, e)
+        except Exception as e:
+            logger.warning("cache partagé %s : %s impossible (%s)", self.name, op, e)
+
+    def record(self, hit, shared=False):
+        """Compte un hit ou un miss (ici et dans model.metrics, source = nom de l'espace)."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.shared_hits += shared
+            else:
+                self.misses += 1
+        metrics.registry.cache_event(self.name, hit=hit)
+
+    def key_lock(self, key):
+        """Verrou de remplissage de `key` : une seule récupération concurrente par entrée."""
+        return self._key_locks[hash(key) % KEY_LOCK_STRIPES]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "policy": self.policy,
+                "shared": self.shared and backend() is not None,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_namespaces = {}
+_namespaces_lock = threading.Lock()
+
+
+def namespace(name, ttl=300, max_entries=None, max_bytes=None, policy="lru", shared=False):
+    """Espace de noms `name` (créé au premier appel avec ces paramètres)."""
+    with _namespaces_lock:
+        if name not in _namespaces:
+            _namespaces[name] = Namespace(name, ttl, max_entries, max_bytes, policy, shared)
+        return _namespaces[name]
+
+
+def invalidate(name, key=None, drop=False):
+    """Invalide une clé (ou tout) de l'espace `name` s'il existe."""
+    ns = _namespaces.get(name)
+    if ns is not None:
+        ns.invalidate(key, drop=drop)
+
+
+_backend = None
+_backend_loaded = False
+_backend_lock = threading.Lock()
+
+
+def cache_backend():
+    """Module model.cache_backend (importé à la demande : il charge pandas)."""
+    from model import cache_backend as module
+    return module
+
+
+def backend():
+    """Backend partagé configuré (AURORA_CACHE_BACKEND), ou None."""
+    global _backend, _backend_loaded
+    if not _backend_loaded:
+        with _backend_lock:
+            if not _backend_loaded:
+                try:
+                    _backend = cache_backend().from_env()
+                except Exception as e:
+                    logger.warning("backend de cache partagé indisponible : %s", e)
+                    _backend = None
+                _backend_loaded = True
+    return _backend
+
+
+def configure_backend(new_backend):
+    """Remplace le backend partagé (None : cache local uniquement)."""
+    global _backend, _backend_loaded
+    with _backend_lock:
+        _backend, _backend_loaded = new_backend, True
+
+
+# -------------------------------------------------------------------
+# Décorateur et revalidation conditionnelle
+# -------------------------------------------------------------------
+
+_local = threading.local()
+
+
+def cached(name, ttl, conditional=True, key=None, max_entries=None, max_bytes=None, policy="lru",
+           shared=False, is_error=None, error_ttl=60):
+    """
+    Met en cache les résultats de la fonction dans l'espace `name`.
+
+    Avec `conditional=True` (fonctions ne faisant qu'une requête HTTP), une
+    entrée périmée est revalidée par requête conditionnelle. `max_entries`,
+    `max_bytes` et `policy` bornent l'espace (voir Namespace). Avec
+    `shared=True`, les valeurs sont aussi lues et écrites dans le backend
+    partagé entre processus.
+
+    La clé est formée des arguments (valeurs par défaut comprises), donc
+    `f(240)` et `f(limit_minutes=240)` partagent la même entrée ; `key`
+    (appelée avec les mêmes arguments que la fonction) permet de la
+    normaliser, par ex. en arrondissant des coordonnées. `is_error`
+    (appelée avec la valeur renvoyée) repère une réponse d'erreur renvoyée
+    comme valeur (quota atteint…) : elle n'est gardée que `error_ttl`
+    secondes au lieu de `ttl`. Les hits et
+    misses sont comptés dans model.metrics sous la source `name`. La
+    fonction décorée expose :
+      - `.invalidate(*args, **kwargs)` : périme l'entrée de ces arguments ;
+      - `.cache_key(*args, **kwargs)` et `.namespace`.
+    """
+    def deco(func):
+        ns = namespace(name, ttl, max_entries, max_bytes, policy, shared)
+        sig = inspect.signature(func)
+
+        def cache_key(*args, **kwargs):
+            if key is not None:
+                return key(*args, **kwargs)
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return tuple(bound.arguments.values())
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            k = cache_key(*args, **kwargs)
+            found = ns.lookup(k)
+            if found is not None and found[1]:
+                ns.record(hit=True)
+                return found[0]
+            with ns.key_lock(k):
+                found = ns.lookup(k)    # rempli entre-temps par un autre thread ?
+                if found is not None and found[1]:
+                    ns.record(hit=True)
+                    return found[0]
+                from_shared = ns.load_shared(k)   # remplie par un autre processus ?
+                if from_shared is not None:
+                    if from_shared[1]:
+                        ns.record(hit=True, shared=True)
+                        return from_shared[0]
+                    found = from_shared
+                ns.record(hit=False)
+                outer = getattr(_local, "request", None)   # appel imbriqué éventuel
+                request = {"validators": found[2] if found else {}, "received": {}}
+                _local.request = request if conditional else None
+                try:
+                    value = func(*args, **kwargs)
+                except NotModified:
+                    ns.renew(k)
+                    return found[0]
+                finally:
+                    _local.request = outer
+                expires = time.time() + error_ttl if is_error is not None and is_error(value) else None
+                ns.store(k, value, request["received"], expires=expires)
+                return value
+
+        wrapper.invalidate = lambda *args, **kwargs: ns.invalidate(cache_key(*args, **kwargs))
+        wrapper.cache_key = cache_key
+        wrapper.namespace = ns
+        return wrapper
+    return deco
+
+
+def conditional_headers():
+    """En-têtes If-None-Match / If-Modified-Since de l'entrée en cours de revalidation."""
+    request = getattr(_local, "request", None)
+    if not request:
+        return {}
+    validators = request["validators"]
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def note_response(response):
+    """
+    Appelé par model.upstream après chaque réponse.
+
+    Retient les validateurs de la réponse pour l'entrée en cours de
+    remplissage, et lève NotModified sur un 304 pendant une revalidation.
+    """
+    request = getattr(_local, "request", None)
+    if not request:
+        return
+    if response.status_code == 304 and request["validators"]:
+        raise NotModified()
+    request["received"] = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def stats():
+    """Statistiques par espace de noms (entrées, octets, hits, évictions...)."""
+    with _namespaces_lock:
+        spaces = sorted(_namespaces.items())
+    return {name: ns.stats() for name, ns in spaces}
+
+
+# -------------------------------------------------------------------
+# Versions des données
+# -------------------------------------------------------------------
+
+_versions_lock = threading.Lock()
+_entries = {}   # source -> [version, jeton, horodatage du changement]
+
+
+def publish(source, token):
+    """Publie le jeton courant de `source` ; renvoie la version (incrémentée si le jeton a changé)."""
+    with _versions_lock:
+        entry = _entries.get(source)
+        if entry is None:
+            entry = _entries[source] = [1, token, time.time()]
+        elif entry[1] != token:
+            entry[0] += 1
+            entry[1] = token
+            entry[2] = time.time()
+        return entry[0]
+
+
+def data_version(*sources):
+    """Version courante de chaque source (0 si jamais publiée), sous forme de tuple."""
+    with _versions_lock:
+        return tuple(_entries[s][0] if s in _entries else 0 for s in sources)
+
+
+def versions():
+    """Instantané {source: {version, changed_at}} pour le diagnostic."""
+    with _versions_lock:
+        return {s: {"version": v, "changed_at": t} for s, (v, _, t) in sorted(_entries.items())}
+
+
+def weather_source(lat, lon):
+    """Nom de source des prévisions Open-Meteo pour une localisation."""
+    return f"weather:{float(lat):.3f},{float(lon):.3f}"
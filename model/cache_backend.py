@@ -0,0 +1,201 @@
+# model/cache_backend.py
+"""
+Backend de cache partagé entre processus (réplicas d'un même hôte).
+
+Les espaces de noms de model.cache déclarés `shared=True` gardent leur cache
+mémoire local (niveau 1) et écrivent en plus chaque valeur dans ce backend
+(niveau 2). Un autre processus qui manque une clé la lit alors ici avant
+d'appeler la source : N réplicas partagent un seul cache chaud.
+
+Choix du backend : AURORA_CACHE_BACKEND
+  - vide / « memory »          → aucun partage (défaut)
+  - « sqlite:///chemin/cache.db » → fichier SQLite (mode WAL) partagé par les processus
+
+Interface à implémenter pour un autre backend (ex. serveur compatible Redis :
+clé « aurora:<espace>:<clé> », charge utile + validateurs dans un hash, TTL
+via EXPIREAT) : get / set / renew / expire / delete, voir CacheBackend.
+
+Sérialisation (sans pickle) : DataFrame → Arrow IPC (pyarrow), octets bruts,
+sinon JSON (datetime, tuples et octets imbriqués étiquetés).
+"""
+
+import base64
+import io
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger("aurora.cache")
+
+# Durée de conservation des entrées expirées (revalidation conditionnelle possible)
+STALE_GRACE_S = 24 * 3600
+
+
+# -------------------------------------------------------------------
+# Sérialisation
+# -------------------------------------------------------------------
+
+class UnsupportedValue(TypeError):
+    """Valeur non sérialisable par le codec : elle reste dans le cache local."""
+
+
+def _json_default(obj):
+    if isinstance(obj, datetime):       # pd.Timestamp compris
+        return {"__ts__": obj.isoformat()}
+    if isinstance(obj, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(obj).decode("ascii")}
+    raise UnsupportedValue(type(obj).__name__)
+
+
+def _tag_tuples(obj):
+    if isinstance(obj, tuple):
+        return {"__tuple__": [_tag_tuples(v) for v in obj]}
+    if isinstance(obj, list):
+        return [_tag_tuples(v) for v in obj]
+    if isinstance(obj, dict):
+        return {k: _tag_tuples(v) for k, v in obj.items()}
+    return obj
+
+
+def _json_hook(obj):
+    if "__ts__" in obj:
+        return datetime.fromisoformat(obj["__ts__"])
+    if "__tuple__" in obj:
+        return tuple(obj["__tuple__"])
+    if "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+
+def encode(value) -> bytes:
+    """Sérialise `value` : b"A" + Arrow IPC, b"B" + octets, b"J" + JSON."""
+    pd = sys.modules.get("pandas")     # pas d'import : sans pandas chargé, pas de DataFrame
+    if pd is not None and isinstance(value, pd.DataFrame):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise UnsupportedValue("pyarrow non installé : DataFrame non partagé") from None
+        table = pa.Table.from_pandas(value)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return b"A" + sink.getvalue()
+    if isinstance(value, (bytes, bytearray)):
+        return b"B" + bytes(value)
+    return b"J" + json.dumps(_tag_tuples(value), default=_json_default).encode("utf-8")
+
+
+def decode(payload: bytes):
+    tag, body = payload[:1], payload[1:]
+    if tag == b"A":
+        import pyarrow as pa
+        return pa.ipc.open_stream(body).read_all().to_pandas()
+    if tag == b"B":
+        return body
+    if tag == b"J":
+        return json.loads(body, object_hook=_json_hook)
+    raise ValueError(f"charge utile inconnue : {tag!r}")
+
+
+# -------------------------------------------------------------------
+# Backends
+# -------------------------------------------------------------------
+
+class CacheBackend:
+    """Stockage partagé : (espace, clé) → (charge utile, expiration epoch, validateurs)."""
+
+    def get(self, ns, key):
+        """(payload, expires, validators) ou None."""
+        raise NotImplementedError
+
+    def set(self, ns, key, payload, expires, validators):
+        raise NotImplementedError
+
+    def renew(self, ns, key, expires):
+        """Reconduit une entrée revalidée (304)."""
+        raise NotImplementedError
+
+    def expire(self, ns, key=None):
+        """Périme `key` (ou tout l'espace) sans supprimer la valeur."""
+        raise NotImplementedError
+
+    def delete(self, ns, key=None):
+        raise NotImplementedError
+
+
+class SQLiteBackend(CacheBackend):
+    """Fichier SQLite en mode WAL : lectures concurrentes, une écriture à la fois."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " ns TEXT NOT NULL, key TEXT NOT NULL, expires REAL NOT NULL,"
+                " etag TEXT, last_modified TEXT, payload BLOB NOT NULL,"
+                " PRIMARY KEY (ns, key))"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, ns, key):
+        row = self._conn().execute(
+            "SELECT payload, expires, etag, last_modified FROM entries WHERE ns = ? AND key = ?",
+            (ns, key),
+        ).fetchone()
+        if row is None:
+            return None
+        payload, expires, etag, last_modified = row
+        return payload, expires, {"etag": etag, "last_modified": last_modified}
+
+    def set(self, ns, key, payload, expires, validators):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (ns, key, expires, etag, last_modified, payload)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (ns, key, expires, validators.get("etag"), validators.get("last_modified"), payload),
+        )
+        if random.random() < 0.01:   # purge occasionnelle des entrées expirées depuis longtemps
+            conn.execute("DELETE FROM entries WHERE expires < ?", (time.time() - STALE_GRACE_S,))
+
+    def renew(self, ns, key, expires):
+        self._conn().execute("UPDATE entries SET expires = ? WHERE ns = ? AND key = ?", (expires, ns, key))
+
+    def expire(self, ns, key=None):
+        if key is None:
+            self._conn().execute("UPDATE entries SET expires = 0 WHERE ns = ?", (ns,))
+        else:
+            self._conn().execute("UPDATE entries SET expires = 0 WHERE ns = ? AND key = ?", (ns, key))
+
+    def delete(self, ns, key=None):
+        if key is None:
+            self._conn().execute("DELETE FROM entries WHERE ns = ?", (ns,))
+        else:
+            self._conn().execute("DELETE FROM entries WHERE ns = ? AND key = ?", (ns, key))
+
+
+def from_env():
+    """Backend décrit par AURORA_CACHE_BACKEND, ou None (cache local uniquement)."""
+    spec = os.environ.get("AURORA_CACHE_BACKEND", "").strip()
+    if not spec or spec == "memory":
+        return None
+    if spec.startswith("sqlite:///"):
+        # sqlite:///relatif/cache.db ou sqlite:////chemin/absolu/cache.db
+        return SQLiteBackend(spec[len("sqlite:///"):])
+    logger.warning("AURORA_CACHE_BACKEND inconnu (%s) : cache local uniquement", spec)
+    return None
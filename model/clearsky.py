@@ -0,0 +1,134 @@
+# model/clearsky.py
+"""
+Recherche du ciel dégagé le plus proche (« où est-ce dégagé à moins de 100 km ce soir ? »).
+
+Les points candidats sont les cellules d'un quadrillage fixe, commun à toutes
+les sessions (pas de `step_km` en latitude, pas équivalent en longitude pour
+chaque rangée) : deux utilisateurs voisins tombent sur les mêmes cellules, dont
+la nébulosité horaire est en cache (functions.get_cloud_cover, une entrée par
+cellule pour toutes les heures). Les cellules manquantes sont récupérées en une
+ou quelques requêtes Open-Meteo, puis chaque cellule × heure est notée d'un
+coup (model.scoring).
+"""
+
+import numpy as np
+
+from model import climatology, scoring
+from model.compare import hour_axis
+from model.functions import get_cloud_cover, get_kp_forecast
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG = np.pi * EARTH_RADIUS_KM / 180
+RADIUS_KM = 100
+STEP_KM = 20             # ~80 cellules pour 100 km : une seule requête météo
+WINDOW_H = 3
+
+_DIRECTIONS = ("N", "NE", "E", "SE", "S", "SO", "O", "NO")
+
+
+# -------------------------------------------------------------------
+# Géométrie
+# -------------------------------------------------------------------
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique (haversine), tableaux diffusables."""
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dp, dl = p2 - p1, np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def bearing(lat1, lon1, lat2, lon2):
+    """Cap initial (°, 0 = nord) de chaque point 2 vu depuis le point 1."""
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dl = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    y = np.sin(dl) * np.cos(p2)
+    x = np.cos(p1) * np.sin(p2) - np.sin(p1) * np.cos(p2) * np.cos(dl)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+
+def direction(deg):
+    """Cap en points cardinaux : 45 → « NE »."""
+    return _DIRECTIONS[int((deg + 22.5) // 45) % 8]
+
+
+def grid_cells(lat, lon, radius_km=RADIUS_KM, step_km=STEP_KM):
+    """
+    Centres des cellules du quadrillage fixe situées à moins de `radius_km`
+    de (lat, lon) : (lats, lons, distances km), du plus proche au plus loin.
+    """
+    dlat = step_km / KM_PER_DEG
+    span = int(np.ceil(radius_km / step_km))
+    row0 = int(round(lat / dlat))
+    lats, lons = [], []
+    for k in range(row0 - span, row0 + span + 1):
+        row_lat = k * dlat
+        if abs(row_lat) > 89:
+            continue
+        dlon = dlat / max(np.cos(np.radians(row_lat)), 1e-3)
+        col0 = int(round(lon / dlon))
+        cols = np.arange(col0 - span - 1, col0 + span + 2)     # pas de `step_km` sur chaque rangée
+        row_lon = (cols * dlon + 180) % 360 - 180
+        lats.append(np.full(len(cols), row_lat))
+        lons.append(row_lon)
+    lats, lons = np.concatenate(lats), np.concatenate(lons)
+    dist = distance_km(lat, lon, lats, lons)
+    keep = np.flatnonzero(dist <= radius_km)
+    keep = keep[np.argsort(dist[keep], kind="stable")]
+    return lats[keep].round(4), lons[keep].round(4), dist[keep]
+
+
+# -------------------------------------------------------------------
+# Recherche
+# -------------------------------------------------------------------
+
+def nearest_clear_sky(lat, lon, radius_km=RADIUS_KM, hours=24, weights=(0.5, 0.35, 0.15),
+                      kp_now=None, step_km=STEP_KM, limit=10, now=None):
+    """
+    Meilleures cellules autour de (lat, lon) pour les `hours` prochaines heures.
+
+    Chaque cellule est jugée sur sa meilleure fenêtre de WINDOW_H heures. Le
+    classement va du meilleur score au moins bon, et à score égal (arrondi au
+    centième) du plus proche au plus loin ; une cellule n'est retenue que si
+    ni le point de départ ni aucune cellule plus proche n'a un score au moins
+    aussi bon (liste vide : rien de mieux à portée). Renvoie un dict :
+    "here" (le point de départ, même format que les lignes), "spots" (au plus
+    `limit` lignes {lat, lon, distance_km, direction, start, end, score,
+    cloud, dark_h}), et "lat", "lon", "score" pour toutes les cellules.
+    """
+    cell_lat, cell_lon, dist = grid_cells(lat, lon, radius_km, step_km)
+    lats = np.concatenate([[lat], cell_lat])
+    lons = np.concatenate([[lon], cell_lon])
+    dist = np.concatenate([[0.0], dist])
+    times = hour_axis(hours, now)
+
+    cloud = scoring.align_series(get_cloud_cover(list(zip(lats, lons)), forecast_days=hours // 24 + 1), times)
+    cloud = climatology.fill_missing(cloud, lats, lons, times)
+    try:
+        forecast = get_kp_forecast()
+    except Exception:
+        forecast = []
+    kp = scoring.hourly_kp(forecast, times, fallback=kp_now)
+
+    grid = scoring.score_grid(lats, lons, times, cloud, kp, weights)
+    start, best = scoring.best_windows(grid["score"], WINDOW_H)
+    heading = bearing(lat, lon, lats, lons)
+
+    def row(i):
+        window = slice(start[i], start[i] + WINDOW_H)
+        nuages = cloud[i, window]
+        return {
+            "lat": float(lats[i]), "lon": float(lons[i]),
+            "distance_km": float(dist[i]), "direction": direction(heading[i]) if i else "",
+            "start": times[window][0], "end": times[window][-1] + np.timedelta64(1, "h"),
+            "score": float(best[i]),
+            "cloud": None if np.isnan(nuages).all() else float(np.nanmean(nuages)),
+            "dark_h": int(grid["dark"][i, window].sum()),
+        }
+
+    # cellules triées par distance : on garde celles qui battent le départ et toutes les plus proches
+    rounded = best.round(2)
+    frontier = np.flatnonzero(rounded[1:] > np.maximum.accumulate(rounded)[:-1])
+    keep = sorted(frontier + 1, key=lambda i: (-round(float(best[i]), 2), dist[i]))[:limit]
+    return {"here": row(0), "spots": [row(i) for i in keep],
+            "lat": cell_lat, "lon": cell_lon, "score": best[1:]}
@@ -0,0 +1,378 @@
+# model/climatology.py
+"""
+Climatologie mensuelle de la nébulosité, par cellule de GRID_DEG degrés.
+
+Pour chaque cellule et chaque mois, deux octets : la nébulosité moyenne (%)
+et la probabilité (%) qu'une journée soit dégagée (nébulosité moyenne du jour
+sous CLEAR_PCT). La table couvre le globe (tableau (lat, lon, mois)) ; une
+localisation se lit en O(1) par simple indexation, sans appel réseau. Elle
+sert :
+
+  - de valeur a priori quand la prévision météo manque (score, comparaison,
+    worker d'alertes sans clé OpenWeatherMap) ;
+  - au « meilleur mois pour venir » (ciel dégagé × nuits noires).
+
+La table (data/cloud_climatology.npz) est un artefact livré avec
+l'application : construite hors ligne depuis l'archive historique Open-Meteo
+(ERA5, moyennes journalières) pour les bandes de latitude aurorales, puis
+versionnée. L'application ne la construit jamais ; sans fichier, les usages
+ci-dessus sont désactivés.
+
+Coût : l'archive compte un appel par localisation et par tranche de
+DAYS_PER_CALL jours demandés (5 ans ≈ 131 appels par cellule). Les réglages
+par défaut (720 cellules de 5°, 2020–2024) font ~94 000 appels pondérés,
+soit une dizaine de jours du quota gratuit (FREE_QUOTA). La construction
+cadence ses requêtes sous les quotas par minute et par heure, s'arrête au
+budget du jour et enregistre chaque lot (fichier .partial.npz) : relancée
+(une fois par jour, par cron), elle reprend où elle s'était arrêtée.
+
+    python -m model.climatology                       # 2020–2024, |lat| 45–72°, 5°
+    python -m model.climatology --years 2022 2024 --bands 60 70
+    python -m model.climatology --unlimited           # clé commerciale / miroir sans quota
+"""
+
+import argparse
+import functools
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+TABLE_PATH = Path(os.environ.get("AURORA_CLIMATOLOGY", ROOT / "data" / "cloud_climatology.npz"))
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+GRID_DEG = 5.0
+CLEAR_PCT = 40           # journée « dégagée » : nébulosité moyenne sous 40 %
+MISSING = 255
+BANDS = (45.0, 72.0)     # |latitude| des cellules construites par défaut (zones aurorales)
+YEARS = (2020, 2024)
+BATCH = 50               # localisations par requête d'archive sans quota
+MAX_RETRIES = 5          # par lot : 429, erreurs 5xx et réseau
+RETRY_BASE_S = 15.0      # attente avant le 1er nouvel essai, doublée ensuite
+FORMAT_VERSION = 1
+
+# Quota de l'API gratuite, en appels pondérés : chaque localisation compte, et
+# chaque tranche de DAYS_PER_CALL jours de données au-delà de la première aussi
+FREE_QUOTA = {"minute": 600, "hour": 5000, "day": 10000}
+DAYS_PER_CALL = 14
+
+MONTHS = ("janv.", "févr.", "mars", "avr.", "mai", "juin",
+          "juil.", "août", "sept.", "oct.", "nov.", "déc.")
+
+
+# -------------------------------------------------------------------
+# Grille
+# -------------------------------------------------------------------
+
+def _shape(res):
+    return int(round(180 / res)), int(round(360 / res))
+
+
+def cell_index(lat, lon, res=GRID_DEG):
+    """(ligne, colonne) de la cellule contenant chaque point, tableaux diffusables."""
+    rows, cols = _shape(res)
+    i = np.clip(((np.asarray(lat, dtype=np.float64) + 90) // res).astype(np.int64), 0, rows - 1)
+    j = (((np.asarray(lon, dtype=np.float64) + 180) % 360) // res).astype(np.int64) % cols
+    return i, j
+
+
+def cell_centers(bands=BANDS, res=GRID_DEG):
+    """Centres (lat, lon) des cellules dont |latitude| est dans `bands`, deux hémisphères."""
+    rows, cols = _shape(res)
+    lat = -90 + res * (np.arange(rows) + 0.5)
+    lon = -180 + res * (np.arange(cols) + 0.5)
+    keep = (np.abs(lat) >= bands[0]) & (np.abs(lat) <= bands[1])
+    la, lo = np.meshgrid(lat[keep], lon, indexing="ij")
+    return la.ravel(), lo.ravel()
+
+
+# -------------------------------------------------------------------
+# Construction (archive Open-Meteo → .npz)
+# -------------------------------------------------------------------
+
+def monthly_stats(dates, cloud):
+    """
+    Moyenne mensuelle et probabilité de journée dégagée pour une série
+    journalière (`dates` datetime64[D], `cloud` en % avec NaN) :
+    deux tableaux (12,) uint8, MISSING pour un mois sans donnée.
+    """
+    month = (dates.astype("datetime64[M]").astype(np.int64) % 12)
+    ok = ~np.isnan(cloud)
+    count = np.bincount(month[ok], minlength=12)
+    total = np.bincount(month[ok], weights=cloud[ok], minlength=12)
+    clear = np.bincount(month[ok], weights=(cloud[ok] < CLEAR_PCT).astype(np.float64), minlength=12)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, np.round(total / count), MISSING)
+        p_clear = np.where(count > 0, np.round(100 * clear / count), MISSING)
+    return mean.astype(np.uint8), p_clear.astype(np.uint8)
+
+
+def call_weight(years):
+    """Appels pondérés d'une localisation sur `years` (bornes incluses)."""
+    days = (date(years[1], 12, 31) - date(years[0], 1, 1)).days + 1
+    return -(-days // DAYS_PER_CALL)
+
+
+def cost(bands=BANDS, years=YEARS, res=GRID_DEG, quota=FREE_QUOTA):
+    """
+    Coût d'une construction : {"cells", "calls" (appels pondérés), "batch"
+    (cellules par requête), "requests", "days" (jours de quota, None sans quota)}.
+    """
+    cells = len(cell_centers(bands, res)[0])
+    weight = call_weight(years)
+    batch = max(1, min(BATCH, quota["minute"] // weight)) if quota else BATCH
+    calls = cells * weight
+    return {"cells": cells, "calls": calls, "batch": batch, "requests": -(-cells // batch),
+            "days": -(-calls // quota["day"]) if quota else None}
+
+
+def _fetch_batch(lats, lons, years):
+    """Nébulosité moyenne journalière de l'archive pour un lot de cellules."""
+    from model import decode
+    from model.upstream import get
+
+    r = get("climatology", ARCHIVE_URL, params={
+        "latitude": ",".join(f"{v:.2f}" for v in lats),
+        "longitude": ",".join(f"{v:.2f}" for v in lons),
+        "start_date": f"{years[0]}-01-01", "end_date": f"{years[1]}-12-31",
+        "daily": "cloud_cover_mean", "timezone": "GMT",
+    }, timeout=120)
+    r.raise_for_status()
+    data = decode.loads(r.content)
+    if isinstance(data, dict):
+        data = [data]
+    if len(data) != len(lats):
+        raise ValueError(f"archive Open-Meteo : {len(data)} séries pour {len(lats)} cellules")
+    for d in data:
+        yield (np.array(d["daily"]["time"], dtype="datetime64[D]"),
+               np.array([np.nan if v is None else v for v in d["daily"]["cloud_cover_mean"]], dtype=np.float64))
+
+
+def _retryable(error):
+    """Erreur passagère : quota (429), erreur serveur ou réseau."""
+    import requests
+
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def _fetch_with_retry(lats, lons, years, log, sleep=time.sleep):
+    """Un lot, avec nouveaux essais espacés (Retry-After respecté s'il est plus long)."""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return list(_fetch_batch(lats, lons, years))
+        except Exception as e:
+            if attempt == MAX_RETRIES or not _retryable(e):
+                raise
+            wait = RETRY_BASE_S * 2 ** attempt
+            retry_after = e.response.headers.get("Retry-After", "") if getattr(e, "response", None) is not None else ""
+            if retry_after.isdigit():
+                wait = max(wait, int(retry_after))
+            log(f"  lot en échec ({e}), nouvel essai dans {wait:.0f} s")
+            sleep(wait)
+
+
+def _save(path, **arrays):
+    """Écriture atomique d'un .npz (fichier temporaire puis os.replace)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".npz")
+    with os.fdopen(fd, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def partial_path(path=None):
+    """Fichier de reprise d'une construction en cours."""
+    path = Path(path or TABLE_PATH)
+    return path.with_name(f"{path.stem}.partial.npz")
+
+
+def build(bands=BANDS, years=YEARS, res=GRID_DEG, path=None, quota=FREE_QUOTA, log=print, sleep=time.sleep):
+    """
+    Construit la table, lot par lot de cellules (cost()["batch"] par requête),
+    chaque lot réessayé jusqu'à MAX_RETRIES fois et enregistré dans
+    partial_path(path). Avec `quota`, les requêtes sont espacées pour rester
+    sous le quota horaire et la construction s'arrête avant de dépasser le
+    quota du jour. Relancée avec les mêmes paramètres, elle reprend au premier
+    lot manquant. Renvoie le chemin de la table, ou None si elle n'est pas
+    terminée (budget du jour atteint).
+    """
+    path = Path(path or TABLE_PATH)
+    partial = partial_path(path)
+    rows, cols = _shape(res)
+    lats, lons = cell_centers(bands, res)
+    ii, jj = cell_index(lats, lons, res)
+    params = np.array([res, *bands, *years], dtype=np.float64)
+    weight, batch_size = call_weight(years), cost(bands, years, res, quota)["batch"]
+
+    mean = np.full((rows, cols, 12), MISSING, dtype=np.uint8)
+    p_clear = np.full((rows, cols, 12), MISSING, dtype=np.uint8)
+    done = np.zeros(len(lats), dtype=bool)
+    if partial.exists():
+        with np.load(partial) as data:
+            if np.array_equal(data["params"], params):
+                mean, p_clear, done = data["mean"], data["p_clear"], data["done"]
+                log(f"  reprise : {int(done.sum())}/{len(lats)} cellules déjà construites")
+
+    spent, last = 0, None
+    for start in range(0, len(lats), batch_size):
+        chunk = slice(start, start + batch_size)
+        if done[chunk].all():
+            continue
+        calls = len(lats[chunk]) * weight
+        if quota:
+            if spent + calls > quota["day"]:
+                log(f"  budget du jour atteint ({spent} appels pondérés) : relancer demain pour reprendre")
+                return None
+            if last is not None:
+                sleep(max(0.0, last + 3600 * calls / quota["hour"] - time.monotonic()))
+        last = time.monotonic()
+        batch = _fetch_with_retry(lats[chunk], lons[chunk], years, log, sleep)
+        spent += calls
+        for i, j, (dates, cloud) in zip(ii[chunk], jj[chunk], batch):
+            mean[i, j], p_clear[i, j] = monthly_stats(dates, cloud)
+        done[chunk] = True
+        _save(partial, params=params, mean=mean, p_clear=p_clear, done=done)
+        log(f"  {int(done.sum())}/{len(lats)} cellules ({spent} appels pondérés)")
+
+    _save(path, version=FORMAT_VERSION, res=res, mean=mean, p_clear=p_clear,
+          years=np.array(years), clear_pct=CLEAR_PCT, built_at=time.time())
+    partial.unlink(missing_ok=True)
+    return path
+
+
+# -------------------------------------------------------------------
+# Lecture
+# -------------------------------------------------------------------
+
+class Climatology:
+    """Table chargée en mémoire : `mean`, `p_clear` (lignes de latitude, colonnes de longitude, mois)."""
+
+    def __init__(self, data):
+        self.res = float(data["res"])
+        self.mean = data["mean"]
+        self.p_clear = data["p_clear"]
+        self.years = tuple(int(y) for y in data["years"])
+
+    def monthly(self, lat, lon):
+        """
+        Les 12 mois d'une ou plusieurs localisations : (nébulosité moyenne %,
+        probabilité de journée dégagée %), tableaux (..., 12) float32, NaN hors
+        des cellules construites.
+        """
+        i, j = cell_index(lat, lon, self.res)
+        mean, clear = self.mean[i, j].astype(np.float32), self.p_clear[i, j].astype(np.float32)
+        mean[mean == MISSING] = np.nan
+        clear[clear == MISSING] = np.nan
+        return mean, clear
+
+    def cloud(self, lat, lon, month):
+        """Nébulosité moyenne (%) du mois `month` (1–12) ; tableaux diffusables, NaN sans donnée."""
+        i, j = cell_index(lat, lon, self.res)
+        value = self.mean[i, j, np.asarray(month) - 1].astype(np.float32)
+        return np.where(value == MISSING, np.nan, value)
+
+
+@functools.cache
+def _load(path, mtime):
+    with np.load(path) as data:
+        if int(data["version"]) != FORMAT_VERSION:
+            raise ValueError(f"climatologie au format {int(data['version'])}, attendu {FORMAT_VERSION}")
+        return Climatology(data)
+
+
+def load(path=None):
+    """Table de `path` (TABLE_PATH par défaut), relue si le fichier a changé ; None si absente."""
+    path = Path(path or TABLE_PATH)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _load(str(path), mtime)
+
+
+def cloud_prior(lat, lon, month):
+    """Nébulosité climatologique (%) d'une localisation pour un mois, ou None (pas de table, pas de cellule)."""
+    table = load()
+    if table is None:
+        return None
+    value = float(table.cloud(lat, lon, month))
+    return None if np.isnan(value) else value
+
+
+def fill_missing(cloud, lat, lon, times):
+    """
+    Remplace les NaN d'un tableau de nébulosité (localisations, heures) par la
+    climatologie du mois de chaque heure (`times` datetime64) ; inchangé sans table.
+    """
+    table = load()
+    missing = np.isnan(cloud)
+    if table is None or not missing.any():
+        return cloud
+    month = (np.asarray(times, dtype="datetime64[M]").astype(np.int64) % 12) + 1
+    prior = table.cloud(np.asarray(lat)[:, None], np.asarray(lon)[:, None], month[None, :])
+    return np.where(missing, prior, cloud)
+
+
+def dark_hours(lat, lon, year=2025):
+    """
+    Heures de nuit noire (soleil sous scoring.DARK_SUN_ELEVATION) le 15 de
+    chaque mois : tableau (localisations, 12).
+    """
+    from model import scoring
+
+    days = np.array([f"{year}-{m:02d}-15" for m in range(1, 13)], dtype="datetime64[h]")
+    times = (days[:, None] + np.arange(24).astype("timedelta64[h]")[None, :]).ravel()
+    dark = scoring.darkness(scoring.solar_elevation(np.atleast_1d(lat), np.atleast_1d(lon), times))
+    return dark.reshape(-1, 12, 24).sum(axis=2)
+
+
+def best_months(lat, lon, table=None):
+    """
+    Indice de visite par mois (localisations, 12) : probabilité de journée
+    dégagée × part de la nuit noire (heures noires / 12, plafonnée à 1). NaN
+    sans climatologie pour la cellule.
+    """
+    table = table or load()
+    lat, lon = np.atleast_1d(lat), np.atleast_1d(lon)
+    if table is None:
+        return np.full((len(lat), 12), np.nan, dtype=np.float32)
+    _, clear = table.monthly(lat, lon)
+    return (clear / 100 * np.minimum(dark_hours(lat, lon) / 12, 1)).astype(np.float32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construit la climatologie de nébulosité (archive Open-Meteo).")
+    parser.add_argument("--years", nargs=2, type=int, default=YEARS, metavar=("DÉBUT", "FIN"))
+    parser.add_argument("--bands", nargs=2, type=float, default=BANDS, metavar=("MIN", "MAX"),
+                        help="|latitude| des cellules construites")
+    parser.add_argument("--res", type=float, default=GRID_DEG, help="taille des cellules (°)")
+    parser.add_argument("--path", type=Path, default=TABLE_PATH)
+    parser.add_argument("--budget", type=int, default=FREE_QUOTA["day"],
+                        help="appels pondérés au plus par exécution (quota du jour)")
+    parser.add_argument("--unlimited", action="store_true",
+                        help="sans quota : clé commerciale ou miroir de l'archive")
+    args = parser.parse_args()
+
+    quota = None if args.unlimited else {**FREE_QUOTA, "day": args.budget}
+    c = cost(args.bands, args.years, args.res, quota)
+    print(f"{c['cells']} cellules de {args.res}°, {args.years[0]}–{args.years[1]} : "
+          f"{c['calls']} appels pondérés, {c['requests']} requêtes de {c['batch']} cellules"
+          + (f", ~{c['days']} jour(s) de quota (reprise à chaque exécution)" if quota else ""))
+    started = time.perf_counter()
+    try:
+        built = build(args.bands, args.years, args.res, args.path, quota)
+    except Exception as e:
+        print(f"climatologie non construite (reprise à la prochaine exécution) : {e}", file=sys.stderr)
+        sys.exit(1)
+    if built is None:
+        print(f"climatologie incomplète : {partial_path(args.path)}", file=sys.stderr)
+        sys.exit(3)
+    print(f"{built}  {built.stat().st_size / 1024:.0f} Kio  ({time.perf_counter() - started:.0f} s)")
@@ -0,0 +1,86 @@
+# model/compare.py
+"""
+Comparaison de localisations candidates (onglet « Comparer »).
+
+Toutes les localisations sont traitées ensemble : une seule requête
+Open-Meteo pour leur couverture nuageuse (functions.get_cloud_cover, mise en
+cache par localisation), la prévision Kp NOAA commune, puis le score de
+chaque localisation × heure en un calcul vectorisé (model.scoring).
+Le temps de réponse est celui d'une seule récupération météo.
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+from model import climatology, geomag, scoring
+from model.functions import get_cloud_cover, get_kp_forecast
+
+# Localisations rapides de la barre latérale, avec leurs coordonnées : la
+# comparaison n'a pas besoin de les géocoder
+QUICK_LOCATIONS = {
+    "Abisko, Suède": (68.35, 18.83),
+    "Kiruna, Suède": (67.86, 20.23),
+    "Stockholm, Suède": (59.33, 18.07),
+    "Tromsø, Norvège": (69.65, 18.96),
+    "Rotsund, Norvège": (69.79, 20.65),
+    "Kilpisjärvi, Finlande": (69.05, 20.79),
+    "Rovaniemi, Finlande": (66.50, 25.73),
+    "Banff, Canada": (51.18, -115.57),
+    "Fairbanks, États-Unis": (64.84, -147.72),
+}
+
+HORIZONS_H = (24, 48, 72)
+WINDOW_H = 3     # durée de la fenêtre d'observation classée
+
+
+def hour_axis(hours, now=None):
+    """`hours` heures UTC à partir de l'heure entamée (datetime64[h])."""
+    now = now or datetime.now(timezone.utc)
+    start = np.datetime64(now.replace(tzinfo=None, minute=0, second=0, microsecond=0), "h")
+    return start + np.arange(hours).astype("timedelta64[h]")
+
+
+def compare_locations(locations, hours=72, weights=(0.5, 0.35, 0.15), kp_now=None, now=None):
+    """
+    Score heure par heure d'une liste de localisations [(nom, lat, lon)].
+
+    Renvoie un dict de tableaux alignés : "names" (L,), "times" (H,) UTC,
+    "cloud" (L, H), "kp" (H,), "dark", "score" (L, H), "mlat", "min_kp" (L,),
+    et "ranking" : une ligne par localisation (meilleure fenêtre de WINDOW_H
+    heures), de la meilleure à la moins bonne.
+    """
+    names = [name for name, _, _ in locations]
+    lat = np.array([la for _, la, _ in locations], dtype=np.float64)
+    lon = np.array([lo for _, _, lo in locations], dtype=np.float64)
+    times = hour_axis(hours, now)
+
+    # Une requête pour toutes les localisations (jours entamés compris)
+    cloud = scoring.align_series(get_cloud_cover(list(zip(lat, lon)), forecast_days=hours // 24 + 1), times)
+    cloud = climatology.fill_missing(cloud, lat, lon, times)     # heures sans prévision
+    try:
+        forecast = get_kp_forecast()
+    except Exception:
+        forecast = []          # prévision indisponible : Kp actuel sur tout l'horizon
+    kp = scoring.hourly_kp(forecast, times, fallback=kp_now)
+
+    grid = scoring.score_grid(lat, lon, times, cloud, kp, weights)
+    start, best = scoring.best_windows(grid["score"], WINDOW_H)
+    min_kp = geomag.min_kp(grid["mlat"])
+
+    ranking = []
+    for i in np.argsort(-best, kind="stable"):
+        window = slice(start[i], start[i] + WINDOW_H)
+        ranking.append({
+            "name": names[i],
+            "start": times[window][0],
+            "end": times[window][-1] + np.timedelta64(1, "h"),
+            "score": float(best[i]),
+            "cloud": float(np.nanmean(cloud[i, window])) if not np.isnan(cloud[i, window]).all() else None,
+            "kp": float(np.nanmax(kp[window])) if not np.isnan(kp[window]).all() else None,
+            "dark_h": int(grid["dark"][i, window].sum()),
+            "min_kp": int(min_kp[i]),
+            "mlat": float(grid["mlat"][i]),
+        })
+    return {"names": names, "times": times, "cloud": cloud, "kp": kp, "dark": grid["dark"],
+            "score": grid["score"], "mlat": grid["mlat"], "min_kp": min_kp, "ranking": ranking}
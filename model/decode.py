@@ -0,0 +1,31 @@
+# model/decode.py
+"""
+Décodage des gros produits JSON (NOAA SWPC, Open-Meteo) en colonnes typées.
+
+`loads` utilise orjson s'il est installé (optionnel, ~2× plus rapide que la
+bibliothèque standard), sinon `json`. Les colonnes sont extraites une fois
+du JSON décodé puis converties en tableaux numpy (float32, datetime64) par
+model.frames : ni DataFrame intermédiaire ligne à ligne, ni passage par
+pd.to_datetime / pd.to_numeric sur des objets Python.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:       # dépendance optionnelle
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(content):
+    """Décode une réponse JSON (octets ou texte)."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def columns(rows, fields):
+    """Liste d'objets JSON → {champ: liste de valeurs} (None si le champ manque)."""
+    return {field: [row.get(field) for row in rows] for field in fields}
@@ -0,0 +1,196 @@
+# model/figures.py
+"""
+Figures Plotly des pages d'une localisation (vue d'ensemble, prévisions météo).
+
+Construites ici plutôt que dans l'application pour être partagées avec le
+précalcul des localisations rapides (model.snapshot), qui les assemble hors
+requête. Une figure renvoyée peut être partagée entre sessions : elle n'est
+plus modifiée après sa construction.
+"""
+
+import plotly.graph_objects as go
+
+from model.functions import score_label
+
+# Variables de l'explorateur météo (libellé → colonne de get_weather) et unités de survol
+VARIABLES_METEO = {
+    "Nuages totaux (%)": "cloud_total",
+    "Nuages bas (%)": "cloud_low",
+    "Nuages moyens (%)": "cloud_mid",
+    "Nuages hauts (%)": "cloud_high",
+    "Température (°C)": "temp_c",
+    "Point de rosée (°C)": "dewpoint_c",
+    "Humidité relative (%)": "rh_pct",
+    "Visibilité (km)": "visibility_km",
+    "Vent (m/s)": "wind_ms",
+    "Rafales (m/s)": "gust_ms",
+    "Précipitations (mm)": "precip_mm",
+    "Probabilité précip. (%)": "precip_prob",
+}
+UNITES_METEO = {
+    "Nuages totaux (%)": "%",
+    "Nuages bas (%)": "%",
+    "Nuages moyens (%)": "%",
+    "Nuages hauts (%)": "%",
+    "Température (°C)": "°C",
+    "Point de rosée (°C)": "°C",
+    "Humidité relative (%)": "%",
+    "Visibilité (km)": " km",
+    "Vent (m/s)": " m/s",
+    "Rafales (m/s)": " m/s",
+    "Précipitations (mm)": " mm",
+    "Probabilité précip. (%)": "%"
+}
+VARIABLES_DEFAUT = ["Nuages totaux (%)", "Probabilité précip. (%)", "Visibilité (km)"]
+SEUILS_DEFAUT = (40, 20)     # nuages max (%), probabilité de précipitations max (%)
+
+
+def figure_colonnes(df, colonnes, titre, y_titre, noms=None, unite="", barres=False, empiler=False,
+                    x="time", x_titre="Temps"):
+    """
+    Figure Plotly d'une ou plusieurs colonnes de `df` en fonction de la colonne `x`.
+
+    Chaque trace lit directement la colonne (aucune copie ni `melt` du
+    DataFrame partagé) ; `noms` traduit les colonnes pour la légende.
+    """
+    noms = noms or {}
+    fig = go.Figure()
+    for col in colonnes:
+        nom = noms.get(col, col)
+        trace = go.Bar if barres else go.Scatter
+        options = {} if barres else {"mode": "lines", "stackgroup": "pile" if empiler else None}
+        fig.add_trace(trace(
+            x=df[x], y=df[col], name=nom, **options,
+            hovertemplate=f"%{{x|%Y-%m-%d %H:%M}}<br>{nom}: %{{y:.4~g}}{unite}<extra></extra>",
+        ))
+    fig.update_layout(
+        title=titre, xaxis_title=x_titre, yaxis_title=y_titre,
+        showlegend=len(colonnes) > 1, legend_title_text="",
+    )
+    return fig
+
+
+# -------------------------------------------------------------------
+# Vue d'ensemble
+# -------------------------------------------------------------------
+
+def figures_jauges(kp, cloud, score, direct=False):
+    """
+    Les trois jauges de la vue d'ensemble : Kp, ciel dégagé, score. `direct` :
+    `kp` est l'estimation à la minute (flux en direct) et non le Kp planétaire.
+    """
+    # --- Jauge Indice Kp ---
+    fig_kp = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=kp if kp is not None else 0,
+        number={'valueformat': '.1f'},
+        title={'text': "Kp estimé (direct)" if direct else "Indice Kp"},
+        gauge={
+            "axis": {"range": [0, 9]},
+            "bar": {"thickness": 0.30, "color": "white"},
+            "steps": [
+                {"range": [0, 3], "color": "#c0392b"},
+                {"range": [3, 6], "color": "#e3b505"},
+                {"range": [6, 9], "color": "#2e8540"},
+            ],
+        }
+    ))
+    fig_kp.update_layout(height=250, margin=dict(l=25,r=25,t=30,b=10))
+
+    # --- Jauge Ciel dégagé ---
+    fig_cloud = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=100 - (cloud if cloud is not None else 100),
+        number={'suffix': "%"},
+        title={'text': "Ciel dégagé %"},
+        gauge={
+            "axis": {"range": [0, 100]},
+            "bar": {"thickness": 0.30, "color": "white"},
+            "steps": [
+                {"range": [0, 30], "color": "#c0392b"},
+                {"range": [30, 70], "color": "#e3b505"},
+                {"range": [70, 100], "color": "#2e8540"},
+            ]
+        }
+    ))
+    fig_cloud.update_layout(height=250, margin=dict(l=25,r=25,t=30,b=10))
+
+    # --- Jauge Score de probabilité ---
+    fig_score = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=score,
+        number={'valueformat': '.2f'},
+        title={'text': f"Score de Probabilité {score_label(score)}"},
+        gauge={
+            "axis": {"range": [0, 1]},
+            "bar": {"thickness": 0.30, "color": "white"},
+            "steps": [
+                {"range": [0, 0.4], "color": "#c0392b"},
+                {"range": [0.4, 0.7], "color": "#e3b505"},
+                {"range": [0.7, 1.0], "color": "#2e8540"},
+            ]
+        }
+    ))
+    fig_score.update_layout(height=250, margin=dict(l=25,r=25,t=30,b=10))
+    return fig_kp, fig_cloud, fig_score
+
+
+# -------------------------------------------------------------------
+# Prévisions météo
+# -------------------------------------------------------------------
+
+def fenetres_observation(wx, nuages_max=SEUILS_DEFAUT[0], precip_max=SEUILS_DEFAUT[1]):
+    """Masque des heures d'observation favorables (nuages et probabilité de précipitations sous les seuils)."""
+    return (wx["cloud_total"] <= nuages_max) & (wx["precip_prob"] <= precip_max)
+
+
+def explorateur_meteo(wx, colonnes, ok):
+    """
+    Explorateur météo interactif : une courbe par colonne de `colonnes`,
+    curseur de plage, et étoiles sur les heures favorables (masque `ok`).
+    """
+    noms = {v: k for k, v in VARIABLES_METEO.items()}
+    fig = figure_colonnes(wx, colonnes, None, "", noms=noms)
+
+    fig.update_layout(
+        title=dict(
+            text="Explorateur Météo Interactif (48h)",
+            x=0.0, xanchor="left",
+            y=0.99, yanchor="top",
+            font=dict(size=20)
+        ),
+        hovermode="x unified",
+        margin=dict(l=1, r=1, t=140, b=1),
+        legend=dict(orientation="h", y=1.1, yanchor="bottom", x=0, xanchor="left")
+    )
+
+    fig.update_xaxes(
+        rangeslider=dict(visible=True),
+        rangeselector=dict(
+            x=0, xanchor="left",
+            y=1.50, yanchor="top",
+            buttons=[
+                dict(count=6,  label="6h",  step="hour", stepmode="backward"),
+                dict(count=12, label="12h", step="hour", stepmode="backward"),
+                dict(count=24, label="24h", step="hour", stepmode="backward"),
+                dict(step="all", label="Tout")
+            ]
+        ),
+        title_standoff=12
+    )
+
+    # ---- Texte de survol personnalisé avec unités
+    for tr in fig.data:
+        label = tr.name
+        unit = UNITES_METEO.get(label, "")
+        tr.update(hovertemplate=f"%{{x|%Y-%m-%d %H:%M}}<br>{label}: %{{y:.4~g}}{unit}<extra></extra>")
+
+    # ---- Fenêtres suggérées : marqueurs sur la première variable
+    if ok.any():
+        fig.add_scatter(
+            x=wx.loc[ok, "time"], y=wx.loc[ok, colonnes[0]],
+            mode="markers", name="Suggéré",
+            marker=dict(size=9, symbol="star", color="gold"),
+            hovertemplate="%{x|%Y-%m-%d %H:%M}<br>Fenêtre suggérée<extra></extra>"
+        )
+    return fig
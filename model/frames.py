@@ -0,0 +1,83 @@
+# model/frames.py
+"""
+Construction des DataFrames typés à partir des réponses JSON décodées.
+
+Séparé de model.functions pour que numpy et pandas ne soient importés que
+par les chemins qui construisent des séries (graphiques, prévisions) : un
+worker d'alertes qui ne lit que le Kp courant démarre sans eux.
+"""
+
+import numpy as np
+import pandas as pd
+
+from model import decode
+
+
+def floats(values, scale=None):
+    """
+    Liste JSON (None autorisé) → tableau float32, NaN pour les valeurs manquantes.
+
+    Conversion directe par numpy ; si un élément n'est pas numérique (« »,
+    « null », « - »…), repli élément par élément via pd.to_numeric : ces
+    éléments deviennent NaN au lieu de faire échouer toute la série.
+
+    Usage:
+        >>> floats([1, None, "2.5", "", "null", "-", "x"]).tolist()
+        [1.0, nan, 2.5, nan, nan, nan, nan]
+    """
+    try:
+        arr = np.array(values, dtype=np.float32)
+    except (TypeError, ValueError):
+        arr = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(np.float32)
+    if scale is not None:
+        arr *= np.float32(scale)
+    return arr
+
+
+def times(values, unit="s"):
+    """Horodatages ISO 8601 sans fuseau (« 2025-01-01T12:00[:00] ») → datetime64 naïf."""
+    return np.array(values, dtype=f"datetime64[{unit}]")
+
+
+def kp_series_frame(rows, limit_minutes=240):
+    """Lignes décodées de planetary_k_index_1m → DataFrame typé (time_tag UTC, Kp float32)."""
+    cols = decode.columns(rows, ("time_tag", "kp_index", "estimated_kp"))
+    df = pd.DataFrame({
+        "time_tag": pd.DatetimeIndex(times(cols["time_tag"])).tz_localize("UTC"),
+        "kp_index": floats(cols["kp_index"]),
+        "estimated_kp": floats(cols["estimated_kp"]),
+    })
+    cutoff = pd.Timestamp.now(tz="UTC") - pd.Timedelta(minutes=limit_minutes)
+    keep = df["kp_index"].notna() & (df["time_tag"] >= cutoff)
+    return df[keep].sort_values("time_tag", ignore_index=True)
+
+
+def weather_frame(hr, tz):
+    """
+    Bloc `hourly` d'Open-Meteo → DataFrame typé.
+
+    `time` est conscient du fuseau `tz` (heures locales demandées à l'API),
+    les valeurs sont en float32 (précision largement suffisante pour des %,
+    °C, m/s, mm, km). L'heure répétée du passage à l'heure d'hiver est
+    ambiguë en heure locale : ses lignes sont écartées plutôt que datées au
+    hasard.
+    """
+    time = pd.DatetimeIndex(times(hr["time"], unit="m")).tz_localize(
+        tz, ambiguous="NaT", nonexistent="shift_forward"
+    )
+    df = pd.DataFrame({
+        "time": time,
+        "cloud_total": floats(hr["cloudcover"]),
+        "cloud_low": floats(hr["cloudcover_low"]),
+        "cloud_mid": floats(hr["cloudcover_mid"]),
+        "cloud_high": floats(hr["cloudcover_high"]),
+        "temp_c": floats(hr["temperature_2m"]),
+        "dewpoint_c": floats(hr["dewpoint_2m"]),
+        "rh_pct": floats(hr["relative_humidity_2m"]),
+        "visibility_km": floats(hr["visibility"], scale=1e-3),
+        "wind_ms": floats(hr["windspeed_10m"]),
+        "gust_ms": floats(hr["windgusts_10m"]),
+        "precip_mm": floats(hr["precipitation"]),
+        "precip_prob": floats(hr["precipitation_probability"]),
+    })
+    return df[df["time"].notna()].reset_index(drop=True) if time.hasnans else df
@@ -1,56 +1,78 @@
 # model/functions.py
 
+import functools
+import hashlib
+import zlib
+from datetime import datetime, timezone
+
 import requests
-import pandas as pd
-import datetime as dt
-import pytz
-import streamlit as st
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from model import cache, decode
+from model.upstream import get as _get
+
+# pandas/numpy are only needed to build series frames: model.frames is
+# imported by get_kp_series / get_weather, so Kp-now, darkness, geocoding
+# and OWM lookups (the alert worker path) start without them.
+
+
+def _coord(x):
+    """Cache-key coordinate: 3 decimals (~100 m), like the OWM request."""
+    return round(float(x), 3)
+
+
+def _secret(value):
+    """Cache-key stand-in for an API key: a short digest, never the key itself."""
+    return hashlib.sha256(value.encode()).hexdigest()[:12]
+
 # -------------------------------------------------------------------
 # NOAA SWPC — Kp index (current + recent series)
 # -------------------------------------------------------------------
 
+@cache.cached("kp_now", ttl=60, max_entries=1)  # cache 1 min
 def get_kp_now():
     """Fetch latest Kp index value and time."""
     url = "https://services.swpc.noaa.gov/products/noaa-planetary-k-index.json"
-    r = requests.get(url, timeout=15)
+    r = _get("kp_now", url)
     r.raise_for_status()
     data = r.json()
 
     # last row is most recent
     last = data[-1]
-    time_tag = pd.to_datetime(last[0])
+    time_tag = datetime.fromisoformat(last[0])
     kp_val = float(last[1]) if last[1] is not None else None
+    cache.publish("kp", (last[0], last[1]))
     return kp_val, time_tag
 
 
 
-@st.cache_data(ttl=300, show_spinner=False)  # cache 5 min
+@cache.cached("kp_series", ttl=300, max_entries=4, shared=True)  # cache 5 min
 def get_kp_series(limit_minutes=240):
     """Fetch recent Kp index (1-min values) and return last `limit_minutes` as UTC tz-aware."""
     url = "https://services.swpc.noaa.gov/json/planetary_k_index_1m.json"
-    r = requests.get(url, timeout=15)
-    r.raise_for_status()
-    data = r.json()
+    from model import frames
 
-    df = pd.DataFrame(data)
-    # Force UTC tz-aware timestamps
-    df["time_tag"] = pd.to_datetime(df["time_tag"], utc=True)
-    df["kp_index"] = pd.to_numeric(df["kp_index"], errors="coerce")
-    df = df.dropna(subset=["kp_index"]).sort_values("time_tag")
-
-    cutoff = pd.Timestamp.now(tz="UTC") - pd.Timedelta(minutes=limit_minutes)
-    df = df[df["time_tag"] >= cutoff]
+    r = _get("kp_series", url)
+    r.raise_for_status()
+    df = frames.kp_series_frame(decode.loads(r.content), limit_minutes)
+    cache.publish("kp_series", str(df["time_tag"].max()))
     return df
 
 # -------------------------------------------------------------------
 # Open-Meteo — Forecast Weather
 # -------------------------------------------------------------------
 
+@cache.cached("weather", ttl=1800, key=lambda lat, lon, tz: (_coord(lat), _coord(lon), tz),
+              max_entries=256, max_bytes=16 * 2**20, shared=True)  # cache 30 min
 def get_weather(lat, lon, tz):
-    """Fetch hourly weather forecast (next 48h) from Open-Meteo."""
+    """
+    Fetch hourly weather forecast (next 48h) from Open-Meteo.
+
+    Columns are typed at parse time: `time` is tz-aware in `tz`, values are
+    float32 (ample precision for %, °C, m/s, mm, km). The cached frame is
+    shared between sessions: read its columns, never modify it in place.
+    """
     url = "https://api.open-meteo.com/v1/forecast"
     params = {
         "latitude": lat,
@@ -72,46 +94,136 @@ def get_weather(lat, lon, tz):
         "timezone": tz,
         "forecast_days": 2,
     }
-    r = requests.get(url, params=params, timeout=15)
+    from model import frames
+
+    r = _get("weather", url, params=params)
     r.raise_for_status()
-    data = r.json()
+    data = decode.loads(r.content)
 
     if "hourly" not in data:
         return None
+    cache.publish(cache.weather_source(lat, lon), zlib.crc32(r.content))
+    return frames.weather_frame(data["hourly"], tz)
 
-    hr = data["hourly"]
-    df = pd.DataFrame({
-        "time": pd.to_datetime(hr["time"]),
-        "cloud_total": hr["cloudcover"],
-        "cloud_low": hr["cloudcover_low"],
-        "cloud_mid": hr["cloudcover_mid"],
-        "cloud_high": hr["cloudcover_high"],
-        "temp_c": hr["temperature_2m"],
-        "dewpoint_c": hr["dewpoint_2m"],
-        "rh_pct": hr["relative_humidity_2m"],
-        "visibility_km": [v/1000 if v is not None else None for v in hr["visibility"]],
-        "wind_ms": hr["windspeed_10m"],
-        "gust_ms": hr["windgusts_10m"],
-        "precip_mm": hr["precipitation"],
-        "precip_prob": hr["precipitation_probability"],
-    })
-    return df
+def load_weather(lat, lon, tz):
+    """Cached forecast (hours in local time) and the cloud cover (%) of the nearest hour.
+
+    The cached frame is shared between sessions and read as is, without a
+    copy. Raises ValueError when the forecast is empty.
+    """
+    import pandas as pd
+
+    wx = get_weather(lat, lon, tz)
+    if wx is not None and not wx.empty:
+        now_local = pd.Timestamp.now(tz=tz)
+        idx = (wx["time"] - now_local).abs().idxmin()
+        return wx, float(wx.loc[idx, "cloud_total"])
+    raise ValueError("prévisions vides")
+
+@cache.cached("kp_forecast", ttl=1800, max_entries=1, shared=True)  # cache 30 min
+def get_kp_forecast():
+    """
+    3-hourly planetary Kp: last 7 days (observed/estimated) and next 3 days (predicted).
+
+    Returns [(time_tag, kp, kind)] in time order; time_tag is the UTC start of
+    the 3-hour block ("YYYY-MM-DD HH:MM:SS"), kind is observed/estimated/predicted.
+    """
+    url = "https://services.swpc.noaa.gov/products/noaa-planetary-k-index-forecast.json"
+    r = _get("kp_forecast", url)
+    r.raise_for_status()
+    rows = decode.loads(r.content)
+
+    if rows and isinstance(rows[0], dict):       # newer object-per-row format
+        rows = [[row.get("time_tag"), row.get("kp"), row.get("observed")] for row in rows]
+    else:
+        rows = rows[1:]                           # header row
+    out = [(row[0], float(row[1]), row[2]) for row in rows if row[1] not in (None, "")]
+    cache.publish("kp_forecast", out[-1][:2] if out else None)
+    return out
+
+# -------------------------------------------------------------------
+# Open-Meteo — batched cloud cover (many locations, one request)
+# -------------------------------------------------------------------
+
+BATCH_MAX_COORDS = 100    # locations per Open-Meteo request
+CLOUD_FORECAST_DAYS = 4   # fetched for every location: the longest horizon used (compare, 72 h)
+
+_cloud_ns = cache.namespace("cloud_cover", ttl=1800, max_entries=8192, max_bytes=32 * 2**20, shared=True)
+
+
+def get_cloud_cover(coords, forecast_days=4):
+    """
+    Hourly total cloud cover (%) for many locations, on UTC hours.
+
+    `coords` is a sequence of (lat, lon). Each location is cached on its own
+    (3-decimal key, like get_weather), so overlapping requests share entries;
+    only the missing locations are fetched, together, in one Open-Meteo
+    request per BATCH_MAX_COORDS. Every location is fetched for at least
+    CLOUD_FORECAST_DAYS and sliced to `forecast_days`, so all horizons share
+    the same entries. Returns, aligned with `coords`, dicts
+    {"start": first UTC hour "YYYY-MM-DDTHH:MM", "cloud": [% per hour]}.
+    """
+    keys = [(_coord(lat), _coord(lon)) for lat, lon in coords]
+    hours = forecast_days * 24
+    found, missing = {}, []
+    for k in dict.fromkeys(keys):
+        hit = _cloud_ns.lookup(k)
+        shared = False
+        if hit is None or not hit[1]:
+            hit, shared = _cloud_ns.load_shared(k), True
+        if hit is not None and hit[1] and len(hit[0]["cloud"]) >= hours:
+            _cloud_ns.record(hit=True, shared=shared)
+            found[k] = hit[0]
+        else:
+            _cloud_ns.record(hit=False)
+            missing.append(k)
+
+    for i in range(0, len(missing), BATCH_MAX_COORDS):
+        chunk = missing[i:i + BATCH_MAX_COORDS]
+        for k, series in zip(chunk, _fetch_cloud_batch(chunk, max(forecast_days, CLOUD_FORECAST_DAYS))):
+            _cloud_ns.store(k, series)
+            found[k] = series
+    return [{"start": found[k]["start"], "cloud": found[k]["cloud"][:hours]} for k in keys]
+
+
+def _fetch_cloud_batch(keys, forecast_days):
+    """One Open-Meteo request for all `keys` ((lat, lon)); one series per key."""
+    url = "https://api.open-meteo.com/v1/forecast"
+    params = {
+        "latitude": ",".join(str(k[0]) for k in keys),
+        "longitude": ",".join(str(k[1]) for k in keys),
+        "hourly": "cloudcover",
+        "timezone": "GMT",
+        "forecast_days": forecast_days,
+    }
+    r = _get("cloud_cover", url, params=params)
+    r.raise_for_status()
+    data = decode.loads(r.content)
+    if isinstance(data, dict):        # a single location comes back as one object
+        data = [data]
+    if len(data) != len(keys):
+        raise ValueError(f"Open-Meteo: {len(data)} series for {len(keys)} locations")
+    return [{"start": d["hourly"]["time"][0], "cloud": d["hourly"]["cloudcover"]} for d in data]
 
 # -------------------------------------------------------------------
 # Sunrise–Sunset API — Darkness flag
 # -------------------------------------------------------------------
 
-def darkness_flag(lat, lon):
-    """Return darkness=1 if night at given lat/lon, plus sunrise/sunset times."""
+@cache.cached("darkness", ttl=3600, key=lambda lat, lon: (_coord(lat), _coord(lon)),
+              max_entries=1024)  # cache 1 h (horaires du jour)
+def get_sun_times(lat, lon):
+    """Fetch today's sunrise/sunset (UTC) at given lat/lon."""
     url = "https://api.sunrise-sunset.org/json"
     params = {"lat": lat, "lng": lon, "formatted": 0}
-    r = requests.get(url, params=params, timeout=15)
+    r = _get("darkness", url, params=params)
     r.raise_for_status()
     data = r.json()["results"]
+    return datetime.fromisoformat(data["sunrise"]), datetime.fromisoformat(data["sunset"])
 
-    sunrise_utc = pd.to_datetime(data["sunrise"])
-    sunset_utc = pd.to_datetime(data["sunset"])
-    now_utc = pd.Timestamp.utcnow()
+def darkness_flag(lat, lon):
+    """Return darkness=1 if night at given lat/lon, plus sunrise/sunset times."""
+    sunrise_utc, sunset_utc = get_sun_times(lat, lon)
+    now_utc = datetime.now(timezone.utc)
 
     dark = 1 if (now_utc < sunrise_utc) or (now_utc > sunset_utc) else 0
     return dark, sunrise_utc, sunset_utc
@@ -120,10 +232,11 @@ def darkness_flag(lat, lon):
 # Geocoding — Open-Meteo
 # -------------------------------------------------------------------
 
+@cache.cached("geocode", ttl=86400, max_entries=2048, policy="lfu", shared=True)  # cache 1 jour
 def geocode_place(place: str):
     """Resolve place name to lat/lon via Open-Meteo geocoding."""
     url = "https://geocoding-api.open-meteo.com/v1/search"
-    r = requests.get(url, params={"name": place, "count": 1}, timeout=15)
+    r = _get("geocode", url, params={"name": place, "count": 1})
     r.raise_for_status()
     js = r.json()
     if not js.get("results"):
@@ -162,7 +275,7 @@ def score_label(score):
 # OpenWeatherMap — Current Weather (with cache + retries)
 # -------------------------------------------------------------------
 
-@st.cache_resource
+@functools.cache   # one pooled session per process
 def _owm_session():
     s = requests.Session()
     retry = Retry(
@@ -174,7 +287,9 @@ def _owm_session():
     s.mount("https://", HTTPAdapter(max_retries=retry))
     return s
 
-@st.cache_data(ttl=600, show_spinner=False)   # cache for 10 minutes
+@cache.cached("owm_current", ttl=600,   # cache for 10 minutes; a rate-limit reply only for 1
+              key=lambda lat, lon, api_key, units="metric": (_coord(lat), _coord(lon), _secret(api_key), units),
+              max_entries=512, is_error=lambda value: "error" in value, error_ttl=60)
 def get_owm_current(lat: float, lon: float, api_key: str, units: str = "metric"):
     """Fetch current weather from OpenWeatherMap with caching and rate-limit handling."""
     lat = round(float(lat), 3)
@@ -182,7 +297,7 @@ def get_owm_current(lat: float, lon: float, api_key: str, units: str = "metric")
     url = "https://api.openweathermap.org/data/2.5/weather"
     params = {"lat": lat, "lon": lon, "appid": api_key, "units": units}
 
-    r = _owm_session().get(url, params=params, timeout=15)
+    r = _get("owm_current", url, params=params, session=_owm_session())
 
     if r.status_code == 429:
         return {"error": "rate_limited", "message": "OpenWeatherMap rate limit reached. Please try again shortly."}
@@ -193,7 +308,6 @@ def get_owm_current(lat: float, lon: float, api_key: str, units: str = "metric")
     icon = (data.get("weather") or [{}])[0].get("icon")
     desc = (data.get("weather") or [{}])[0].get("description") or ""
     return {
-        "raw": data,
         "city": data.get("name"),
         "country": (data.get("sys") or {}).get("country"),
         "desc": f" — {desc.title()}" if desc else "",
@@ -204,4 +318,23 @@ def get_owm_current(lat: float, lon: float, api_key: str, units: str = "metric")
         "wind_ms": (data.get("wind") or {}).get("speed"),
         "pressure_hpa": (data.get("main") or {}).get("pressure"),
         "icon_url": f"https://openweathermap.org/img/wn/{icon}@2x.png" if icon else None,
+        "raw": data,
     }
+
+# -------------------------------------------------------------------
+# Targeted refresh ("Actualiser les données")
+# -------------------------------------------------------------------
+
+def invalidate_location(lat, lon, tz, owm_api_key=None):
+    """Mark the entries behind one location (and the shared Kp data) as stale.
+
+    Other locations and shared resources are left untouched; stale entries are
+    revalidated with a conditional request on next read when the source sent
+    ETag/Last-Modified.
+    """
+    get_weather.invalidate(lat, lon, tz)
+    get_sun_times.invalidate(lat, lon)
+    if owm_api_key:
+        get_owm_current.invalidate(lat, lon, owm_api_key, units="metric")
+    get_kp_now.invalidate()
+    get_kp_series.invalidate(limit_minutes=240)
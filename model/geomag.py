@@ -0,0 +1,125 @@
+# model/geomag.py
+"""
+Coordonnées géomagnétiques (pôle de référence par hémisphère) et seuils Kp de visibilité.
+
+L'ovale auroral suit le champ magnétique, pas les parallèles géographiques :
+le pôle géomagnétique nord est au nord du Canada, si bien qu'à latitude
+géographique égale Fairbanks ou Banff sont bien plus « aurorales » que
+l'Europe. Les seuils Kp (table NOAA) s'appliquent donc à la latitude
+géomagnétique, calculée ici pour des tableaux entiers de coordonnées.
+Les deux hémisphères suivent le même code : la latitude géomagnétique est
+négative au sud et les seuils portent sur sa valeur absolue.
+"""
+
+import functools
+
+import numpy as np
+
+# Pôle de référence de chaque hémisphère. Nord : pôle du dipôle IGRF-14
+# (époque 2025). Sud : le dipôle centré place l'ovale austral ~7° trop près
+# du pôle (champ excentré) ; on prend le pôle sud des coordonnées
+# géomagnétiques corrigées (CGM, approximation à l'altitude 0).
+POLES = {"north": (80.8, -72.7), "south": (-74.5, 126.0)}
+
+# Kp → latitude géomagnétique du bord équatorial de l'ovale visible (table NOAA)
+KP_ZONES = {
+    0: 66.5, 1: 64.5, 2: 62.4, 3: 60.4, 4: 58.3,
+    5: 56.3, 6: 54.2, 7: 52.2, 8: 50.1, 9: 48.1
+}
+_KP_MLAT = np.array([KP_ZONES[k] for k in range(10)], dtype=np.float32)
+
+
+# -------------------------------------------------------------------
+# Conversion géographique → géomagnétique
+# -------------------------------------------------------------------
+
+def _pole_terms(hemi):
+    plat, plon = POLES[hemi]
+    plat = abs(plat)                 # hémisphère sud traité en miroir (φ → −φ)
+    return np.sin(np.radians(plat)), np.cos(np.radians(plat)), plon
+
+
+def _latitude_from_pole(lat, lon, hemi):
+    """90° − distance angulaire au pôle de `hemi`, latitudes du sud en miroir."""
+    sin_p, cos_p, plon = _pole_terms(hemi)
+    phi = np.radians(lat if hemi == "north" else -lat)
+    s = np.sin(phi) * sin_p + np.cos(phi) * cos_p * np.cos(np.radians(lon - plon))
+    return np.degrees(np.arcsin(np.clip(s, -1, 1)))
+
+
+def magnetic_latitude(lat, lon):
+    """
+    Latitude géomagnétique (°) de coordonnées géographiques, scalaires ou tableaux ;
+    négative dans l'hémisphère sud.
+
+    sin(Φ) = sin(φ)·sin(φp) + cos(φ)·cos(φp)·cos(λ − λp), avec (φp, λp) le pôle
+    de l'hémisphère du point (POLES) ; le même calcul sert aux deux hémisphères.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    return np.where(lat >= 0, _latitude_from_pole(lat, lon, "north"),
+                    -_latitude_from_pole(lat, lon, "south"))
+
+
+def iso_latitude(mlat, lon):
+    """
+    Latitude géographique (°) des points de longitude `lon` situés à la latitude
+    géomagnétique `mlat` (négative au sud) : tracé d'une limite Kp sur une carte.
+    """
+    hemi = hemisphere(mlat)
+    sin_p, cos_p, plon = _pole_terms(hemi)
+    dlon = np.radians(np.asarray(lon, dtype=np.float64) - plon)
+    a, b = sin_p, cos_p * np.cos(dlon)       # a·sin(φ) + b·cos(φ) = sin(|Φ|)
+    r = np.hypot(a, b)
+    s = np.clip(np.sin(np.radians(abs(mlat))) / r, -1, 1)
+    lat = np.degrees(np.arcsin(s) - np.arctan2(b, a))
+    return lat if hemi == "north" else -lat
+
+
+def hemisphere(mlat):
+    """« north » ou « south » selon le signe de la latitude (scalaire)."""
+    return "south" if mlat < 0 else "north"
+
+
+def format_lat(lat, digits=2):
+    """Latitude lisible : 59.33°N, 42.88°S."""
+    return f"{abs(lat):.{digits}f}°{'S' if lat < 0 else 'N'}"
+
+
+@functools.cache
+def _catalog(coords):
+    lat, lon = np.array(coords, dtype=np.float64).reshape(-1, 2).T
+    mlat = magnetic_latitude(lat, lon)
+    mlat.setflags(write=False)       # partagé entre sessions
+    return mlat
+
+
+def catalog_latitudes(cities):
+    """
+    Latitudes géomagnétiques d'un catalogue de villes (dicts lat, lon), en un
+    tableau. La conversion n'est faite qu'une fois par liste de coordonnées.
+    """
+    return _catalog(tuple((float(v["lat"]), float(v["lon"])) for v in cities))
+
+
+# -------------------------------------------------------------------
+# Seuils Kp
+# -------------------------------------------------------------------
+
+def kp_limit(kp):
+    """Latitude géomagnétique limite de visibilité pour `kp` (interpolée entre les Kp entiers)."""
+    return np.interp(np.clip(kp, 0, 9), np.arange(10), _KP_MLAT)
+
+
+def min_kp(mlat):
+    """
+    Kp entier minimum pour voir des aurores à la latitude géomagnétique `mlat`
+    (scalaire ou tableau, l'un ou l'autre hémisphère) ; 9 en dessous de la limite Kp 9.
+    """
+    above = np.abs(np.asarray(mlat, dtype=np.float32))[..., None] < _KP_MLAT
+    return np.minimum(above.sum(axis=-1), 9)
+
+
+def visible(mlat, kp):
+    """Aurores visibles à `mlat` (nord ou sud) pour l'indice `kp` (tableau de booléens)."""
+    return np.abs(mlat) >= kp_limit(kp)
@@ -0,0 +1,320 @@
+# model/kp_archive.py
+"""
+Archive locale de l'indice Kp (blocs de 3 h depuis 1932) et statistiques rapides.
+
+Le fichier texte du GFZ Potsdam (Kp_ap_since_1932.txt, ~25 Mo, mis à jour
+chaque jour) est converti une fois en un fichier `.npz` compact :
+
+  - `kp3`      : Kp en tiers (0 = 0o … 27 = 9o), un octet par bloc de 3 h,
+                 blocs contigus depuis `first_day` (255 = valeur manquante) ;
+  - `day_max3` : Kp maximum de chaque jour UTC, en tiers ;
+  - `block_cum`, `day_cum` : sommes cumulées par jour, pour chaque seuil
+    k = 0…9, du nombre de blocs et du nombre de jours à Kp ≥ k.
+
+Un comptage sur une période quelconque est alors une différence de deux
+valeurs (O(1)) ; une saison, une année ou tout l'historique se comptent en
+quelques microsecondes, sans relire les ~270 000 blocs.
+
+L'application lance elle-même la construction dans un thread d'arrière-plan
+(`refresh_in_background`) quand l'archive manque ou a plus d'un jour : le
+démarrage n'attend jamais le téléchargement. En ligne de commande (cron) :
+
+    python -m model.kp_archive                  # construit data/kp_archive.npz (si plus d'un jour)
+    python -m model.kp_archive --force          # reconstruit quoi qu'il arrive
+    python -m model.kp_archive --source fichier.txt
+
+Les seuils suivent l'échelle NOAA : « Kp ≥ 5 » inclut 5− (4,67), comme la
+tempête G1.
+"""
+
+import argparse
+import functools
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+ARCHIVE_PATH = Path(os.environ.get("AURORA_KP_ARCHIVE", ROOT / "data" / "kp_archive.npz"))
+GFZ_URL = "https://kp.gfz.de/app/files/Kp_ap_since_1932.txt"
+MAX_AGE_DAYS = 1          # le GFZ publie chaque jour
+RETRY_S = 3600            # après un échec, nouvel essai au plus une fois par heure
+
+logger = logging.getLogger("aurora.kp_archive")
+
+MISSING = 255
+BLOCKS_PER_DAY = 8
+ROTATION_DAYS = 27       # rotation solaire synodique vue de la Terre
+SEASON_START = (9, 1)    # saison des aurores boréales : 1er septembre → 30 avril
+SEASON_END = (4, 30)
+FORMAT_VERSION = 1
+
+
+# -------------------------------------------------------------------
+# Construction (texte GFZ → .npz)
+# -------------------------------------------------------------------
+
+def parse_gfz(text):
+    """
+    Blocs Kp d'un fichier Kp_ap_since_1932 : (premier jour datetime64[D], kp3 uint8).
+
+    Colonnes : YYYY MM DD hh.h hh._m days days_m Kp ap D ; Kp = −1 pour une
+    valeur manquante. Les blocs absents du fichier restent MISSING.
+    """
+    table = np.loadtxt(io.StringIO(text), comments="#", usecols=(0, 1, 2, 3, 7), ndmin=2)
+    if not len(table):
+        raise ValueError("fichier Kp vide")
+    y, m, d, hour, kp = table.T
+    days = ((y - 1970).astype("datetime64[Y]") + (m - 1).astype("timedelta64[M]")).astype("datetime64[D]") \
+        + (d - 1).astype("timedelta64[D]")
+    first = days.min()
+    index = (days - first).astype(np.int64) * BLOCKS_PER_DAY + (hour // 3).astype(np.int64)
+    kp3 = np.full(index.max() + 1, MISSING, dtype=np.uint8)
+    valid = kp >= 0
+    kp3[index[valid]] = np.round(kp[valid] * 3).astype(np.uint8)
+    return first, kp3
+
+
+def aggregates(kp3):
+    """Maximum journalier et sommes cumulées par seuil (voir le docstring du module)."""
+    n_days = -(-len(kp3) // BLOCKS_PER_DAY)
+    blocks = np.full(n_days * BLOCKS_PER_DAY, MISSING, dtype=np.uint8)
+    blocks[:len(kp3)] = kp3
+    blocks = blocks.reshape(n_days, BLOCKS_PER_DAY)
+    valid = blocks != MISSING
+    day_max3 = np.where(valid.any(axis=1), np.where(valid, blocks, 0).max(axis=1), MISSING).astype(np.uint8)
+
+    # seuil k ≥ 1 : Kp ≥ k− (3k − 1 tiers) ; k = 0 : toute valeur valide
+    limits = np.maximum(3 * np.arange(10) - 1, 0)[:, None]
+    per_day = ((blocks[None, :, :] >= limits[:, :, None]) & valid[None]).sum(axis=2)
+    day_hit = (day_max3[None, :] >= limits) & (day_max3 != MISSING)[None, :]
+    zero = np.zeros((10, 1), dtype=np.uint32)
+    block_cum = np.concatenate([zero, per_day.cumsum(axis=1, dtype=np.uint32)], axis=1)
+    day_cum = np.concatenate([zero, day_hit.cumsum(axis=1, dtype=np.uint32)], axis=1)
+    return day_max3, block_cum, day_cum
+
+
+def build(source=GFZ_URL, path=None):
+    """Construit l'archive depuis `source` (URL ou fichier local) ; renvoie son chemin."""
+    path = Path(path or ARCHIVE_PATH)
+    if str(source).startswith(("http://", "https://")):
+        from model.upstream import get
+
+        r = get("kp_archive", str(source), timeout=120)
+        r.raise_for_status()
+        text = r.text
+    else:
+        text = Path(source).read_text()
+    first, kp3 = parse_gfz(text)
+    day_max3, block_cum, day_cum = aggregates(kp3)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".npz")
+    with os.fdopen(fd, "wb") as f:
+        np.savez_compressed(
+            f, version=FORMAT_VERSION, first_day=first, kp3=kp3, day_max3=day_max3,
+            block_cum=block_cum, day_cum=day_cum, built_at=time.time(), source=str(source),
+        )
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)    # écriture atomique, comme model.assets
+    return path
+
+
+# -------------------------------------------------------------------
+# Lecture et requêtes
+# -------------------------------------------------------------------
+
+class KpArchive:
+    """Archive chargée en mémoire ; les dates sont des `datetime.date` (UTC)."""
+
+    def __init__(self, data):
+        self.first_day = data["first_day"][()]
+        self.kp3 = data["kp3"]
+        self.day_max3 = data["day_max3"]
+        self.block_cum = data["block_cum"]
+        self.day_cum = data["day_cum"]
+        self.built_at = float(data["built_at"])
+        self.source = str(data["source"])
+
+    @property
+    def n_days(self):
+        return len(self.day_max3)
+
+    @property
+    def first_date(self):
+        return self.first_day.astype(date)
+
+    @property
+    def last_date(self):
+        """Dernier jour UTC ayant au moins une valeur."""
+        filled = np.flatnonzero(self.day_max3 != MISSING)
+        return (self.first_day + int(filled[-1])).astype(date) if len(filled) else self.first_date
+
+    def _day(self, when):
+        """Indice du jour `when` (date, ou tableau datetime64[D]), borné à l'archive."""
+        offset = (np.asarray(when, dtype="datetime64[D]") - self.first_day).astype(np.int64)
+        return np.clip(offset, 0, self.n_days)
+
+    def exceedance(self, threshold, start=None, end=None):
+        """
+        Blocs de 3 h et jours à Kp ≥ `threshold` (entier 0–9) sur [start, end[ ;
+        toute l'archive par défaut. Les fractions portent sur les valeurs connues.
+        """
+        k = int(threshold)
+        a = self._day(start or self.first_date)
+        b = self._day(end or self.last_date + timedelta(days=1))
+        blocks, valid_blocks = int(self.block_cum[k, b] - self.block_cum[k, a]), int(self.block_cum[0, b] - self.block_cum[0, a])
+        days, valid_days = int(self.day_cum[k, b] - self.day_cum[k, a]), int(self.day_cum[0, b] - self.day_cum[0, a])
+        return {
+            "blocks": blocks, "valid_blocks": valid_blocks,
+            "block_fraction": blocks / valid_blocks if valid_blocks else None,
+            "days": days, "valid_days": valid_days,
+            "day_fraction": days / valid_days if valid_days else None,
+        }
+
+    def day_counts(self, threshold, starts, ends):
+        """
+        Pour chaque période [starts[i], ends[i][ (datetime64[D]) : (jours à Kp ≥
+        `threshold`, jours connus), deux tableaux d'entiers.
+        """
+        k = int(threshold)
+        a, b = self._day(starts), self._day(ends)
+        return (self.day_cum[k, b].astype(np.int64) - self.day_cum[k, a]), (self.day_cum[0, b].astype(np.int64) - self.day_cum[0, a])
+
+    def season(self, threshold, today=None):
+        """
+        Saison en cours (1er septembre → 30 avril) comparée aux précédentes, à
+        date égale : {"start", "elapsed_days", "days", "mean", "rank", "seasons"},
+        `seasons` étant [(année de début, jours à Kp ≥ threshold)] des saisons
+        passées, sur le même nombre de jours.
+        """
+        today = today or self.last_date
+        year = today.year if (today.month, today.day) >= SEASON_START else today.year - 1
+        start = date(year, *SEASON_START)
+        # hors saison (mai–août) : la saison passée, en entier
+        elapsed = min((today - start).days, (date(year + 1, *SEASON_END) - start).days) + 1
+        years = np.arange(self.first_date.year + (self.first_date > date(self.first_date.year, *SEASON_START)), year)
+        starts = np.array([f"{y}-{SEASON_START[0]:02d}-{SEASON_START[1]:02d}" for y in years], dtype="datetime64[D]")
+        counts, known = self.day_counts(threshold, starts, starts + elapsed)
+        complete = known >= 0.9 * elapsed        # saisons sans grosse lacune
+        current = self.exceedance(threshold, start, start + timedelta(days=elapsed))["days"]
+        past = counts[complete]
+        return {
+            "start": start, "elapsed_days": elapsed, "days": current,
+            "mean": float(past.mean()) if len(past) else None,
+            "rank": int((past > current).sum()) + 1,      # 1 = saison la plus active à cette date
+            "seasons": list(zip(years[complete].tolist(), past.tolist())),
+        }
+
+    def yearly(self, threshold):
+        """Jours à Kp ≥ `threshold` par année civile : [(année, jours, jours connus)]."""
+        years = np.arange(self.first_date.year, self.last_date.year + 1)
+        bounds = (np.arange(years[0], years[-1] + 2) - 1970).astype("datetime64[Y]").astype("datetime64[D]")
+        counts, known = self.day_counts(threshold, bounds[:-1], bounds[1:])
+        return list(zip(years.tolist(), counts.tolist(), known.tolist()))
+
+    def recurrence(self, start=None, days=7, rotations=3):
+        """
+        Indice de récurrence à 27 jours : pour chacun des `days` jours à partir de
+        `start` (par défaut le lendemain du dernier jour connu), Kp max observé
+        1, 2… `rotations` rotations solaires plus tôt. Renvoie (dates, tableau
+        (days, rotations) de Kp max, NaN si inconnu).
+        """
+        start = start or self.last_date + timedelta(days=1)
+        dates = np.datetime64(start, "D") + np.arange(days)
+        back = dates[:, None] - ROTATION_DAYS * np.arange(1, rotations + 1)[None, :]
+        idx = (back - self.first_day).astype(np.int64)
+        inside = (idx >= 0) & (idx < self.n_days)
+        raw = np.where(inside, self.day_max3[np.clip(idx, 0, self.n_days - 1)], MISSING)
+        kp = np.where(raw == MISSING, np.nan, raw / 3)
+        return dates.astype(date).tolist(), kp
+
+
+@functools.cache
+def _load(path, mtime):
+    with np.load(path) as data:
+        if int(data["version"]) != FORMAT_VERSION:
+            raise ValueError(f"archive Kp au format {int(data['version'])}, attendu {FORMAT_VERSION}")
+        return KpArchive(data)
+
+
+def load(path=None):
+    """Archive de `path` (ARCHIVE_PATH par défaut), relue si le fichier a changé ; None si absente."""
+    path = Path(path or ARCHIVE_PATH)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _load(str(path), mtime)
+
+
+def _age_days(path):
+    try:
+        return (time.time() - path.stat().st_mtime) / 86400
+    except FileNotFoundError:
+        return None
+
+
+_refresh = {"thread": None, "attempt": 0.0}
+_refresh_lock = threading.Lock()
+
+
+def _build_logged(source, path):
+    try:
+        started = time.perf_counter()
+        build(source, path)
+        logger.info("archive Kp construite en %.1f s : %s", time.perf_counter() - started, path)
+    except Exception as e:
+        logger.warning("archive Kp non construite : %s", e)
+
+
+def refresh_in_background(source=GFZ_URL, path=None):
+    """
+    Construit l'archive dans un thread d'arrière-plan si elle manque ou a plus
+    de MAX_AGE_DAYS jours (une construction à la fois, un essai par heure au
+    plus). Ne bloque jamais ; renvoie True si une construction est en cours.
+    """
+    path = Path(path or ARCHIVE_PATH)
+    with _refresh_lock:
+        thread = _refresh["thread"]
+        if thread is not None and thread.is_alive():
+            return True
+        age = _age_days(path)
+        if (age is not None and age < MAX_AGE_DAYS) or time.time() - _refresh["attempt"] < RETRY_S:
+            return False
+        _refresh["attempt"] = time.time()
+        _refresh["thread"] = threading.Thread(target=_build_logged, args=(source, path),
+                                              daemon=True, name="kp-archive")
+        _refresh["thread"].start()
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construit l'archive Kp locale.")
+    parser.add_argument("--source", default=GFZ_URL, help="URL ou fichier Kp_ap_since_1932.txt")
+    parser.add_argument("--path", type=Path, default=ARCHIVE_PATH)
+    parser.add_argument("--force", action="store_true", help="reconstruire même si l'archive a moins d'un jour")
+    args = parser.parse_args()
+
+    age = _age_days(args.path)
+    if age is not None and age < MAX_AGE_DAYS and not args.force:
+        print(f"archive à jour ({age * 24:.1f} h) : {args.path}")
+        sys.exit(0)
+    try:
+        started = time.perf_counter()
+        built = build(args.source, args.path)
+    except Exception as e:
+        # non bloquant : le tableau de bord démarre avec l'archive existante,
+        # ou sans (section historique masquée)
+        print(f"archive Kp non construite : {e}", file=sys.stderr)
+        sys.exit(0)
+    archive = load(built)
+    print(f"{built}  {built.stat().st_size / 1024:.0f} Kio  {archive.first_date} → {archive.last_date}"
+          f"  ({time.perf_counter() - started:.1f} s)")
@@ -0,0 +1,127 @@
+# model/live.py
+"""
+Flux Kp 1 minute partagé par toutes les sessions.
+
+Un seul thread d'arrière-plan interroge planetary_k_index_1m.json (une fois
+par minute) et conserve les dernières valeurs en mémoire, numérotées par un
+compteur de séquence. Chaque session ne récupère que le delta depuis la
+dernière séquence qu'elle a affichée (`since()`) : le nombre d'appels à NOAA
+reste constant quel que soit le nombre de spectateurs.
+"""
+
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from model import cache, decode, upstream
+
+KP_1M_URL = "https://services.swpc.noaa.gov/json/planetary_k_index_1m.json"
+POLL_INTERVAL_S = 60
+WINDOW_MINUTES = 240
+
+logger = logging.getLogger("aurora.live")
+
+
+class KpFeed:
+    """Abonné unique au flux Kp 1 minute ; diffuse les nouvelles valeurs par delta."""
+
+    def __init__(self, url=KP_1M_URL, interval_s=POLL_INTERVAL_S, window_minutes=WINDOW_MINUTES):
+        self.url = url
+        self.interval_s = interval_s
+        self.window = timedelta(minutes=window_minutes)
+        self.seq = 0                  # séquence de la dernière valeur reçue
+        self.last_poll = None         # datetime UTC du dernier appel réussi
+        self._rows = deque()          # (séquence, datetime UTC, kp_index, estimated_kp)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- Abonnement
+    def start(self):
+        """Premier appel synchrone (données disponibles immédiatement), puis thread."""
+        if self._thread is None:
+            self.poll()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="kp-feed")
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.poll()
+
+    def poll(self):
+        """Interroge NOAA et ajoute les valeurs plus récentes que la dernière connue."""
+        try:
+            r = upstream.get("kp_live", self.url, timeout=15)
+            r.raise_for_status()
+            rows = decode.loads(r.content)
+        except Exception as e:
+            logger.warning("flux Kp : %s", e)
+            return 0
+        return self.ingest(rows)
+
+    def ingest(self, rows):
+        with self._lock:
+            last_t = self._rows[-1][1] if self._rows else None
+        # Horodatages ISO comparables en texte : seules les nouvelles lignes sont converties
+        last_tag = last_t.strftime("%Y-%m-%dT%H:%M:%S") if last_t else ""
+        parsed = []
+        for row in rows:
+            if row.get("kp_index") is None or row["time_tag"] <= last_tag:
+                continue
+            t = datetime.fromisoformat(row["time_tag"]).replace(tzinfo=timezone.utc)
+            kp_index = float(row["kp_index"])
+            estimated = row.get("estimated_kp")
+            parsed.append((t, kp_index, float(estimated) if estimated is not None else kp_index))
+        parsed.sort()
+        with self._lock:
+            last_t = self._rows[-1][1] if self._rows else None
+            added = 0
+            for t, kp_index, estimated in parsed:
+                if last_t is None or t > last_t:
+                    self.seq += 1
+                    self._rows.append((self.seq, t, kp_index, estimated))
+                    added += 1
+            if self._rows:
+                cutoff = self._rows[-1][1] - self.window
+                while self._rows[0][1] < cutoff:
+                    self._rows.popleft()
+                cache.publish("kp_live", self._rows[-1][1].isoformat())
+            self.last_poll = datetime.now(timezone.utc)
+        return added
+
+    # ---- Lecture par les sessions
+    def since(self, seq):
+        """
+        Valeurs arrivées après `seq` : (séquence courante, [(datetime, kp_index, estimated_kp)], complet).
+
+        `complet` est vrai quand le delta ne suffit pas (première lecture ou
+        session trop en retard) : la liste renvoyée remplace alors l'historique.
+        """
+        with self._lock:
+            oldest = self._rows[0][0] if self._rows else self.seq + 1
+            full = seq <= 0 or seq < oldest - 1 or seq > self.seq
+            rows = [row[1:] for row in self._rows if full or row[0] > seq]
+            return self.seq, rows, full
+
+    def latest(self):
+        """Dernière valeur (datetime, kp_index, estimated_kp), ou None."""
+        with self._lock:
+            return self._rows[-1][1:] if self._rows else None
+
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_feed():
+    """Flux partagé du processus (démarré au premier appel)."""
+    global _feed
+    with _feed_lock:
+        if _feed is None:
+            _feed = KpFeed().start()
+        return _feed
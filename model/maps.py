@@ -0,0 +1,283 @@
+# model/maps.py
+"""
+Construction de la carte mondiale de visibilité des aurores (onglet « Carte mondiale »).
+
+La zone d'aurores n'est plus simulée par des bandes de latitude : la grille de
+probabilités OVATION (model.ovation.get_grid), éventuellement pondérée par
+une couverture nuageuse, est rastérisée en une seule image PNG posée sous
+les tracés d'une carte MapLibre. L'image est calculée une fois par mise à
+jour du modèle et partagée par toutes les sessions (espace « map_overlay »).
+"""
+
+import base64
+import io
+import zlib
+
+import numpy as np
+import plotly.graph_objects as go
+
+from model import cache, geomag, ovation
+
+# Villes principales (toujours affichées sur la carte)
+MAIN_CITIES = [
+    {"name": "Longyearbyen", "lat": 78.22, "lon": 15.63, "emoji": "🇳🇴", "type": "principale"},
+    {"name": "Tromsø", "lat": 69.65, "lon": 18.96, "emoji": "🇳🇴", "type": "principale"},
+    {"name": "Reykjavik", "lat": 64.13, "lon": -21.89, "emoji": "🇮🇸", "type": "principale"},
+    {"name": "Stockholm", "lat": 59.33, "lon": 18.07, "emoji": "🇸🇪", "type": "principale"},
+    {"name": "Oslo", "lat": 59.91, "lon": 10.75, "emoji": "🇳🇴", "type": "principale"},
+    {"name": "Édimbourg", "lat": 55.95, "lon": -3.19, "emoji": "🏴󠁧󠁢󠁳󠁣󠁴󠁿", "type": "principale"},
+    {"name": "Londres", "lat": 51.51, "lon": -0.13, "emoji": "🇬🇧", "type": "principale"},
+    {"name": "Paris", "lat": 48.85, "lon": 2.35, "emoji": "🇫🇷", "type": "principale"},
+    {"name": "Berlin", "lat": 52.52, "lon": 13.40, "emoji": "🇩🇪", "type": "principale"},
+]
+
+# Villes principales de l'hémisphère sud
+MAIN_CITIES_SOUTH = [
+    {"name": "Hobart", "lat": -42.88, "lon": 147.33, "emoji": "🇦🇺", "type": "principale"},
+    {"name": "Melbourne", "lat": -37.81, "lon": 144.96, "emoji": "🇦🇺", "type": "principale"},
+    {"name": "Invercargill", "lat": -46.41, "lon": 168.35, "emoji": "🇳🇿", "type": "principale"},
+    {"name": "Dunedin", "lat": -45.87, "lon": 170.50, "emoji": "🇳🇿", "type": "principale"},
+    {"name": "Queenstown", "lat": -45.03, "lon": 168.66, "emoji": "🇳🇿", "type": "principale"},
+    {"name": "Ushuaia", "lat": -54.80, "lon": -68.30, "emoji": "🇦🇷", "type": "principale"},
+    {"name": "Punta Arenas", "lat": -53.16, "lon": -70.91, "emoji": "🇨🇱", "type": "principale"},
+]
+
+HEMISPHERE_CITIES = {"north": MAIN_CITIES, "south": MAIN_CITIES_SOUTH}
+
+# Cadrage de la carte et titre par hémisphère
+VIEWS = {
+    "north": {"center": dict(lat=62, lon=0), "zoom": 1.4, "title": "Boréales"},
+    "south": {"center": dict(lat=-52, lon=-160), "zoom": 1.4, "title": "Australes"},
+}
+
+
+# Latitude maximale de la projection Web Mercator utilisée par la carte
+MERCATOR_MAX_LAT = 85.0
+# Hauteur de l'image (lignes équidistantes en ordonnée Mercator, pas en latitude)
+OVERLAY_ROWS = 512
+# Probabilité (%) en dessous de laquelle une maille reste transparente
+MIN_PROBABILITY = 5
+
+# Palette probabilité (%) → RGBA : vert → jaune → orange → rouge
+_PALETTE_STOPS = np.array([0, 5, 30, 60, 90, 100])
+_PALETTE_RGBA = np.array([
+    [46, 204, 113, 0],
+    [46, 204, 113, 90],
+    [241, 196, 15, 160],
+    [230, 126, 34, 200],
+    [192, 57, 43, 220],
+    [192, 57, 43, 230],
+])
+COLORSCALE = [[0.0, "rgb(46, 204, 113)"], [0.3, "rgb(241, 196, 15)"],
+              [0.6, "rgb(230, 126, 34)"], [1.0, "rgb(192, 57, 43)"]]
+_LUT = np.stack([np.interp(np.arange(101), _PALETTE_STOPS, _PALETTE_RGBA[:, c]) for c in range(4)],
+                axis=1).round().astype(np.uint8)
+_LUT[:MIN_PROBABILITY] = 0
+
+
+# -------------------------------------------------------------------
+# Rastérisation de la grille OVATION
+# -------------------------------------------------------------------
+
+def probability_grid(grid: dict) -> np.ndarray:
+    """Grille uint8 (181, 360) de model.ovation.get_grid, en vue sans copie."""
+    return np.frombuffer(grid["aurora"], dtype=np.uint8).reshape(ovation.GRID_SHAPE)
+
+
+def resample_field(field: dict) -> np.ndarray:
+    """
+    Ramène un champ régulier {"lat": [...], "lon": [...], "values": [[...]]}
+    (latitudes et longitudes croissantes, longitudes en -180..180) sur la
+    grille OVATION, par plus proche voisin. Les mailles hors du champ valent NaN.
+    """
+    lats = np.asarray(field["lat"], dtype=np.float32)
+    lons = np.asarray(field["lon"], dtype=np.float32)
+    values = np.asarray(field["values"], dtype=np.float32)
+    grid_lat = np.arange(-90, 91, dtype=np.float32)
+    grid_lon = (np.arange(360, dtype=np.float32) + 180) % 360 - 180
+    i = np.abs(grid_lat[:, None] - lats[None, :]).argmin(axis=1)
+    j = np.abs(grid_lon[:, None] - lons[None, :]).argmin(axis=1)
+    out = values[i[:, None], j[None, :]]
+    step_lat = np.diff(lats).max() if len(lats) > 1 else 1.0
+    step_lon = np.diff(lons).max() if len(lons) > 1 else 1.0
+    outside = ((grid_lat < lats[0] - step_lat / 2) | (grid_lat > lats[-1] + step_lat / 2))[:, None] \
+        | ((grid_lon < lons[0] - step_lon / 2) | (grid_lon > lons[-1] + step_lon / 2))[None, :]
+    out[outside] = np.nan
+    return out
+
+
+def visibility_raster(aurora: np.ndarray, cloud_pct: np.ndarray | None = None) -> np.ndarray:
+    """
+    Probabilité d'aurore visible (%) par maille : probabilité OVATION, multipliée
+    par la fraction de ciel dégagé là où une couverture nuageuse est connue.
+    """
+    visible = aurora.astype(np.float32)
+    if cloud_pct is not None:
+        clear = 1 - np.clip(cloud_pct, 0, 100) / 100
+        visible *= np.where(np.isnan(clear), 1, clear)
+    return visible
+
+
+def raster_png(visible: np.ndarray) -> bytes:
+    """
+    Image PNG de la grille (181, 360) en projection Web Mercator : lignes
+    équidistantes en ordonnée Mercator entre ±MERCATOR_MAX_LAT, colonnes de
+    -180° à 180°, interpolation linéaire en latitude.
+    """
+    from PIL import Image
+
+    y_max = np.log(np.tan(np.pi / 4 + np.radians(MERCATOR_MAX_LAT) / 2))
+    y = np.linspace(y_max, -y_max, OVERLAY_ROWS)                      # du haut vers le bas
+    row = np.degrees(2 * np.arctan(np.exp(y)) - np.pi / 2) + 90       # indice (fractionnaire) de ligne
+    lo = np.floor(row).astype(int)
+    w = (row - lo)[:, None].astype(np.float32)
+    shifted = np.roll(visible, 180, axis=1)                           # colonnes 0..359°E → -180..179°
+    rows = shifted[lo] * (1 - w) + shifted[np.minimum(lo + 1, 180)] * w
+    # PNG en palette (101 niveaux, transparence par niveau) : ~3× plus léger qu'en RGBA
+    img = Image.fromarray(np.clip(np.rint(rows), 0, 100).astype(np.uint8), mode="P")
+    img.putpalette(_LUT[:, :3].ravel().tolist())
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", optimize=True, transparency=bytes(_LUT[:, 3]))
+    return buf.getvalue()
+
+
+def _overlay_key(grid, cloud=None):
+    return zlib.crc32(grid["aurora"]), cloud["token"] if cloud else None
+
+
+@cache.cached("map_overlay", ttl=3 * 3600, conditional=False, key=_overlay_key,
+              max_entries=8, shared=True)
+def visibility_overlay(grid: dict, cloud: dict | None = None) -> str:
+    """
+    Image de la carte (URI data:image/png) pour une grille OVATION.
+
+    `cloud` (optionnel) : champ de couverture nuageuse en % au format de
+    resample_field, avec une clé "token" identifiant son contenu. L'image
+    est mise en cache par contenu de grille et de champ : une seule
+    rastérisation par mise à jour du modèle, quel que soit le nombre de sessions.
+    """
+    cloud_pct = resample_field(cloud) if cloud else None
+    png = raster_png(visibility_raster(probability_grid(grid), cloud_pct))
+    return "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+
+
+# -------------------------------------------------------------------
+# Figure
+# -------------------------------------------------------------------
+
+def build_kp_map(kp_display: float, lat_limit: float, cities: list[dict],
+                 overlay: str | None = None, hemi: str = "north") -> go.Figure:
+    """
+    Construit la carte d'un hémisphère : image de probabilité OVATION,
+    ligne de limite Kp et marqueurs des villes.
+
+    La limite est une ligne de latitude géomagnétique constante (courbe en
+    coordonnées géographiques) ; la visibilité des villes est évaluée en un
+    seul calcul sur le tableau de leurs latitudes géomagnétiques.
+
+    Args:
+        kp_display: Indice Kp affiché
+        lat_limit: Latitude géomagnétique limite de visibilité pour ce Kp
+        cities: Villes à afficher (dicts name, lat, lon, emoji, type)
+        overlay: Image de visibility_overlay (None : carte sans zone d'aurores)
+        hemi: "north" ou "south" (cadrage, limite tracée au nord ou au sud)
+
+    Returns:
+        Figure Plotly prête à afficher
+    """
+    fig = go.Figure()
+
+    # Échelle de couleur de l'image (trace sans point, seulement pour la barre)
+    fig.add_trace(go.Scattermap(
+        lon=[None], lat=[None], mode="markers",
+        marker=dict(color=[0], cmin=0, cmax=100, colorscale=COLORSCALE, showscale=True,
+                    colorbar=dict(title="Probabilité<br>d'aurore (%)", thickness=14, len=0.6)),
+        showlegend=False, hoverinfo="skip",
+    ))
+
+    # Ligne de limite (latitude géomagnétique constante)
+    limit_lon = np.arange(-180, 181, 3)
+    fig.add_trace(go.Scattermap(
+        lon=limit_lon,
+        lat=geomag.iso_latitude(lat_limit if hemi == "north" else -lat_limit, limit_lon).round(2),
+        mode='lines',
+        line=dict(color='gold', width=5),
+        name=f' Limite Kp {kp_display:.1f}',
+        hovertemplate=f'<b>Limite de visibilité</b><br>Latitude géomagnétique: {lat_limit:.1f}°<br>'
+                      'Latitude: %{lat:.1f}°<extra></extra>'
+    ))
+
+    mlat = geomag.catalog_latitudes(cities)
+    city_visible = np.abs(mlat) >= lat_limit
+
+    # Villes : une trace par type (principales, recherchées), couleurs selon la visibilité
+    for city_type, colors, sizes, label in (
+        ("principale", ("#2e8540", "#c0392b"), (16, 12), "Principale"),    # Vert ou Rouge
+        ("recherchee", ("#e3b505", "#e67e22"), (14, 14), "Personnalisée"),  # Jaune ou Orange
+    ):
+        idx = [i for i, v in enumerate(cities) if (v["type"] == "principale") == (city_type == "principale")]
+        if not idx:
+            continue
+        group = [cities[i] for i in idx]
+        visible = city_visible[idx]
+        fig.add_trace(go.Scattermap(
+            lon=[v["lon"] for v in group],
+            lat=[v["lat"] for v in group],
+            mode='markers+text',
+            marker=dict(
+                size=[sizes[0] if ok else sizes[1] for ok in visible],
+                color=[colors[0] if ok else colors[1] for ok in visible],
+            ),
+            text=[f"{v['emoji']} {v['name']}" for v in group],
+            textposition='top center',
+            textfont=dict(size=12, color='black'),
+            customdata=[[" VISIBLES" if ok else " NON VISIBLES", f"{m:.1f}", geomag.format_lat(v["lat"])]
+                        for ok, m, v in zip(visible, mlat[idx], group)],
+            showlegend=False,
+            hovertemplate="<b>%{text}</b><br>" +
+                         f"Type: {label}<br>" +
+                         "Latitude: %{customdata[2]}<br>" +
+                         "Latitude géomagnétique: %{customdata[1]}°<br>" +
+                         "<b>Aurores: %{customdata[0]}</b><extra></extra>"
+        ))
+
+    layers = []
+    if overlay:
+        layers.append(dict(
+            sourcetype="image", source=overlay, below="traces", opacity=0.85,
+            coordinates=[[-180, MERCATOR_MAX_LAT], [180, MERCATOR_MAX_LAT],
+                         [180, -MERCATOR_MAX_LAT], [-180, -MERCATOR_MAX_LAT]],
+        ))
+
+    # Configuration
+    view = VIEWS[hemi]
+    fig.update_layout(
+        title=dict(
+            text=f" Visibilité des Aurores {view['title']} (Kp = {kp_display:.1f})",
+            x=0.5,
+            xanchor='center',
+            font=dict(size=24, family='Arial Black', color='#2e8540')
+        ),
+        map=dict(
+            style="carto-positron",
+            center=view["center"],
+            zoom=view["zoom"],
+            layers=layers,
+        ),
+        height=800,
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.05,
+            xanchor="center",
+            x=0.5,
+            bgcolor='rgba(255, 255, 255, 0.95)',
+            bordercolor='#2e8540',
+            borderwidth=2,
+            font=dict(size=13)
+        ),
+        margin=dict(l=10, r=10, t=80, b=20),
+        paper_bgcolor='rgba(240, 248, 255, 1)'
+    )
+    return fig
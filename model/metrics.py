@@ -0,0 +1,234 @@
+# model/metrics.py
+"""
+Instrumentation des appels aux sources externes (NOAA, Open-Meteo, OWM, SMTP...).
+
+Chaque appel est mesuré (durée, octets, statut, tentatives, classe d'erreur)
+et agrégé par source dans un registre en mémoire partagé par tout le processus.
+Les statistiques sont exportables au format texte Prometheus ou en JSON.
+"""
+
+import json
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Fenêtre glissante utilisée pour les percentiles (secondes)
+ROLLING_WINDOW_S = 15 * 60
+# Nombre maximum d'échantillons conservés par source
+MAX_SAMPLES = 2048
+
+
+# -------------------------------------------------------------------
+# Registre des mesures
+# -------------------------------------------------------------------
+
+class SourceStats:
+    """Compteurs cumulés et échantillons récents pour une source."""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.errors = defaultdict(int)      # classe d'erreur -> nombre
+        self.samples = deque(maxlen=MAX_SAMPLES)  # (horodatage, durée en s)
+
+    def recent_durations(self, window_s=ROLLING_WINDOW_S):
+        cutoff = time.time() - window_s
+        return sorted(d for t, d in self.samples if t >= cutoff)
+
+
+class MetricsRegistry:
+    """Registre thread-safe des statistiques par source."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources = defaultdict(SourceStats)
+
+    def observe(self, source, duration_s, nbytes=0, retries=0, error=None):
+        with self._lock:
+            st = self._sources[source]
+            st.requests += 1
+            st.bytes += int(nbytes or 0)
+            st.retries += int(retries or 0)
+            st.samples.append((time.time(), duration_s))
+            if error:
+                st.errors[error] += 1
+
+    def cache_event(self, source, hit):
+        with self._lock:
+            st = self._sources[source]
+            if hit:
+                st.cache_hits += 1
+            else:
+                st.cache_misses += 1
+
+    def snapshot(self, window_s=ROLLING_WINDOW_S):
+        """Retourne un dict {source: statistiques} sérialisable en JSON."""
+        with self._lock:
+            out = {}
+            for name, st in sorted(self._sources.items()):
+                durations = st.recent_durations(window_s)
+                lookups = st.cache_hits + st.cache_misses
+                out[name] = {
+                    "requests": st.requests,
+                    "bytes": st.bytes,
+                    "retries": st.retries,
+                    "errors": dict(st.errors),
+                    "cache_hits": st.cache_hits,
+                    "cache_misses": st.cache_misses,
+                    "cache_hit_ratio": round(st.cache_hits / lookups, 3) if lookups else None,
+                    "window_s": window_s,
+                    "window_count": len(durations),
+                    "p50_ms": _percentile_ms(durations, 0.50),
+                    "p95_ms": _percentile_ms(durations, 0.95),
+                }
+            return out
+
+    def reset(self):
+        with self._lock:
+            self._sources.clear()
+
+
+def _percentile_ms(sorted_durations, q):
+    """Percentile (rang le plus proche) d'une liste triée de durées, en ms."""
+    if not sorted_durations:
+        return None
+    idx = min(len(sorted_durations) - 1, max(0, math.ceil(q * len(sorted_durations)) - 1))
+    return round(sorted_durations[idx] * 1000, 1)
+
+
+# Registre global du processus (partagé par toutes les sessions Streamlit)
+registry = MetricsRegistry()
+
+
+# -------------------------------------------------------------------
+# Mesure des appels
+# -------------------------------------------------------------------
+
+class _Call:
+    """Objet renseigné par l'appelant pendant une mesure `track()`."""
+
+    def __init__(self):
+        self.response = None   # réponse `requests` (statut, octets, retries)
+        self.nbytes = None     # octets envoyés/reçus si pas de réponse HTTP
+        self.error = None      # classe d'erreur forcée (ex. "rate_limited")
+
+
+@contextmanager
+def track(source):
+    """
+    Mesure un appel à une source externe.
+
+    Usage:
+        >>> import requests
+        >>> url = "https://services.swpc.noaa.gov/json/planetary_k_index_1m.json"
+        >>> with track("kp_series") as call:  # doctest: +SKIP
+        ...     call.response = requests.get(url, timeout=15)
+    """
+    call = _Call()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield call
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        nbytes, retries = call.nbytes or 0, 0
+        r = call.response
+        if r is not None:
+            if call.nbytes is None:
+                nbytes = len(r.content or b"")
+            history = getattr(getattr(r.raw, "retries", None), "history", None)
+            retries = len(history) if history else 0
+            if error is None and r.status_code >= 400:
+                error = f"HTTP{r.status_code}"
+        registry.observe(source, duration, nbytes, retries, call.error or error)
+
+
+# -------------------------------------------------------------------
+# Export (Prometheus / JSON)
+# -------------------------------------------------------------------
+
+def to_json(window_s=ROLLING_WINDOW_S):
+    return json.dumps(registry.snapshot(window_s), indent=2)
+
+
+def to_prometheus(window_s=ROLLING_WINDOW_S):
+    """Format d'exposition texte Prometheus."""
+    snap = registry.snapshot(window_s)
+    lines = [
+        "# HELP aurora_upstream_requests_total Appels aux sources externes.",
+        "# TYPE aurora_upstream_requests_total counter",
+    ]
+    lines += [f'aurora_upstream_requests_total{{source="{s}"}} {v["requests"]}' for s, v in snap.items()]
+    lines += [
+        "# HELP aurora_upstream_bytes_total Octets échangés avec les sources externes.",
+        "# TYPE aurora_upstream_bytes_total counter",
+    ]
+    lines += [f'aurora_upstream_bytes_total{{source="{s}"}} {v["bytes"]}' for s, v in snap.items()]
+    lines += [
+        "# HELP aurora_upstream_retries_total Nouvelles tentatives HTTP.",
+        "# TYPE aurora_upstream_retries_total counter",
+    ]
+    lines += [f'aurora_upstream_retries_total{{source="{s}"}} {v["retries"]}' for s, v in snap.items()]
+    lines += [
+        "# HELP aurora_upstream_errors_total Erreurs par classe.",
+        "# TYPE aurora_upstream_errors_total counter",
+    ]
+    for s, v in snap.items():
+        for err, n in sorted(v["errors"].items()):
+            lines.append(f'aurora_upstream_errors_total{{source="{s}",error="{err}"}} {n}')
+    lines += [
+        "# HELP aurora_cache_requests_total Lectures du cache par résultat.",
+        "# TYPE aurora_cache_requests_total counter",
+    ]
+    for s, v in snap.items():
+        if v["cache_hits"] or v["cache_misses"]:
+            lines.append(f'aurora_cache_requests_total{{source="{s}",result="hit"}} {v["cache_hits"]}')
+            lines.append(f'aurora_cache_requests_total{{source="{s}",result="miss"}} {v["cache_misses"]}')
+    lines += [
+        f"# HELP aurora_upstream_latency_seconds Latence sur les {window_s // 60} dernières minutes.",
+        "# TYPE aurora_upstream_latency_seconds summary",
+    ]
+    for s, v in snap.items():
+        for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms")):
+            if v[key] is not None:
+                lines.append(f'aurora_upstream_latency_seconds{{source="{s}",quantile="{q}"}} {v[key] / 1000:.4f}')
+    return "\n".join(lines) + "\n"
+
+
+def start_http_exporter(port, host="0.0.0.0"):
+    """
+    Démarre un petit serveur HTTP (thread daemon) exposant :
+      - /metrics       → format Prometheus
+      - /metrics.json  → format JSON
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body, ctype = to_json().encode("utf-8"), "application/json"
+            elif self.path.startswith("/metrics"):
+                body, ctype = to_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, int(port)), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-exporter").start()
+    return server
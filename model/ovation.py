@@ -0,0 +1,170 @@
+# model/ovation.py
+"""
+Module de récupération des images OVATION (NOAA SWPC) et de création des GIF
+animés affichés dans l'onglet « Prévisions aurores », ainsi que de la grille
+de probabilités OVATION qui alimente la carte mondiale (model.maps).
+
+Chaque image est déclinée une seule fois, à son arrivée, en une pyramide de
+résolutions (miniature, moyenne, pleine) déjà quantifiées en palette GIF :
+l'assemblage d'une animation ne fait plus que concaténer des images prêtes,
+et la résolution choisie réduit d'autant les octets envoyés au navigateur.
+"""
+
+import io
+import zlib
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+
+from PIL import Image
+
+from model import cache, decode, profiler, upstream
+
+OVATION_BASE = "https://services.swpc.noaa.gov/images/animations/ovation"
+OVATION_GRID_URL = "https://services.swpc.noaa.gov/json/ovation_aurora_latest.json"
+
+# Grille OVATION : mailles de 1°, lignes = latitude -90..90, colonnes = longitude est 0..359
+GRID_SHAPE = (181, 360)
+
+# Pyramide : largeur en pixels par niveau (None = résolution d'origine)
+LEVELS = {"thumb": 240, "medium": 480, "full": None}
+
+
+def latest_slot(now=None) -> datetime:
+    """Créneau OVATION courant : l'heure UTC arrondie aux 5 minutes inférieures."""
+    now_utc = now or datetime.now(timezone.utc)
+    return now_utc - timedelta(minutes=now_utc.minute % 5,
+                               seconds=now_utc.second,
+                               microseconds=now_utc.microsecond)
+
+
+def fetch_frames(hemi: str, minutes_window: int, step_min: int = 5,
+                 slot: datetime | None = None, level: str | None = None) -> list[Image.Image]:
+    """
+    Récupère les images OVATION récentes (de la plus ancienne à la plus récente).
+
+    Sans `level`, images RGB d'origine ; avec un niveau de LEVELS, images en
+    palette issues de la pyramide (prêtes pour make_gif).
+    """
+    rounded = slot or latest_slot()
+    frames = []
+    steps = max(1, minutes_window // step_min)
+    for i in range(steps, -1, -1):  # du plus ancien au plus récent
+        t = rounded - timedelta(minutes=i * step_min)
+        stamp = t.strftime("%Y-%m-%d_%H%M")
+        base = f"{OVATION_BASE}/{hemi}/"
+        fname = f"aurora_{'N' if hemi=='north' else 'S'}_{stamp}.jpg"
+        url = base + fname + "?" + urlencode({"t": int(t.timestamp())})
+        try:
+            if level is None:
+                img = Image.open(io.BytesIO(frame_bytes(url))).convert("RGB")
+            else:
+                img = Image.open(io.BytesIO(frame_level(url, level)))
+            frames.append(img)
+        except Exception:
+            continue
+    return frames
+
+
+@cache.cached("ovation_frames", ttl=3 * 3600, conditional=False,
+              max_entries=512, max_bytes=64 * 2**20, shared=True)
+def frame_bytes(url: str) -> bytes:
+    """
+    JPEG d'une image OVATION, mis en cache par URL.
+
+    Une image horodatée ne change plus une fois publiée : chaque créneau ne
+    télécharge que la nouvelle image, les autres viennent du cache (partagé
+    entre processus si AURORA_CACHE_BACKEND est configuré).
+    """
+    r = upstream.get("ovation_frames", url, timeout=10)
+    if r.status_code != 200 or not r.headers.get("Content-Type", "").startswith("image"):
+        raise ValueError(f"image OVATION indisponible ({r.status_code})")
+    return r.content
+
+
+@cache.cached("ovation_grid", ttl=300, max_entries=1, shared=True)  # modèle mis à jour toutes les ~5 min
+def get_grid() -> dict:
+    """
+    Dernière prévision OVATION : probabilité d'aurore (0–100 %) par maille de 1°.
+
+    Renvoie {"forecast_time", "observation_time", "aurora"}, où `aurora`
+    contient les octets d'une grille uint8 GRID_SHAPE (ligne = latitude + 90,
+    colonne = longitude est) : 64 Kio au lieu des ~900 Kio du JSON, et une
+    valeur partageable telle quelle entre processus.
+    """
+    r = upstream.get("ovation_grid", OVATION_GRID_URL, timeout=15)
+    r.raise_for_status()
+    data = decode.loads(r.content)
+    n_lat, n_lon = GRID_SHAPE
+    grid = bytearray(n_lat * n_lon)
+    for lon, lat, value in data["coordinates"]:     # [longitude, latitude, probabilité]
+        grid[(int(lat) + 90) * n_lon + int(lon) % n_lon] = max(0, min(100, int(value)))
+    forecast_time = data.get("Forecast Time", "")
+    cache.publish("ovation_grid", (forecast_time, zlib.crc32(grid)))
+    return {"forecast_time": forecast_time,
+            "observation_time": data.get("Observation Time", ""),
+            "aurora": bytes(grid)}
+
+
+def build_levels(jpeg: bytes) -> dict[str, bytes]:
+    """Pyramide d'une image : {niveau: GIF d'une image, quantifié en 256 couleurs}."""
+    img = Image.open(io.BytesIO(jpeg)).convert("RGB")
+    levels = {}
+    for level, width in LEVELS.items():
+        resized = img
+        if width is not None and img.width > width:
+            resized = img.resize((width, round(img.height * width / img.width)), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        resized.quantize(256, method=Image.Quantize.FASTOCTREE).save(buf, format="GIF")
+        levels[level] = buf.getvalue()
+    return levels
+
+
+@cache.cached("ovation_levels", ttl=3 * 3600, conditional=False,
+              max_entries=3 * 512, max_bytes=128 * 2**20, shared=True)
+def frame_level(url: str, level: str) -> bytes:
+    """
+    Niveau `level` de la pyramide d'une image OVATION.
+
+    Au premier accès à une image, tous les niveaux sont construits et mis en
+    cache ensemble : le redimensionnement et la quantification ne sont faits
+    qu'une fois par image, quelle que soit la résolution demandée ensuite.
+    """
+    if level not in LEVELS:
+        raise ValueError(f"niveau inconnu : {level}")
+    with profiler.section("ovation.pyramid"):
+        levels = build_levels(frame_bytes(url))
+    for other, data in levels.items():
+        if other != level:
+            frame_level.namespace.store(frame_level.cache_key(url, other), data)
+    return levels[level]
+
+
+def make_gif(frames: list[Image.Image], fps: int) -> bytes | None:
+    """Crée un GIF (en octets) à partir des images."""
+    if not frames:
+        return None
+    buf = io.BytesIO()
+    duration_ms = int(1000 / max(1, fps))
+    frames[0].save(
+        buf, format="GIF", save_all=True,
+        append_images=frames[1:],
+        duration=duration_ms, loop=0, disposal=2
+    )
+    return buf.getvalue()
+
+
+@cache.cached("ovation_gif", ttl=600, conditional=False, max_entries=16, max_bytes=64 * 2**20)
+def animation_gif(hemi: str, minutes_window: int, fps: int, slot: datetime,
+                  level: str = "medium") -> bytes | None:
+    """
+    GIF d'un hémisphère pour un créneau de 5 minutes, partagé entre sessions.
+
+    Le créneau fait office de version : un nouveau créneau publie une nouvelle
+    version « ovation_<hémisphère> » et déclenche le seul téléchargement.
+    `level` choisit la résolution dans la pyramide (voir LEVELS).
+    """
+    cache.publish(f"ovation_{hemi}", slot.isoformat())
+    with profiler.section("ovation.fetch_frames"):
+        frames = fetch_frames(hemi, minutes_window, step_min=5, slot=slot, level=level)
+    with profiler.section("ovation.gif_encode"):
+        return make_gif(frames, fps)
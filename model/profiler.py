@@ -0,0 +1,170 @@
+# model/profiler.py
+"""
+Profilage par réexécution (rerun) du script Streamlit.
+
+Activé par la variable d'environnement AURORA_PROFILE :
+  - AURORA_PROFILE=1             → temps par section, journalisés à chaque rerun
+  - AURORA_PROFILE=cprofile      → idem + fichier .prof (cProfile) par rerun
+  - AURORA_PROFILE=pyinstrument  → idem + rapport .html (pyinstrument) par rerun
+Les fichiers sont écrits dans AURORA_PROFILE_DIR (défaut : ./profiles).
+"""
+
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+logger = logging.getLogger("aurora.profile")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_local = threading.local()
+_seq = 0
+_seq_lock = threading.Lock()
+
+
+class RerunProfiler:
+    """Chronomètre les sections logiques d'un rerun (sections imbriquables)."""
+
+    def __init__(self, enabled=False, tool=None, out_dir=None):
+        self.enabled = enabled
+        self.tool = tool
+        self.out_dir = Path(out_dir) if out_dir else None
+        self.timings = []       # [[chemin de section, durée en s]] par ordre de début
+        self._stack = []
+        self._start = time.perf_counter()
+        self._backend = None
+        self._finished = False
+
+    def section(self, name):
+        """Contexte mesurant `name` ; no-op si le profilage est désactivé."""
+        if not self.enabled:
+            return nullcontext()
+        return self._section(name)
+
+    @contextmanager
+    def _section(self, name):
+        self._stack.append(name)
+        entry = ["/".join(self._stack), 0.0]
+        self.timings.append(entry)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry[1] = time.perf_counter() - start
+            self._stack.pop()
+
+    def start(self):
+        if not self.enabled or not self.tool:
+            return
+        if self.tool == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                logger.warning("pyinstrument non installé : profilage détaillé désactivé")
+                return
+            self._backend = Profiler(async_mode="disabled")
+        else:
+            import cProfile
+            self._backend = cProfile.Profile()
+        try:
+            (self._backend.start if self.tool == "pyinstrument" else self._backend.enable)()
+        except (RuntimeError, ValueError) as e:   # autre profileur déjà actif
+            logger.warning("profilage détaillé indisponible : %s", e)
+            self._backend = None
+
+    def finish(self):
+        """Arrête le rerun : journalise le détail et écrit le profil éventuel."""
+        if not self.enabled or self._finished:
+            return
+        self._finished = True
+        total = time.perf_counter() - self._start
+        dump = self._stop_backend()
+        logger.info(self.format_report(total) + (f"\n  profil : {dump}" if dump else ""))
+
+    def format_report(self, total=None):
+        total = total if total is not None else time.perf_counter() - self._start
+        top_level = sum(d for p, d in self.timings if "/" not in p)
+        lines = [f"rerun {total * 1000:.1f} ms"]
+        for path, d in self.timings:
+            label = "  " * path.count("/") + path.rsplit("/", 1)[-1]
+            lines.append(f"  {label:<40} {d * 1000:8.1f} ms  {d / total if total else 0:6.1%}")
+        lines.append(f"  {'(hors sections)':<40} {(total - top_level) * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def _stop_backend(self):
+        if self._backend is None:
+            return None
+        global _seq
+        with _seq_lock:
+            _seq += 1
+            n = _seq
+        out_dir = self.out_dir or Path("profiles")
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if self.tool == "pyinstrument":
+            self._backend.stop()
+            path = out_dir / f"rerun-{stamp}-{n:04d}.html"
+            path.write_text(self._backend.output_html(), encoding="utf-8")
+        else:
+            self._backend.disable()
+            path = out_dir / f"rerun-{stamp}-{n:04d}.prof"
+            self._backend.dump_stats(str(path))
+        self._backend = None
+        return path
+
+
+def begin_rerun():
+    """
+    Crée le profileur du rerun courant (un par thread de script).
+
+    Un rerun interrompu (st.stop(), exception, nouveau rerun) est clôturé ici.
+    """
+    previous = getattr(_local, "current", None)
+    if previous is not None:
+        previous.finish()
+
+    mode = os.environ.get("AURORA_PROFILE", "").strip().lower()
+    enabled = mode not in ("", "0", "false", "no")
+    tool = mode if mode in ("cprofile", "pyinstrument") else None
+    prof = RerunProfiler(enabled, tool, os.environ.get("AURORA_PROFILE_DIR"))
+    prof.start()
+    _local.current = prof
+    return prof
+
+
+def section(name):
+    """Section du rerun en cours dans ce thread (no-op hors rerun profilé)."""
+    prof = getattr(_local, "current", None)
+    return prof.section(name) if prof is not None else nullcontext()
+
+
+def timed(name):
+    """
+    Décorateur de rendu : mesure la fonction comme section `name`.
+
+    Appelée depuis le script, la section s'ajoute au rerun courant ; appelée
+    seule par un st.fragment (rerun partiel), elle ouvre et clôture son propre
+    rerun pour que le rapport reste séparé.
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            prof = getattr(_local, "current", None)
+            if prof is not None and not prof._finished:
+                with prof.section(name):
+                    return fn(*args, **kwargs)
+            prof = begin_rerun()
+            try:
+                with prof.section(name):
+                    return fn(*args, **kwargs)
+            finally:
+                prof.finish()
+        return wrapper
+    return deco
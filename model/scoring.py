@@ -0,0 +1,142 @@
+# model/scoring.py
+"""
+Score de probabilité vectorisé, sur des tableaux localisation × heure.
+
+Même formule et mêmes poids que model.functions.chance_score, calculés d'un
+seul coup pour toutes les heures de toutes les localisations (comparaison de
+localisations, recherche de ciel dégagé). L'obscurité est déduite de la
+hauteur du soleil, calculée ici sans appel réseau, et le Kp de la
+prévision NOAA est ramené à la portée de l'aurore à chaque latitude
+géomagnétique.
+"""
+
+import numpy as np
+
+from model import geomag
+
+# Soleil sous −12° : fin du crépuscule nautique, ciel assez sombre pour les aurores
+DARK_SUN_ELEVATION = -12.0
+# Au-delà de la limite Kp, l'ovale reste visible bas sur l'horizon sur ~4° (~450 km)
+REACH_DEG = 4.0
+
+_J2000 = np.datetime64("2000-01-01T12:00", "s")
+
+
+# -------------------------------------------------------------------
+# Termes du score
+# -------------------------------------------------------------------
+
+def chance_scores(kp, cloud, dark, w1=0.5, w2=0.35, w3=0.15):
+    """
+    chance_score appliqué élément par élément (tableaux diffusables entre eux).
+
+    Une couverture nuageuse ou un Kp inconnu (NaN) donne 0, comme None pour
+    chance_score.
+    """
+    kp = np.asarray(kp, dtype=np.float32)
+    cloud = np.asarray(cloud, dtype=np.float32)
+    kp_norm = np.minimum(kp / 9, 1.0)
+    sky_norm = np.clip((100 - cloud) / 100, 0, 1)
+    score = w1 * kp_norm + w2 * sky_norm + w3 * np.asarray(dark, dtype=np.float32)
+    return np.where(np.isnan(kp) | np.isnan(cloud), 0, score.round(2)).astype(np.float32)
+
+
+def solar_elevation(lat, lon, times):
+    """
+    Hauteur du soleil (°) : tableau (localisations, heures).
+
+    `lat`, `lon` : (L,) ; `times` : datetime64 UTC (H,). Formules abrégées de
+    l'almanach nautique (précision ~0,5°, largement suffisante pour l'obscurité).
+    """
+    d = ((np.asarray(times, dtype="datetime64[s]") - _J2000) / np.timedelta64(1, "D")).astype(np.float64)
+    g = np.radians(357.529 + 0.98560028 * d)
+    q = 280.459 + 0.98564736 * d
+    ecl_lon = np.radians(q + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g))
+    obliquity = np.radians(23.439 - 0.00000036 * d)
+    decl = np.arcsin(np.sin(obliquity) * np.sin(ecl_lon))
+    ra = np.arctan2(np.cos(obliquity) * np.sin(ecl_lon), np.cos(ecl_lon))
+    gmst = np.radians((18.697374558 + 24.06570982441908 * d) % 24 * 15)
+
+    phi = np.radians(np.asarray(lat, dtype=np.float64))[:, None]
+    hour_angle = gmst[None, :] + np.radians(np.asarray(lon, dtype=np.float64))[:, None] - ra[None, :]
+    s = np.sin(phi) * np.sin(decl)[None, :] + np.cos(phi) * np.cos(decl)[None, :] * np.cos(hour_angle)
+    return np.degrees(np.arcsin(np.clip(s, -1, 1))).astype(np.float32)
+
+
+def darkness(elevation):
+    """1 quand le soleil est sous DARK_SUN_ELEVATION, 0 sinon."""
+    return (np.asarray(elevation) < DARK_SUN_ELEVATION).astype(np.float32)
+
+
+def reach(mlat, kp):
+    """
+    Portée de l'aurore à la latitude géomagnétique `mlat` pour l'indice `kp`
+    (diffusables) : 1 dans la zone de visibilité, décroissant linéairement
+    jusqu'à 0 à REACH_DEG degrés côté équateur de la limite.
+    """
+    margin = np.abs(np.asarray(mlat, dtype=np.float32)) - geomag.kp_limit(kp).astype(np.float32)
+    return np.clip(1 + margin / REACH_DEG, 0, 1).astype(np.float32)
+
+
+def hourly_kp(forecast, times, fallback=None):
+    """
+    Kp de chaque heure de `times` (datetime64 UTC) d'après les blocs de 3 h de
+    functions.get_kp_forecast ; `fallback` (ou NaN) hors de la prévision.
+    """
+    times = np.asarray(times, dtype="datetime64[h]")
+    out = np.full(times.shape, np.nan if fallback is None else fallback, dtype=np.float32)
+    if not forecast:
+        return out
+    starts = np.array([row[0].replace(" ", "T")[:13] for row in forecast], dtype="datetime64[h]")
+    values = np.array([row[1] for row in forecast], dtype=np.float32)
+    idx = np.searchsorted(starts, times, side="right") - 1
+    inside = (idx >= 0) & (times < starts[-1] + np.timedelta64(3, "h"))
+    out[inside] = values[idx[inside]]
+    return out
+
+
+# -------------------------------------------------------------------
+# Grille localisation × heure
+# -------------------------------------------------------------------
+
+def align_series(series, times):
+    """
+    Séries horaires {"start", "cloud"} (functions.get_cloud_cover) ramenées sur
+    l'axe `times` : tableau (L, H), NaN hors de la série ou pour une valeur manquante.
+    """
+    times = np.asarray(times, dtype="datetime64[h]")
+    out = np.full((len(series), len(times)), np.nan, dtype=np.float32)
+    for i, s in enumerate(series):
+        values = np.array([np.nan if v is None else v for v in s["cloud"]], dtype=np.float32)
+        offset = (times - np.datetime64(s["start"][:13], "h")).astype(int)
+        inside = (offset >= 0) & (offset < len(values))
+        out[i, inside] = values[offset[inside]]
+    return out
+
+
+def score_grid(lat, lon, times, cloud, kp, weights=(0.5, 0.35, 0.15)):
+    """
+    Score de chaque localisation × heure.
+
+    `lat`, `lon` : (L,) ; `times` : (H,) UTC ; `cloud` : (L, H) en % ;
+    `kp` : (H,). Renvoie {"score", "base", "dark", "reach", "mlat"} : `base`
+    est chance_score tel quel, `score` le même pondéré par la portée de
+    l'aurore à la latitude géomagnétique du lieu.
+    """
+    mlat = geomag.magnetic_latitude(lat, lon)
+    dark = darkness(solar_elevation(lat, lon, times))
+    base = chance_scores(kp[None, :], cloud, dark, *weights)
+    portee = reach(mlat[:, None], kp[None, :])
+    return {"score": base * portee, "base": base, "dark": dark, "reach": portee, "mlat": mlat}
+
+
+def best_windows(score, window_h=3):
+    """
+    Meilleure fenêtre de `window_h` heures consécutives par ligne de `score`
+    (L, H) : (indice de début, score moyen) pour chaque localisation.
+    """
+    window_h = max(1, min(window_h, score.shape[1]))
+    csum = np.concatenate([np.zeros((score.shape[0], 1), np.float64), np.cumsum(score, axis=1)], axis=1)
+    means = (csum[:, window_h:] - csum[:, :-window_h]) / window_h
+    start = means.argmax(axis=1)
+    return start, means[np.arange(len(start)), start].astype(np.float32)
@@ -0,0 +1,285 @@
+# model/snapshot.py
+"""
+Instantanés par localisation : dernières valeurs affichées pour un lieu
+(géocodage, Kp, Kp retenu pour le score, obscurité, nébulosité).
+
+Au premier rendu d'un lieu dans une session, l'application dessine l'en-tête,
+les jauges et la carte depuis l'instantané (« données de 14:32 ») avant la
+moindre requête, puis les remplace sur place quand les données fraîches
+arrivent : le délai perçu est celui d'une lecture en mémoire. Chaque rendu
+complet remet l'instantané à jour.
+
+Les instantanés vivent dans l'espace de cache « snapshot », recopié dans le
+backend partagé (AURORA_CACHE_BACKEND) s'il est configuré : un lieu déjà vu
+par une autre session, ou un autre processus, s'affiche aussitôt.
+
+Pour les localisations les plus demandées (localisations rapides et lieu par
+défaut), un thread unique (`SnapshotBuilder`) recalcule l'instantané complet
+à chaque changement des données : géocodage, Kp, obscurité, météo (le
+DataFrame reste dans le cache « weather », tenu à jour au passage), score,
+fenêtres d'observation et figures Plotly des jauges et de l'explorateur
+météo. Chaque figure est conservée en objet dans le processus et en JSON
+dans l'instantané, avec le jeton de ses données d'entrée : une page de ces
+lieux n'est plus qu'une suite de lectures de cache.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from model import cache
+
+logger = logging.getLogger("aurora.snapshot")
+
+TTL_S = 24 * 3600        # périmé au-delà (toujours lisible, mais évincé en premier)
+MAX_ENTRIES = 1000
+MIN_INTERVAL_S = 60      # valeurs inchangées : pas de réécriture plus fréquente
+DEFAULT_WEIGHTS = (0.5, 0.35, 0.15)      # curseurs de poids de la barre latérale
+BUILD_INTERVAL_S = 60                    # cadence du flux Kp 1 minute
+
+_ns = cache.namespace("snapshot", ttl=TTL_S, max_entries=MAX_ENTRIES, shared=True)
+
+
+def key(place):
+    """Clé d'un lieu : nom saisi, espaces normalisés, sans casse."""
+    return " ".join(place.split()).casefold()
+
+
+def _read(k):
+    found = _ns.lookup(k) or _ns.load_shared(k)
+    return found[0] if found else None
+
+
+def peek(place):
+    """Dernier instantané de `place`, même périmé : dict avec "taken_at" (UTC), ou None."""
+    snap = _read(key(place))
+    _ns.record(snap is not None)
+    return snap
+
+
+def save(place, **values):
+    """
+    Met à jour l'instantané de `place` et le renvoie. Une valeur None garde
+    la valeur précédente (source momentanément indisponible).
+    """
+    k = key(place)
+    previous = _read(k) or {}
+    snap = {**previous, **{name: v for name, v in values.items() if v is not None}}
+    unchanged = {n: v for n, v in snap.items() if n != "taken_at"} == \
+                {n: v for n, v in previous.items() if n != "taken_at"}
+    if previous and unchanged and time.time() - previous["taken_at"].timestamp() < MIN_INTERVAL_S:
+        return previous
+    snap["taken_at"] = datetime.now(timezone.utc)
+    _ns.store(k, snap)
+    return snap
+
+
+# -------------------------------------------------------------------
+# Figures précalculées
+# -------------------------------------------------------------------
+
+_figures = {}                 # (clé, nom) → (jeton, figure ou tuple de figures), propre au processus
+_figures_lock = threading.Lock()
+
+
+def token(*values):
+    """Jeton des données d'une figure : flottants arrondis, comparable après un aller-retour JSON."""
+    return [None if v is None else round(float(v), 4) for v in values]
+
+
+def weather_token(wx):
+    """Jeton d'un DataFrame de prévisions (empreinte de son contenu)."""
+    import pandas as pd
+
+    return int(pd.util.hash_pandas_object(wx, index=False).sum())
+
+
+def _to_json(fig):
+    import plotly.io as pio
+
+    if isinstance(fig, tuple):
+        return [pio.to_json(f, validate=False) for f in fig]
+    return pio.to_json(fig, validate=False)
+
+
+def _from_json(payload):
+    import plotly.io as pio
+
+    if isinstance(payload, list):
+        return tuple(pio.from_json(p, skip_invalid=True) for p in payload)
+    return pio.from_json(payload, skip_invalid=True)
+
+
+def prebuilt(place, name, tok):
+    """
+    Figure `name` précalculée pour `place` si ses données d'entrée ont le
+    jeton `tok`, sinon None. Objet partagé entre sessions : à afficher, pas
+    à modifier.
+    """
+    k = key(place)
+    with _figures_lock:
+        local = _figures.get((k, name))
+    if local is not None and local[0] == tok:
+        return local[1]
+    entry = (_read(k) or {}).get("figures", {}).get(name)
+    if entry is None or entry[0] != tok:
+        return None
+    # instantané construit par un autre processus : JSON relu une seule fois
+    fig = _from_json(entry[1])
+    with _figures_lock:
+        _figures[(k, name)] = (tok, fig)
+    return fig
+
+
+# -------------------------------------------------------------------
+# Précalcul des localisations fréquentes
+# -------------------------------------------------------------------
+
+def bundle_inputs(place, weights=DEFAULT_WEIGHTS):
+    """
+    Données d'entrée du bundle de `place` (nom géocodable, déjà traduit), lues
+    par les mêmes fonctions en cache que l'application ; None si le lieu est
+    introuvable. "token" résume tout ce dont dépend le bundle.
+    """
+    from model import live, solarwind
+    from model.alerts import effective_kp
+    from model.functions import chance_score, darkness_flag, geocode_place, get_kp_now, load_weather
+
+    geo = geocode_place(place)
+    if not geo:
+        return None
+    kp_now, _ = get_kp_now()
+    try:
+        nowcast = solarwind.nowcast()
+    except Exception:
+        nowcast = None
+    dark, sunrise_utc, sunset_utc = darkness_flag(geo["lat"], geo["lon"])
+    wx, cloud_now = load_weather(geo["lat"], geo["lon"], geo["timezone"])
+
+    # comme l'application : un seul score (Kp planétaire, anticipé par le vent solaire)
+    # pour l'en-tête, la jauge et les alertes ; la jauge Kp affiche le dernier Kp à la minute
+    kp_score, _ = effective_kp(kp_now, nowcast)
+    latest = live.get_feed().latest()
+    kp_live = latest[2] if latest else kp_now
+    score = chance_score(kp_score, cloud_now, dark, *weights)
+    wx_token = weather_token(wx)
+    return {
+        "geo": geo, "kp_now": kp_now, "kp_score": kp_score, "kp_live": kp_live, "direct": latest is not None,
+        "dark": dark, "sunrise_utc": sunrise_utc, "sunset_utc": sunset_utc, "wx": wx, "cloud_now": cloud_now,
+        "score": score, "wx_token": wx_token,
+        "token": [token(kp_now, kp_score, kp_live, latest is not None, dark, cloud_now, score), wx_token],
+    }
+
+
+def observation_windows(wx, ok):
+    """Heures favorables regroupées en fenêtres [[début, fin], ...] (ISO, fin exclue)."""
+    import pandas as pd
+
+    hour = pd.Timedelta(hours=1)
+    windows = []
+    for t in wx.loc[ok, "time"]:
+        if windows and t == windows[-1][1]:
+            windows[-1][1] = t + hour
+        else:
+            windows.append([t, t + hour])
+    return [[start.isoformat(), end.isoformat()] for start, end in windows]
+
+
+def build_bundle(place, weights=DEFAULT_WEIGHTS, inputs=None):
+    """
+    Calcule et enregistre le bundle complet de `place` : instantané (géocodage,
+    Kp, obscurité, nébulosité, score, fenêtres d'observation) et figures
+    précalculées "gauges" et "forecast" (vue par défaut). Renvoie
+    l'instantané, ou None si le lieu est introuvable.
+    """
+    from model.figures import (VARIABLES_DEFAUT, VARIABLES_METEO, explorateur_meteo,
+                               fenetres_observation, figures_jauges)
+
+    inputs = inputs or bundle_inputs(place, weights)
+    if inputs is None:
+        return None
+    wx = inputs["wx"]
+    ok = fenetres_observation(wx)
+    figures = {
+        "gauges": (token(inputs["kp_live"], inputs["cloud_now"], inputs["score"], inputs["direct"]),
+                   figures_jauges(inputs["kp_live"], inputs["cloud_now"], inputs["score"], inputs["direct"])),
+        "forecast": (inputs["wx_token"],
+                     explorateur_meteo(wx, [VARIABLES_METEO[v] for v in VARIABLES_DEFAUT], ok)),
+    }
+    k = key(place)
+    with _figures_lock:
+        for name, entry in figures.items():
+            _figures[(k, name)] = entry
+    return save(
+        place, geo=inputs["geo"], kp_now=inputs["kp_now"], kp_score=inputs["kp_score"],
+        dark=inputs["dark"], cloud_now=inputs["cloud_now"], sunrise_utc=inputs["sunrise_utc"],
+        sunset_utc=inputs["sunset_utc"], score=inputs["score"], weights=list(weights),
+        windows=observation_windows(wx, ok),
+        figures={name: [tok, _to_json(fig)] for name, (tok, fig) in figures.items()},
+    )
+
+
+class SnapshotBuilder:
+    """Thread unique qui tient à jour les bundles des localisations fréquentes."""
+
+    def __init__(self, places, weights=DEFAULT_WEIGHTS, interval_s=BUILD_INTERVAL_S):
+        self.places = list(dict.fromkeys(places))
+        self.weights = tuple(weights)
+        self.interval_s = interval_s
+        self.last_run = None          # datetime UTC du dernier passage
+        self.last_duration_s = None
+        self.rebuilt = 0              # bundles reconstruits depuis le démarrage
+        self.errors = {}              # lieu → dernière erreur
+        self._tokens = {}             # lieu → jeton des données du dernier bundle
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Lance le thread ; le premier passage a lieu aussitôt, hors du rendu."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="snapshot-builder")
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        self.run_once()
+        while not self._stop.wait(self.interval_s):
+            self.run_once()
+
+    def run_once(self):
+        """Reconstruit les bundles dont les données ont changé ; renvoie leur nombre."""
+        started = time.perf_counter()
+        rebuilt = 0
+        for place in self.places:
+            try:
+                inputs = bundle_inputs(place, self.weights)
+                if inputs is None or self._tokens.get(place) == inputs["token"]:
+                    continue
+                build_bundle(place, self.weights, inputs)
+                self._tokens[place] = inputs["token"]
+                self.errors.pop(place, None)
+                rebuilt += 1
+            except Exception as e:
+                self.errors[place] = str(e)
+                logger.warning("instantané %s : %s", place, e)
+        self.rebuilt += rebuilt
+        self.last_run = datetime.now(timezone.utc)
+        self.last_duration_s = time.perf_counter() - started
+        return rebuilt
+
+
+_builder = None
+_builder_lock = threading.Lock()
+
+
+def get_builder(places):
+    """Précalcul du processus pour `places` (démarré au premier appel)."""
+    global _builder
+    with _builder_lock:
+        if _builder is None:
+            _builder = SnapshotBuilder(places).start()
+        return _builder
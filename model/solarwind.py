@@ -0,0 +1,145 @@
+# model/solarwind.py
+"""
+Prévision immédiate du Kp à partir du vent solaire mesuré au point L1.
+
+Le Kp publié arrive avec retard : il décrit les 3 dernières heures. Le vent
+solaire mesuré par DSCOVR/ACE au point de Lagrange L1 (~1,5 million de km)
+n'atteint la Terre que 30 à 60 minutes plus tard. On en tire, chaque minute,
+une estimation du Kp à venir :
+
+  - couplage de Newell (2007) : dΦ/dt = v^4/3 · Bt^2/3 · sin^8/3(θ/2), θ angle
+    d'horloge de l'IMF (atan2(By, Bz)) — nul quand Bz est franchement au nord ;
+  - ajustement de Newell et al. (2008) :
+    Kp ≈ 0,05 + 2,244·10⁻⁴ · dΦ/dt + 2,844·10⁻⁶ · n^1/2 · v² ;
+  - moyennes glissantes sur WINDOW_MIN minutes, délai de propagation L1 → Terre
+    d'après la vitesse mesurée.
+
+Le calcul porte sur les deux heures des produits NOAA (~120 valeurs), en
+quelques dizaines de microsecondes : il peut tourner à chaque minute.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from model import cache, decode
+from model.upstream import get as _get
+
+PLASMA_URL = "https://services.swpc.noaa.gov/products/solar-wind/plasma-2-hour.json"
+MAG_URL = "https://services.swpc.noaa.gov/products/solar-wind/mag-2-hour.json"
+
+L1_DISTANCE_KM = 1.5e6
+WINDOW_MIN = 60          # moyenne glissante (l'ajustement de Newell porte sur des moyennes horaires)
+STALE_MIN = 30           # plus de mesure depuis 30 min : pas d'estimation
+
+
+# -------------------------------------------------------------------
+# Ingestion (produits NOAA SWPC, 1 minute)
+# -------------------------------------------------------------------
+
+def _table(url, source, columns):
+    r = _get(source, url)
+    r.raise_for_status()
+    rows = decode.loads(r.content)
+    header, rows = rows[0], rows[1:]
+    idx = [header.index(c) for c in columns]
+    return {row[0][:16]: [None if row[i] in (None, "") else float(row[i]) for i in idx] for row in rows}
+
+
+@cache.cached("solar_wind", ttl=60, max_entries=1, shared=True)  # cache 1 min (cadence des produits)
+def get_solar_wind():
+    """
+    Deux dernières heures de vent solaire, une ligne par minute (UTC) :
+    {"time": ["YYYY-MM-DD HH:MM", ...], "density", "speed", "bx", "by", "bz", "bt"}
+    (listes alignées, None si une mesure manque).
+    """
+    plasma = _table(PLASMA_URL, "solar_wind", ("density", "speed"))
+    mag = _table(MAG_URL, "solar_wind", ("bx_gsm", "by_gsm", "bz_gsm", "bt"))
+    times = sorted(plasma.keys() | mag.keys())
+    empty = [None] * 4
+    out = {
+        "time": times,
+        "density": [plasma.get(t, empty)[0] for t in times],
+        "speed": [plasma.get(t, empty)[1] for t in times],
+        "bx": [mag.get(t, empty)[0] for t in times],
+        "by": [mag.get(t, empty)[1] for t in times],
+        "bz": [mag.get(t, empty)[2] for t in times],
+        "bt": [mag.get(t, empty)[3] for t in times],
+    }
+    cache.publish("solar_wind", times[-1] if times else None)
+    return out
+
+
+# -------------------------------------------------------------------
+# Modèle
+# -------------------------------------------------------------------
+
+def newell_coupling(speed, by, bz, bt):
+    """Couplage de Newell dΦ/dt (v en km/s, champs en nT), tableaux diffusables."""
+    theta = np.arctan2(by, bz)
+    return np.power(speed, 4 / 3) * np.power(bt, 2 / 3) * np.abs(np.sin(theta / 2)) ** (8 / 3)
+
+
+def kp_from_coupling(coupling, density, speed):
+    """Kp estimé (0–9) d'après Newell et al. (2008)."""
+    kp = 0.05 + 2.244e-4 * coupling + 2.844e-6 * np.sqrt(density) * np.square(speed)
+    return np.clip(kp, 0, 9)
+
+
+def _rolling_mean(values, window):
+    """Moyenne glissante sur `window` échantillons, valeurs NaN ignorées (NaN si aucune)."""
+    ok = ~np.isnan(values)
+    total = np.concatenate([[0.0], np.cumsum(np.where(ok, values, 0.0))])
+    count = np.concatenate([[0], np.cumsum(ok)])
+    lo = np.maximum(np.arange(1, len(values) + 1) - window, 0)
+    n = count[1:] - count[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, (total[1:] - total[lo]) / n, np.nan)
+
+
+def nowcast_series(sw, window_min=WINDOW_MIN):
+    """
+    Kp estimé pour chaque minute mesurée : {"measured" (datetime64[m] à L1),
+    "arrival" (arrivée à la Terre), "kp", "coupling", "speed", "bz"} ;
+    NaN tant que la fenêtre ne contient aucune mesure complète.
+    """
+    measured = np.array(sw["time"], dtype="datetime64[m]")
+    col = {k: np.array([np.nan if v is None else v for v in sw[k]], dtype=np.float64)
+           for k in ("density", "speed", "by", "bz", "bt")}
+    coupling = newell_coupling(col["speed"], col["by"], col["bz"], col["bt"])
+    speed = _rolling_mean(col["speed"], window_min)
+    kp = kp_from_coupling(_rolling_mean(coupling, window_min), _rolling_mean(col["density"], window_min), speed)
+    lead = np.where(np.isnan(col["speed"]), speed, col["speed"])
+    with np.errstate(invalid="ignore"):
+        lead_min = np.where(lead > 0, L1_DISTANCE_KM / lead / 60, np.nan)
+    arrival = measured + np.nan_to_num(lead_min).round().astype("timedelta64[m]")
+    return {"measured": measured, "arrival": arrival, "lead_min": lead_min, "kp": kp,
+            "coupling": coupling, "speed": col["speed"], "bz": col["bz"]}
+
+
+def nowcast(sw=None, now=None):
+    """
+    Dernière estimation : {"kp", "measured_at", "arrival", "lead_min", "speed",
+    "bz"} (datetimes UTC), ou None si les mesures manquent ou datent de plus
+    de STALE_MIN minutes.
+    """
+    sw = sw if sw is not None else get_solar_wind()
+    if not sw["time"]:
+        return None
+    series = nowcast_series(sw)
+    valid = np.flatnonzero(~np.isnan(series["kp"]) & ~np.isnan(series["lead_min"]))
+    if not len(valid):
+        return None
+    i = valid[-1]
+    measured_at = series["measured"][i].astype(datetime).replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    if now - measured_at > timedelta(minutes=STALE_MIN):
+        return None
+    return {
+        "kp": round(float(series["kp"][i]), 2),
+        "measured_at": measured_at,
+        "arrival": measured_at + timedelta(minutes=float(series["lead_min"][i])),
+        "lead_min": round(float(series["lead_min"][i])),
+        "speed": float(series["speed"][i]) if not np.isnan(series["speed"][i]) else None,
+        "bz": float(series["bz"][i]) if not np.isnan(series["bz"][i]) else None,
+    }
@@ -0,0 +1,39 @@
+# model/upstream.py
+"""
+Accès HTTP aux sources externes.
+
+Toutes les requêtes passent par `get()`, qui :
+  - mesure l'appel dans model.metrics (durée, octets, tentatives, erreurs) ;
+  - ajoute les en-têtes conditionnels quand model.cache revalide une entrée
+    (et lève cache.NotModified sur un 304) ;
+  - redirige l'URL vers un serveur local si AURORA_UPSTREAM_URL est défini
+    (ex. http://127.0.0.1:8765 pour les benchmarks et tests de charge hors ligne) :
+    https://services.swpc.noaa.gov/json/x.json → http://127.0.0.1:8765/services.swpc.noaa.gov/json/x.json
+"""
+
+import os
+from urllib.parse import urlsplit
+
+import requests
+
+from model import cache, metrics
+
+
+def resolve(url: str) -> str:
+    """Réécrit `url` vers le serveur local AURORA_UPSTREAM_URL s'il est défini."""
+    override = os.environ.get("AURORA_UPSTREAM_URL")
+    if not override:
+        return url
+    parts = urlsplit(url)
+    rewritten = f"{override.rstrip('/')}/{parts.netloc}{parts.path}"
+    return rewritten + (f"?{parts.query}" if parts.query else "")
+
+
+def get(source, url, params=None, session=None, timeout=15, headers=None):
+    """GET `url` et enregistre l'appel sous `source` dans model.metrics."""
+    headers = {**cache.conditional_headers(), **(headers or {})}
+    with metrics.track(source) as call:
+        call.response = (session or requests).get(resolve(url), params=params, timeout=timeout,
+                                                  headers=headers or None)
+    cache.note_response(call.response)
+    return call.response